@@ -1,6 +1,8 @@
 from django.contrib import admin
-from .models import Site, ResponseTimeLog
+from .models import Site, ResponseTimeLog, ResponseTimeRollup, ProbeFailure
 from django_celery_results.models import TaskResult
 # 모델 등록
 admin.site.register(Site)
 admin.site.register(ResponseTimeLog)
+admin.site.register(ResponseTimeRollup)
+admin.site.register(ProbeFailure)
@@ -1,7 +1,6 @@
 # myapp/apps.py
 from django.apps import AppConfig
-from django.db.utils import OperationalError
-from django.core.exceptions import ObjectDoesNotExist
+
 
 class MyAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
@@ -10,19 +9,7 @@ class MyAppConfig(AppConfig):
     def ready(self):
         # Import your own models or signals here (AFTER apps are loaded)
         import myapp.signals
-        from myapp.models import Site
-        from myapp.ml.training import train_site_model
+        import myapp.metrics  # Celery 태스크 지표 시그널 등록
 
-        # 2) Train all sites on startup
-        try:
-            sites = Site.objects.all()
-            for site in sites:
-                try:
-                    print(f"[INFO] Training model for site: {site.domain}")
-                    train_site_model(site.domain)  # site.domain을 인자로 전달
-                except ObjectDoesNotExist:
-                    print(f"[WARNING] Site not found: {site.domain}. Skipping training.")
-                except Exception as e:
-                    print(f"[ERROR] Failed to train model for site {site.domain}: {e}")
-        except OperationalError:
-            print("[INFO] Database not ready. Skipping model training during initialization.")
\ No newline at end of file
+        # 시작 시 모델 점검은 DB/Redis/브로커를 사용하므로 여기서 하지 않고
+        # 서버/워커 진입점(wsgi, asgi, Celery worker_ready)에서 myapp.startup 으로 수행한다
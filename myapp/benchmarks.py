@@ -0,0 +1,538 @@
+# benchmarks.py: 성능 측정용 합성 데이터 생성기와 벤치마크 케이스
+# manage.py run_benchmarks 에서 사용한다. 운영 DB 는 건드리지 않고 임시 SQLite 파일을 쓴다.
+import io
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.test.utils import override_settings
+
+from myapp.ml.log_queries import response_time_range
+
+BENCH_DB_ALIAS = 'benchmark'
+INDEX_NAME = 'rtlog_site_ts_idx'
+
+
+def _percentiles(samples_ms):
+    samples_ms = sorted(samples_ms)
+    return {
+        "runs": len(samples_ms),
+        "p50_ms": round(statistics.median(samples_ms), 3),
+        "p95_ms": round(samples_ms[int(len(samples_ms) * 0.95) - 1 if len(samples_ms) > 1 else 0], 3),
+        "p99_ms": round(samples_ms[int(len(samples_ms) * 0.99) - 1 if len(samples_ms) > 1 else 0], 3),
+        "max_ms": round(samples_ms[-1], 3),
+    }
+
+
+def timed(fn, repeat):
+    """
+    fn 을 repeat 번 실행하고 ms 단위 지연 시간 통계를 반환.
+    """
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return _percentiles(samples)
+
+
+@contextmanager
+def synthetic_database():
+    """
+    임시 SQLite 파일에 마이그레이션을 적용한 'benchmark' DB alias 를 제공.
+    """
+    tmpdir = tempfile.mkdtemp(prefix="traffic_bench_")
+    settings_dict = dict(connections.databases['default'])
+    settings_dict['NAME'] = os.path.join(tmpdir, 'bench.sqlite3')
+    connections.databases[BENCH_DB_ALIAS] = settings_dict
+    try:
+        call_command('migrate', database=BENCH_DB_ALIAS, verbosity=0)
+        yield BENCH_DB_ALIAS
+    finally:
+        connections[BENCH_DB_ALIAS].close()
+        del connections.databases[BENCH_DB_ALIAS]
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+SHAPES = ('daily', 'flat', 'spiky')
+
+
+def generate_history(using, sites=10, rows=100_000, interval_seconds=60, end=None,
+                     base_latency=0.5, noise=0.2, seed=42, chunk_size=100_000, shape='daily'):
+    """
+    사이트별 ResponseTimeLog 합성 이력 생성.
+    - 사이트마다 rows / sites 개의 샘플을 interval_seconds 간격(±지터)으로 end 이전에 생성
+    - 응답 시간 모양(shape): daily = 하루 주기 사인파 + 정규 노이즈, flat = 노이즈만,
+      spiky = daily + 1% 확률의 5~10배 급증 (모두 항상 양수)
+    - ORM 을 거치지 않고 executemany 로 넣는다 (수천만 행 생성용)
+
+    Returns:
+        list[tuple[int, str]]: 생성된 (site_id, domain)
+    """
+    rng = np.random.default_rng(seed)
+    end = end or datetime.now(timezone.utc).replace(microsecond=0)
+    per_site = max(1, rows // sites)
+
+    connection = connections[using]
+    site_rows = []
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for i in range(sites):
+            domain = f"bench{i}_example_com"
+            cursor.execute(
+                "INSERT INTO myapp_site (domain, name, active) VALUES (%s, %s, %s)",
+                [domain, domain, True],
+            )
+            site_rows.append((cursor.lastrowid, domain))
+
+        end_ts = end.timestamp()
+        for site_id, _ in site_rows:
+            for chunk_start in range(0, per_site, chunk_size):
+                n = min(chunk_size, per_site - chunk_start)
+                idx = np.arange(chunk_start, chunk_start + n)
+                ts = end_ts - (per_site - idx) * interval_seconds + rng.uniform(0, interval_seconds * 0.5, n)
+                daily = 0.0 if shape == 'flat' else np.sin(2 * np.pi * (ts % 86400) / 86400)
+                values = np.abs(base_latency + 0.2 * daily + rng.normal(0, noise, n))
+                if shape == 'spiky':
+                    values *= np.where(rng.random(n) < 0.01, rng.uniform(5, 10, n), 1.0)
+                values = values.round(3)
+                stamps = [
+                    datetime.fromtimestamp(t, tz=timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')
+                    for t in ts
+                ]
+                cursor.executemany(
+                    "INSERT INTO myapp_responsetimelog (site_id, timestamp, response_time) VALUES (%s, %s, %s)",
+                    [(site_id, s, float(v)) for s, v in zip(stamps, values)],
+                )
+    return site_rows
+
+
+def bench_range_queries(using, site_rows, window_seconds=3600, repeat=50, seed=0):
+    """
+    response_time_range 로 site + 시간 구간 조회 지연 시간 측정 (복합 인덱스 유/무 비교).
+    """
+    rng = random.Random(seed)
+    bounds = {}
+    for site_id, _ in site_rows:
+        first = response_time_range(site_id, using=using).values_list('timestamp', flat=True).first()
+        last = response_time_range(site_id, using=using).values_list('timestamp', flat=True).last()
+        bounds[site_id] = (first, last)
+
+    windows = []
+    for _ in range(repeat):
+        site_id, _ = rng.choice(site_rows)
+        first, last = bounds[site_id]
+        span = max(0.0, (last - first).total_seconds() - window_seconds)
+        start = first + timedelta(seconds=rng.uniform(0, span))
+        windows.append((site_id, start, start + timedelta(seconds=window_seconds)))
+
+    def run_all():
+        results = []
+        it = iter(windows)
+
+        def one():
+            site_id, start, end = next(it)
+            results.append(len(list(response_time_range(site_id, start, end, using=using))))
+        return one, results
+
+    one, indexed_rows = run_all()
+    indexed = timed(one, repeat)
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DROP INDEX {INDEX_NAME}")
+    one, _ = run_all()
+    without_index = timed(one, repeat)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX {INDEX_NAME} ON myapp_responsetimelog (site_id, timestamp, response_time)"
+        )
+
+    return {
+        "window_seconds": window_seconds,
+        "avg_rows_per_query": round(sum(indexed_rows) / len(indexed_rows), 1),
+        "with_composite_index": indexed,
+        "fk_index_only": without_index,
+    }
+
+
+def _measure(fn):
+    """
+    fn 의 실행 시간(초, 추적 없이)과 tracemalloc 기준 최대 메모리(MB)를 측정.
+    """
+    t0 = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - t0
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(seconds, 3), "peak_mb": round(peak / 1024 / 1024, 1)}
+
+
+def bench_training_load(using, site_id):
+    """
+    학습 데이터 적재 비교: 모델 인스턴스 → dict 목록 → DataFrame (기존) vs values_list 스트리밍 → NumPy (현재).
+    """
+    import pandas as pd
+    from myapp.models import ResponseTimeLog
+    from myapp.ml.log_queries import stream_response_times
+    from myapp.ml.training import build_training_features
+
+    def legacy():
+        logs = ResponseTimeLog.objects.using(using).filter(site_id=site_id).order_by('timestamp')
+        logs.count()
+        data = [{"timestamp": log.timestamp, "response_time": log.response_time} for log in logs]
+        df = pd.DataFrame(data)
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['hour'] = df['timestamp'].dt.hour
+        df['dayofweek'] = df['timestamp'].dt.dayofweek
+        df['rolling_mean'] = df['response_time'].rolling(window=20, min_periods=1).mean()
+        df['rolling_std'] = df['response_time'].rolling(window=20, min_periods=1).std().fillna(0.0)
+        return df[['hour', 'dayofweek', 'rolling_mean', 'rolling_std']]
+
+    def streaming():
+        timestamps, values = stream_response_times(site_id, using=using)
+        return build_training_features(timestamps, values)
+
+    rows = ResponseTimeLog.objects.using(using).filter(site_id=site_id).count()
+    return {
+        "rows": rows,
+        "legacy_orm_dataframe": _measure(legacy),
+        "streaming_numpy": _measure(streaming),
+    }
+
+
+def bench_tree_eval(sizes=(1, 10, 100, 1000, 3600, 86400), repeat=20, seed=0):
+    """
+    XGBRegressor.predict vs FlatForest (tree_eval) 지연 시간/오차 비교.
+    flat_numpy 는 항상 평탄 평가, hybrid 는 FLAT_EVAL_MAX_ROWS 기준으로 XGBoost 에 위임하는 실제 추론 경로.
+    학습과 같은 설정(n_estimators=100)으로 합성 데이터에 모델을 학습해 사용한다.
+    """
+    from xgboost import XGBRegressor
+    from myapp.ml.tree_eval import compile_model
+    from myproject import settings
+
+    rng = np.random.default_rng(seed)
+
+    def features(n):
+        return np.c_[
+            rng.integers(0, 24, n), rng.integers(0, 7, n), rng.uniform(0, 3, n), rng.uniform(0, 1, n)
+        ].astype(np.float32)
+
+    X_train = features(50_000)
+    y_train = (0.5 + 0.1 * np.sin(X_train[:, 0]) + X_train[:, 2] * 0.3 + rng.normal(0, 0.1, len(X_train)))
+    model = XGBRegressor(n_estimators=100, random_state=42)
+    model.fit(X_train, y_train)
+    forest = compile_model(model, max_rows=settings.FLAT_EVAL_MAX_ROWS)
+
+    results = []
+    for n in sizes:
+        X = features(n)
+        expected = model.predict(X)
+        actual = forest.predict_flat(X)
+        runs = max(3, repeat if n <= 3600 else repeat // 4)
+        results.append({
+            "rows": n,
+            "xgboost_predict": timed(lambda: model.predict(X), runs),
+            "flat_numpy": timed(lambda: forest.predict_flat(X), runs),
+            "hybrid": timed(lambda: forest.predict(X), runs),
+            "max_abs_diff": float(np.abs(expected - actual).max()),
+        })
+    return {
+        "trees": forest.n_trees,
+        "max_depth": forest.max_depth,
+        "flat_max_rows": forest.max_rows,
+        "sizes": results,
+    }
+
+
+# --- 애플리케이션 경로 벤치마크 (합성 DB 를 'default' 로 사용) ----------------------
+
+@contextmanager
+def app_environment(using):
+    """
+    'default' DB 를 합성 DB 파일로 바꾸고 Redis/운영 모델 디렉터리 없이 동작하도록 설정을 덮어쓴다.
+    (DB 경로를 측정: 수집 버퍼/실시간 윈도우/결과 캐시는 끄고, 모델은 임시 디렉터리에 저장)
+    커넥션 설정 자체를 바꾸므로 다른 스레드(ASGI 핸들러, 추론 스레드 풀)도 합성 DB 를 사용한다.
+    애플리케이션 출력(print)은 JSON 결과와 섞이지 않도록 버린다.
+    """
+    from myproject import settings as project_settings
+
+    model_dir = tempfile.mkdtemp(prefix="traffic_bench_models_")
+    default = connections.databases['default']
+    original_name = default['NAME']
+    connections['default'].close()
+    default['NAME'] = connections.databases[using]['NAME']
+    try:
+        with override_settings(
+            CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+            INGEST_BUFFER_ENABLED=False, LIVE_WINDOW_ENABLED=False, RESULT_CACHE_ENABLED=False,
+            MODEL_STORAGE_DIR=model_dir, ALLOWED_HOSTS=['testserver'],
+        ), mock.patch.object(project_settings, 'MODEL_STORAGE_DIR', model_dir), \
+                redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        connections['default'].close()
+        default['NAME'] = original_name
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+
+def _history_end(using, site_id):
+    from myapp.models import ResponseTimeLog
+    return ResponseTimeLog.objects.using(using).filter(site_id=site_id).latest('timestamp').timestamp
+
+
+def bench_training(using, site_rows):
+    """
+    train_site_model (전체 학습) / update_site_model (최근 1분 추가 학습) 소요 시간.
+    추가 학습용으로 최근 1분에 1초 간격 샘플 60개를 넣는다.
+    """
+    from myapp.models import ResponseTimeLog
+    from myapp.ml.training import train_site_model, update_site_model
+
+    site_id, domain = site_rows[0]
+    rows = ResponseTimeLog.objects.using(using).filter(site_id=site_id).count()
+    t0 = time.perf_counter()
+    train_site_model(domain)
+    full_seconds = time.perf_counter() - t0
+
+    recent = datetime.now(timezone.utc)
+    ResponseTimeLog.objects.using(using).bulk_create([
+        ResponseTimeLog(site_id=site_id, timestamp=recent - timedelta(seconds=i), response_time=0.5)
+        for i in range(1, 61)
+    ])
+    update = _measure(lambda: update_site_model(domain, n_estimators=20))
+    return {
+        "rows": rows,
+        "train_site_model": {"seconds": round(full_seconds, 3)},
+        "update_site_model": update,
+    }
+
+
+def bench_rolling_stats(using, site_rows, windows=(60, 600, 3600, 86400), repeat=50, seed=0):
+    """
+    get_rolling_stats 지연 시간 (윈도우 길이별). 1시간 이상은 분/시간 집계 계층을 사용하므로 먼저 집계한다.
+    """
+    from myapp.ml import rollups
+    from myapp.ml.rolling_predict import get_rolling_stats
+
+    rng = random.Random(seed)
+    site_id, domain = site_rows[0]
+    t0 = time.perf_counter()
+    rollups.compact_site(site_id)
+    compact_seconds = time.perf_counter() - t0
+
+    end = _history_end(using, site_id)
+    results = {}
+    for window in windows:
+        points = iter([end - timedelta(seconds=rng.uniform(0, 86400 * 3)) for _ in range(repeat)])
+        results[str(window)] = timed(lambda: get_rolling_stats(domain, next(points), window), repeat)
+    return {"compact_seconds": round(compact_seconds, 3), "window_seconds": results}
+
+
+def bench_best_entry_time(using, site_rows, horizons=(60, 600, 1800, 3600), repeat=20):
+    """
+    find_best_entry_time 지연 시간 (현재 시각 ~ 발매 시각 간격별). 모델이 없으면 먼저 학습한다.
+    """
+    from myapp.ml import registry
+    from myapp.ml.rolling_predict import find_best_entry_time
+    from myapp.ml.training import train_site_model
+
+    site_id, domain = site_rows[0]
+    if registry.resolve_model_path(domain) is None:
+        train_site_model(domain)
+
+    current = _history_end(using, site_id) - timedelta(hours=2)
+    results = {}
+    for horizon in horizons:
+        release = current + timedelta(seconds=horizon)
+        find_best_entry_time(domain, current, release)  # 모델 로드/컴파일 제외
+        results[str(horizon)] = timed(lambda: find_best_entry_time(domain, current, release), repeat)
+    return {"horizon_seconds": results}
+
+
+def bench_best_entry_batch(using, site_rows, sizes=(1, 10, 30), repeat=5):
+    """
+    한 사이트의 발매 시각 N 개: find_best_entry_time 을 N 번 호출 vs find_best_entry_times 한 번.
+    """
+    from myapp.ml import registry
+    from myapp.ml.rolling_predict import find_best_entry_time, find_best_entry_times
+    from myapp.ml.training import train_site_model
+
+    site_id, domain = site_rows[0]
+    if registry.resolve_model_path(domain) is None:
+        train_site_model(domain)
+
+    current = _history_end(using, site_id) - timedelta(hours=2)
+    find_best_entry_time(domain, current, current + timedelta(minutes=10))  # 모델 로드/컴파일 제외
+    results = {}
+    for size in sizes:
+        releases = [current + timedelta(minutes=5 + 55 * i / max(size - 1, 1)) for i in range(size)]
+        results[str(size)] = {
+            "single": timed(lambda: [find_best_entry_time(domain, current, r) for r in releases], repeat),
+            "batch": timed(lambda: find_best_entry_times(domain, current, releases), repeat),
+        }
+    return {"releases": results}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    wbufsize = 1 << 16  # 헤더와 본문을 한 번에 보내 지연 ACK 대기(약 40ms)를 피한다
+    body = b"x" * 2048
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def bench_crawl_site(using, site_rows, repeat=50):
+    """
+    crawl_site (측정 + 결과 기록) 지연 시간. 로컬 스텁 HTTP 서버에 프록시 없이 요청한다.
+    """
+    import requests
+    from myapp import tasks
+    from myapp.models import ResponseTimeLog
+    from myapp.probe_timing import TimedHTTPAdapter
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    session = requests.Session()
+    session.mount("http://", TimedHTTPAdapter())
+    url = f"http://127.0.0.1:{server.server_port}/"
+
+    site_id, domain = site_rows[0]
+    before = ResponseTimeLog.objects.using(using).filter(site_id=site_id).count()
+    try:
+        with mock.patch.object(tasks, 'denormalize_domain_from_db', return_value=url), \
+                mock.patch.object(tasks.proxy_pool, 'choose', return_value=None), \
+                mock.patch.object(tasks.proxy_pool, 'session', return_value=session):
+            latency = timed(lambda: tasks.crawl_site(domain), repeat)
+    finally:
+        server.shutdown()
+        server.server_close()
+    recorded = ResponseTimeLog.objects.using(using).filter(site_id=site_id).count() - before
+    return {"crawl_site": latency, "recorded": recorded}
+
+
+def write_synthetic_csvs(folder, site_rows, rows, seed=0):
+    """
+    기존 합성 사이트 도메인 이름으로 import_csv 입력 CSV 생성 (사이트 생성 시그널을 피하기 위해).
+    """
+    rng = np.random.default_rng(seed)
+    per_site = max(1, rows // len(site_rows))
+    start = datetime(2020, 1, 1)
+    for _, domain in site_rows:
+        stamps = np.datetime64(start) + np.arange(per_site) * np.timedelta64(30, 's')
+        values = np.abs(rng.normal(0.5, 0.2, per_site)).round(3)
+        with open(os.path.join(folder, f"{domain}.csv"), 'w') as f:
+            f.write("timestamp,response_time\n")
+            f.writelines(f"{ts},{v}\n" for ts, v in zip(stamps.astype(str), values))
+
+
+def bench_import_csv(using, site_rows, rows=200_000, workers=None):
+    """
+    import_csv 처리량 (행/초). 재실행/--dedupe 경로(이미 있는 행 건너뛰기)도 함께 측정.
+    """
+    from myapp.models import ResponseTimeLog
+
+    folder = tempfile.mkdtemp(prefix="traffic_bench_csv_")
+    workers = workers or os.cpu_count() or 1
+    try:
+        write_synthetic_csvs(folder, site_rows, rows)
+        before = ResponseTimeLog.objects.using(using).count()
+        t0 = time.perf_counter()
+        call_command('import_csv', folder=folder, workers=workers, stdout=io.StringIO(), stderr=io.StringIO())
+        seconds = time.perf_counter() - t0
+        imported = ResponseTimeLog.objects.using(using).count() - before
+
+        t0 = time.perf_counter()
+        call_command('import_csv', folder=folder, workers=workers, restart=True, dedupe=True,
+                     stdout=io.StringIO(), stderr=io.StringIO())
+        dedupe_seconds = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    return {
+        "rows": imported,
+        "workers": workers,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(imported / seconds, 1) if seconds else None,
+        "dedupe_rerun_seconds": round(dedupe_seconds, 3),
+    }
+
+
+def bench_api_concurrency(using, site_rows, concurrency=(1, 8, 32), requests_per_level=64, horizon=600):
+    """
+    동시 요청 수별 best_entry_time 동기(DRF) 뷰 vs 비동기 뷰 지연 시간 분포.
+    두 뷰 모두 ASGI 핸들러(AsyncClient)를 거친다. 결과 캐시는 꺼져 있으므로 요청마다 모델 스캔을 수행하고,
+    비동기 뷰는 처리 중인 요청이 ASYNC_INFERENCE_MAX_INFLIGHT 를 넘으면 503 을 돌려준다 (rejected).
+    """
+    import asyncio
+    from django.test import AsyncClient
+    from myapp import views
+    from myapp.ml import registry
+    from myapp.ml.training import train_site_model
+
+    site_id, domain = site_rows[0]
+    if registry.resolve_model_path(domain) is None:
+        train_site_model(domain)
+    current = _history_end(using, site_id) - timedelta(hours=2)
+    payload = {
+        "site_domain": domain,
+        "current_time": current.isoformat(),
+        "release_time": (current + timedelta(seconds=horizon)).isoformat(),
+        "timezone": "UTC",
+    }
+
+    async def run(path, level):
+        client = AsyncClient()
+        gate = asyncio.Semaphore(level)
+        latencies, statuses = [], []
+
+        async def one():
+            async with gate:
+                t0 = time.perf_counter()
+                response = await client.post(path, payload, content_type='application/json')
+                latencies.append((time.perf_counter() - t0) * 1000)
+                statuses.append(response.status_code)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(requests_per_level)))
+        wall = time.perf_counter() - t0
+        ok = [ms for ms, code in zip(latencies, statuses) if code == 200]
+        result = _percentiles(ok) if ok else {"runs": 0}
+        result["rejected"] = statuses.count(503)
+        result["errors"] = len(statuses) - len(ok) - result["rejected"]
+        result["throughput_rps"] = round(len(ok) / wall, 1)
+        return result
+
+    results = {}
+    with mock.patch.object(views.activate_fast_mode, 'delay'):
+        for name, path in (("sync", "/api/best_entry_time/"), ("async", "/api/best_entry_time/async/")):
+            asyncio.run(run(path, 1))  # 모델 로드/스레드 풀 준비
+            results[name] = {str(level): asyncio.run(run(path, level)) for level in concurrency}
+    return {
+        "horizon_seconds": horizon,
+        "requests_per_level": requests_per_level,
+        "async_workers": settings.ASYNC_INFERENCE_WORKERS,
+        "async_max_inflight": settings.ASYNC_INFERENCE_MAX_INFLIGHT,
+        "concurrency": results,
+    }
@@ -0,0 +1,100 @@
+# crawl_scheduler.py: Redis sorted set 기반 정기 크롤링 스케줄러 (timing wheel)
+# - crawl:schedule       ZSET (member=도메인, score=다음 크롤링 예정 시각, epoch 초)
+# - crawl:min_interval   HASH (도메인 → 최소 크롤링 간격(초), 없으면 CRAWL_INTERVAL_MIN)
+# 매 tick 마다 예정 시각이 지난 사이트만 꺼내므로 비용은 O(log N + 도래한 사이트 수)이고,
+# 꺼내는 순간 다음 예정 시각으로 옮겨지므로 같은 사이트가 겹쳐서 예약되지 않는다.
+import random
+import time
+
+from django.conf import settings
+
+from myapp.models import Site
+from myapp.redis_client import redis_client
+
+SCHEDULE_KEY = "crawl:schedule"
+MIN_INTERVAL_KEY = "crawl:min_interval"
+
+# 도래한 사이트를 꺼내면서 다음 예정 시각(now + 최소 간격 + 지터)으로 옮긴다 (원자적)
+# KEYS: schedule, min_interval / ARGV: now, limit, default_min_interval, jitter...
+_POP_DUE_LUA = """
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+local now = tonumber(ARGV[1])
+for i, domain in ipairs(due) do
+  local interval = tonumber(redis.call('HGET', KEYS[2], domain) or ARGV[3])
+  redis.call('ZADD', KEYS[1], 'XX', now + interval + tonumber(ARGV[3 + i]), domain)
+end
+return due
+"""
+_pop_due_script = redis_client.register_script(_POP_DUE_LUA)
+
+
+def _jitter():
+    return random.uniform(0, settings.CRAWL_INTERVAL_MAX - settings.CRAWL_INTERVAL_MIN)
+
+
+def add_site(domain, due_at=None):
+    """
+    사이트를 스케줄에 추가 (이미 있으면 예정 시각을 바꾸지 않는다).
+    due_at 이 없으면 지금부터 한 주기 안의 임의 시각에 처음 크롤링해 부하를 분산한다.
+    """
+    if due_at is None:
+        due_at = time.time() + random.uniform(0, settings.CRAWL_INTERVAL_MAX)
+    redis_client.zadd(SCHEDULE_KEY, {domain: due_at}, nx=True)
+
+
+def remove_site(domain):
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrem(SCHEDULE_KEY, domain)
+    pipe.hdel(MIN_INTERVAL_KEY, domain)
+    pipe.execute()
+
+
+def set_min_interval(domain, seconds):
+    """
+    도메인별 최소 크롤링 간격 지정 (None 이면 기본값 CRAWL_INTERVAL_MIN 으로 되돌림)
+    """
+    if seconds is None:
+        redis_client.hdel(MIN_INTERVAL_KEY, domain)
+    else:
+        redis_client.hset(MIN_INTERVAL_KEY, domain, float(seconds))
+
+
+def sync_sites():
+    """
+    활성 사이트 목록과 스케줄을 맞춘다: 새 사이트는 추가하고, 비활성/삭제된 사이트는 제거.
+    (사이트 저장/삭제 시그널로도 갱신되므로 주기적 보정용)
+
+    Returns:
+        (int, int): 추가된 수, 제거된 수
+    """
+    active = set(Site.objects.filter(active=True).values_list('domain', flat=True))
+    scheduled = {member.decode() for member in redis_client.zrange(SCHEDULE_KEY, 0, -1)}
+
+    added = active - scheduled
+    removed = scheduled - active
+    now = time.time()
+    pipe = redis_client.pipeline(transaction=False)
+    for domain in added:
+        pipe.zadd(SCHEDULE_KEY, {domain: now + random.uniform(0, settings.CRAWL_INTERVAL_MAX)}, nx=True)
+    if removed:
+        pipe.zrem(SCHEDULE_KEY, *removed)
+        pipe.hdel(MIN_INTERVAL_KEY, *removed)
+    pipe.execute()
+    return len(added), len(removed)
+
+
+def pop_due(limit, now=None):
+    """
+    예정 시각이 지난 사이트를 최대 limit 개 꺼내고 다음 예정 시각으로 옮긴다.
+
+    Returns:
+        list[str]: 크롤링할 도메인
+    """
+    now = time.time() if now is None else now
+    args = [now, limit, settings.CRAWL_INTERVAL_MIN] + [_jitter() for _ in range(limit)]
+    due = _pop_due_script(keys=[SCHEDULE_KEY, MIN_INTERVAL_KEY], args=args)
+    return [domain.decode() for domain in due]
+
+
+def schedule_size():
+    return redis_client.zcard(SCHEDULE_KEY)
@@ -0,0 +1,207 @@
+# crawler.py: asyncio 기반 배치 크롤러 (여러 사이트를 동시에 측정)
+import asyncio
+import time
+
+import aiohttp
+from django.conf import settings
+from django.utils.timezone import now
+
+from myapp.ingest import enqueue_samples, resolve_site_id
+from myapp.metrics import crawl_failures, crawl_seconds
+from myapp.models import ProbeFailure
+from myapp.probe_timing import classify_aiohttp_error, phase_values, proxy_status, trace_config
+from myapp.proxy_pool import PROXY_AUTH, PROXY_LIST, is_proxy_failure, proxy_pool, proxy_url  # noqa: F401
+
+
+def get_random_proxy():
+    """프록시 풀에서 건강도 가중치로 프록시를 골라 requests 용 proxies dict 로 반환합니다."""
+    url = proxy_url(proxy_pool.choose())
+    return {"http": url, "https": url}
+
+
+def normalize_domain_for_db(domain: str) -> str:
+    """도메인을 데이터베이스에 저장하기 위해 정규화합니다."""
+    return domain.replace("https://", "").replace(".", "_")
+
+
+def denormalize_domain_from_db(domain: str) -> str:
+    """데이터베이스에서 도메인을 원래 형식으로 복원합니다."""
+    return f"https://{domain.replace('_', '.')}"
+
+
+def _build_sample(domain: str, response_time, status_code, timings=None, failure_class=None, proxy=None):
+    """
+    크롤링 결과를 버퍼에 넣을 샘플로 변환. 사이트가 없으면 None.
+    - 성공: response_time 과 단계별 시간(dns/connect/tls/ttfb), 상태 코드
+    - 실패(response_time == -1): failure_class, 실패까지 걸린 시간(elapsed) → ProbeFailure 로 기록
+    """
+    denormalized_domain = denormalize_domain_from_db(domain)
+    site_id = resolve_site_id(domain)
+    if site_id is None:
+        print(f"[ERROR] Site not found for domain: {domain}")
+        return None
+    timings = timings or {}
+    sample = {"site_id": site_id, "timestamp": now().isoformat(), "status_code": status_code}
+    if response_time == -1:
+        failure_class = failure_class or ProbeFailure.OTHER
+        print(f"[CRAWL] {denormalized_domain} => Failed to crawl ({failure_class})")
+        elapsed = timings.get("elapsed")
+        sample.update({
+            "failure_class": failure_class,
+            "elapsed": None if elapsed is None else round(elapsed, 6),
+            "proxy": proxy or "",
+        })
+        return sample
+    print(f"[CRAWL] {denormalized_domain} => {response_time:.3f}s (status: {status_code})")
+    sample["response_time"] = round(response_time, 6)
+    for field, value in phase_values(timings).items():
+        sample[field] = None if value is None else round(value, 6)
+    return sample
+
+
+def _observe(domain, proxy, sample):
+    """
+    사이트/프록시별 크롤링 지연 시간 또는 실패를 지표(/metrics)에 기록
+    """
+    proxy = proxy or "direct"
+    if "failure_class" in sample:
+        crawl_failures.inc(site=domain, proxy=proxy, failure_class=sample["failure_class"])
+    else:
+        crawl_seconds.observe(sample["response_time"], site=domain, proxy=proxy)
+
+
+def record_crawl_result(domain: str, response_time, status_code, timings=None, failure_class=None, proxy=None):
+    """
+    크롤링 결과를 수집 버퍼에 기록 (crawl_site 와 배치 크롤러가 공통으로 사용).
+    - 실패(response_time == -1)는 실패 분류와 함께 ProbeFailure 로 기록된다.
+    """
+    sample = _build_sample(domain, response_time, status_code, timings, failure_class, proxy)
+    if sample:
+        _observe(domain, proxy, sample)
+        enqueue_samples([sample])
+
+
+def record_crawl_results(results):
+    """
+    배치 크롤링 결과를 한 번에 버퍼에 기록.
+    """
+    samples = [
+        _build_sample(r["domain"], r["response_time"], r["status_code"],
+                      r.get("timings"), r.get("failure_class"), r.get("proxy"))
+        for r in results
+    ]
+    for r, sample in zip(results, samples):
+        if sample:
+            _observe(r["domain"], r.get("proxy"), sample)
+    enqueue_samples([s for s in samples if s])
+    record_proxy_outcomes(results)
+
+
+def record_proxy_outcomes(results):
+    """
+    프록시를 사용한 크롤링 결과를 프록시 풀 상태(EWMA/서킷)에 반영.
+    """
+    proxy_pool.record_many([
+        (r["proxy"],
+         not is_proxy_failure(r["response_time"], r["status_code"], r.get("failure_class"), r.get("timings")),
+         r["response_time"])
+        for r in results if r.get("proxy")
+    ])
+
+
+class CrawlEngine:
+    """
+    하나의 aiohttp 세션으로 여러 사이트를 동시에 측정하는 크롤 엔진.
+    - 동시 요청 수는 concurrency 로 제한
+    - 호스트(프록시)별 keep-alive 커넥션 풀을 재사용 (커넥션 키에 프록시가 포함되어 프록시별로 풀이 나뉜다)
+    - 프록시는 proxy_pool 이 건강도 기준으로 고르고, 결과는 record_crawl_results 에서 반영
+    - 요청마다 timeout 적용
+
+    사용 예:
+        async with CrawlEngine() as engine:
+            results = await engine.crawl(["kith_com", "undefeated_com"])
+    """
+
+    def __init__(self, concurrency=None, per_host_limit=None, timeout=None,
+                 use_proxy=None, url_builder=None):
+        self.concurrency = concurrency or settings.CRAWL_CONCURRENCY
+        self.per_host_limit = per_host_limit or settings.CRAWL_PER_HOST_LIMIT
+        self.timeout = timeout or settings.CRAWL_TIMEOUT
+        self.use_proxy = settings.CRAWL_USE_PROXY if use_proxy is None else use_proxy
+        self.url_builder = url_builder or denormalize_domain_from_db
+        self._session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host_limit,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            trace_configs=[trace_config()],
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._session.close()
+        self._session = None
+
+    async def probe(self, domain: str) -> dict:
+        """
+        한 사이트의 응답 시간을 측정. 실패 시 response_time = -1 과 failure_class.
+        단계별 시간(dns/connect/ttfb)은 TraceConfig 가 timings 에 기록한다 (probe_timing).
+        """
+        url = self.url_builder(domain)
+        timings = {}
+        failure_class = None
+
+        async with self._semaphore:
+            # 세마포어 안에서 골라야 대기 중 바뀐 서킷 상태가 반영된다
+            proxy = proxy_pool.choose() if self.use_proxy else None
+            t0 = time.monotonic()
+            try:
+                async with self._session.get(url, proxy=proxy_url(proxy) if proxy else None,
+                                             trace_request_ctx=timings) as response:
+                    await response.read()  # 본문 다운로드까지 포함 (crawl_site 와 동일)
+                    response_time = time.monotonic() - t0
+                    status_code = response.status
+            except (asyncio.TimeoutError, aiohttp.ClientError) as e:
+                failure_class = classify_aiohttp_error(e)
+                print(f"[ERROR] Failed to crawl {url} ({failure_class}): {e!r}")
+                timings["elapsed"] = time.monotonic() - t0
+                response_time, status_code = -1, proxy_status(e)
+
+        return {
+            "domain": domain,
+            "response_time": response_time,
+            "status_code": status_code,
+            "proxy": proxy,
+            "timings": timings,
+            "failure_class": failure_class,
+        }
+
+    async def crawl(self, domains) -> list:
+        return await asyncio.gather(*(self.probe(domain) for domain in domains))
+
+
+async def crawl_domains_async(domains, **engine_kwargs) -> list:
+    async with CrawlEngine(**engine_kwargs) as engine:
+        return await engine.crawl(domains)
+
+
+def crawl_domains(domains, **engine_kwargs) -> list:
+    """
+    여러 사이트를 동시에 크롤링하고 결과를 crawl_site 와 같은 방식으로 기록.
+    (ORM 은 동기 코드이므로 이벤트 루프가 끝난 뒤에 기록한다.)
+    """
+    domains = list(domains)
+    if not domains:
+        return []
+    results = asyncio.run(crawl_domains_async(domains, **engine_kwargs))
+    record_crawl_results(results)
+    return results
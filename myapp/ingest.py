@@ -0,0 +1,153 @@
+# ingest.py: ResponseTimeLog 수집 버퍼 (Redis 리스트 → 주기적 bulk_create)
+import json
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from myapp.live_window import push_samples
+from myapp.models import ProbeFailure, ResponseTimeLog, Site
+from myapp.probe_timing import PHASE_FIELDS
+from myapp.redis_client import redis_client
+
+BUFFER_KEY = "ingest:response_logs"
+FLUSH_LOCK_KEY = "ingest:flush_lock"
+SITE_ID_MAP_KEY = "ingest:site_id_map"
+
+
+def get_site_id_map(refresh=False):
+    """
+    domain → site_id 매핑 (공유 캐시에 보관, 없으면 한 번의 쿼리로 생성)
+    """
+    site_map = None if refresh else cache.get(SITE_ID_MAP_KEY)
+    if site_map is None:
+        site_map = dict(Site.objects.values_list('domain', 'id'))
+        cache.set(SITE_ID_MAP_KEY, site_map, timeout=settings.INGEST_SITE_MAP_TTL)
+    return site_map
+
+
+def resolve_site_id(domain):
+    """
+    캐시된 매핑으로 site_id 조회. 모르는 도메인이면 매핑을 한 번 갱신 후 재시도.
+    """
+    site_id = get_site_id_map().get(domain)
+    if site_id is None:
+        site_id = get_site_id_map(refresh=True).get(domain)
+    return site_id
+
+
+def _write_samples(samples):
+    """
+    샘플 목록을 하나의 트랜잭션에서 bulk_create. 삭제된 사이트의 샘플은 버린다.
+    - 성공 샘플 → ResponseTimeLog (단계별 시간 포함)
+    - 실패 샘플(failure_class 가 있는 것) → ProbeFailure
+    """
+    site_ids = {s["site_id"] for s in samples}
+    existing = set(Site.objects.filter(id__in=site_ids).values_list('id', flat=True))
+    logs, failures = [], []
+    for s in samples:
+        if s["site_id"] not in existing:
+            continue
+        timestamp = parse_datetime(s["timestamp"])
+        if s.get("failure_class"):
+            failures.append(ProbeFailure(
+                site_id=s["site_id"],
+                timestamp=timestamp,
+                failure_class=s["failure_class"],
+                status_code=s.get("status_code"),
+                elapsed=s.get("elapsed"),
+                proxy=s.get("proxy") or "",
+            ))
+        else:
+            logs.append(ResponseTimeLog(
+                site_id=s["site_id"],
+                timestamp=timestamp,
+                response_time=s["response_time"],
+                **{field: s.get(field) for field in PHASE_FIELDS},
+                status_code=s.get("status_code"),
+            ))
+    with transaction.atomic():
+        ResponseTimeLog.objects.bulk_create(logs, batch_size=settings.INGEST_BATCH_SIZE)
+        ProbeFailure.objects.bulk_create(failures, batch_size=settings.INGEST_BATCH_SIZE)
+    return len(logs) + len(failures)
+
+
+def enqueue_samples(samples):
+    """
+    샘플({"site_id", "timestamp", "response_time", ...} 또는 실패 샘플 {..., "failure_class"})을 버퍼에 추가.
+    - 같은 파이프라인에서 사이트별 실시간 롤링 윈도우(live_window)도 갱신한다.
+    - 버퍼가 꺼져 있거나 Redis 를 쓸 수 없으면 즉시 DB에 기록한다.
+    - 버퍼 길이가 배치 크기를 넘어서는 순간 flush 태스크를 바로 예약한다.
+    """
+    if not samples:
+        return
+    if not settings.INGEST_BUFFER_ENABLED:
+        _write_samples(samples)
+        push_samples(samples)
+        return
+
+    payload = [json.dumps(s) for s in samples]
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.rpush(BUFFER_KEY, *payload)
+        push_samples(samples, pipe=pipe)
+        results = pipe.execute(raise_on_error=False)
+    except redis.RedisError as e:
+        print(f"[WARNING] Ingest buffer unavailable, writing directly: {e}")
+        _write_samples(samples)
+        return
+
+    length = results[0]
+    if isinstance(length, Exception):
+        print(f"[WARNING] Ingest buffer unavailable, writing directly: {length}")
+        _write_samples(samples)
+        return
+    for error in results[1:]:
+        if isinstance(error, Exception):
+            print(f"[WARNING] Live window update failed: {error}")
+
+    batch_size = settings.INGEST_BATCH_SIZE
+    if length >= batch_size > length - len(payload):
+        from myapp.tasks import flush_response_logs  # 순환 import 방지
+        flush_response_logs.delay()
+
+
+def flush_buffer(max_batches=None):
+    """
+    버퍼의 샘플을 배치 단위로 DB에 기록.
+    - 한 번에 하나의 flusher 만 실행 (Redis 락)
+    - LRANGE → bulk_create → LTRIM 순서이므로 기록 전에 죽어도 샘플은 버퍼에 남는다
+      (최악의 경우 재시작 후 같은 배치가 한 번 더 기록될 수 있다: at-least-once)
+
+    Returns:
+        int: 기록한 샘플 수 (락을 얻지 못하면 0)
+    """
+    batch_size = settings.INGEST_BATCH_SIZE
+    lock = redis_client.lock(FLUSH_LOCK_KEY, timeout=settings.INGEST_FLUSH_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        return 0
+
+    written = 0
+    batches = 0
+    try:
+        while max_batches is None or batches < max_batches:
+            raw = redis_client.lrange(BUFFER_KEY, 0, batch_size - 1)
+            if not raw:
+                break
+            samples = [json.loads(item) for item in raw]
+            written += _write_samples(samples)
+            redis_client.ltrim(BUFFER_KEY, len(raw), -1)
+            batches += 1
+            lock.extend(settings.INGEST_FLUSH_LOCK_TIMEOUT, replace_ttl=True)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            pass
+    return written
+
+
+def buffer_length():
+    return redis_client.llen(BUFFER_KEY)
@@ -0,0 +1,151 @@
+# live_window.py: 사이트별 최근 응답 시간 슬라이딩 윈도우 (Redis)
+# 수집 경로(ingest.enqueue_samples)가 샘플마다 윈도우를 갱신하고, 추론 경로는 DB 대신 여기서 읽는다.
+# - live:samples:<site_id>  ZSET (score=epoch us, member="<epoch us>:<값>")
+# - live:stats:<site_id>    HASH (n, sum, sumsq, since=윈도우가 처음 채워지기 시작한 시각)
+# 두 키는 LIVE_WINDOW_SECONDS 동안 샘플이 없으면 만료되어 윈도우가 다시 cold 상태가 된다.
+from collections import defaultdict
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import now
+
+from myapp.ml.log_queries import to_epoch_us
+from myapp.redis_client import redis_client
+
+SAMPLES_KEY = "live:samples:{}"
+STATS_KEY = "live:stats:{}"
+
+# 샘플 추가 + 윈도우 밖 샘플 제거 + 누적합 갱신을 원자적으로 수행
+# KEYS: samples, stats / ARGV: cutoff_us, ttl_ms, since_us, (ts_us, value)...
+_PUSH_LUA = """
+local zkey, hkey = KEYS[1], KEYS[2]
+local n, s, sq = 0, 0, 0
+if redis.call('EXISTS', hkey) == 0 then
+  if #ARGV < 4 then
+    return {false, false, false, false}  -- 조회만 할 때는 키를 만들지 않는다
+  end
+  redis.call('HSET', hkey, 'since', ARGV[3])
+end
+for i = 4, #ARGV, 2 do
+  local v = tonumber(ARGV[i + 1])
+  if redis.call('ZADD', zkey, ARGV[i], ARGV[i] .. ':' .. ARGV[i + 1]) == 1 then
+    n = n + 1; s = s + v; sq = sq + v * v
+  end
+end
+local expired = redis.call('ZRANGEBYSCORE', zkey, '-inf', '(' .. ARGV[1])
+for _, member in ipairs(expired) do
+  local v = tonumber(string.match(member, ':(.+)$'))
+  n = n - 1; s = s - v; sq = sq - v * v
+end
+if #expired > 0 then
+  redis.call('ZREMRANGEBYSCORE', zkey, '-inf', '(' .. ARGV[1])
+end
+if redis.call('ZCARD', zkey) == 0 then
+  redis.call('HMSET', hkey, 'n', 0, 'sum', 0, 'sumsq', 0)
+else
+  redis.call('HINCRBY', hkey, 'n', n)
+  redis.call('HINCRBYFLOAT', hkey, 'sum', s)
+  redis.call('HINCRBYFLOAT', hkey, 'sumsq', sq)
+end
+redis.call('PEXPIRE', zkey, ARGV[2])
+redis.call('PEXPIRE', hkey, ARGV[2])
+return redis.call('HMGET', hkey, 'n', 'sum', 'sumsq', 'since')
+"""
+_push_script = redis_client.register_script(_PUSH_LUA)
+
+
+def _script_args(cutoff_us, since_us, points=()):
+    args = [cutoff_us, settings.LIVE_WINDOW_SECONDS * 1000, since_us]
+    for ts_us, value in points:
+        args.extend((ts_us, repr(float(value))))
+    return args
+
+
+def push_samples(samples, pipe=None):
+    """
+    수집 샘플({"site_id", "timestamp", "response_time", "ttfb", ...})로 사이트별 윈도우 갱신.
+    pipe 를 주면 해당 파이프라인에 스크립트 호출만 추가한다 (실행은 호출자 몫).
+    """
+    if not settings.LIVE_WINDOW_ENABLED or not samples:
+        return
+    # 모델이 학습하는 신호(MODEL_SIGNAL)만 보관, 실패 샘플이나 값이 없는 샘플은 제외
+    by_site = defaultdict(list)
+    for s in samples:
+        value = s.get(settings.MODEL_SIGNAL)
+        if value is not None and not s.get("failure_class"):
+            by_site[s["site_id"]].append((to_epoch_us(parse_datetime(s["timestamp"])), value))
+    if not by_site:
+        return
+
+    window_us = settings.LIVE_WINDOW_SECONDS * 1_000_000
+    client = pipe if pipe is not None else redis_client.pipeline(transaction=False)
+    for site_id, points in by_site.items():
+        newest = max(ts for ts, _ in points)
+        oldest = min(ts for ts, _ in points)
+        _push_script(
+            keys=[SAMPLES_KEY.format(site_id), STATS_KEY.format(site_id)],
+            args=_script_args(newest - window_us, oldest, points),
+            client=client,
+        )
+    if pipe is None:
+        try:
+            client.execute()
+        except redis.RedisError as e:
+            print(f"[WARNING] Live window update failed: {e}")
+
+
+def current_stats(site_id):
+    """
+    지금 시점 기준 최근 LIVE_WINDOW_SECONDS 구간의 (평균, 표준편차)를 O(1)로 반환.
+    윈도우가 cold(샘플 기록이 윈도우 길이만큼 이어지지 않음)거나 Redis 를 쓸 수 없으면 None.
+    """
+    if not settings.LIVE_WINDOW_ENABLED:
+        return None
+    now_us = to_epoch_us(now())
+    cutoff_us = now_us - settings.LIVE_WINDOW_SECONDS * 1_000_000
+    try:
+        n, total, total_sq, since = _push_script(
+            keys=[SAMPLES_KEY.format(site_id), STATS_KEY.format(site_id)],
+            args=_script_args(cutoff_us, now_us),
+        )
+    except redis.RedisError:
+        return None
+    if since is None or int(since) > cutoff_us:
+        return None
+    n = int(n or 0)
+    if n == 0:
+        return 0.0, 0.0
+    mean = float(total) / n
+    variance = max(float(total_sq) / n - mean * mean, 0.0)
+    return mean, variance ** 0.5
+
+
+def window_samples(site_id, start, end):
+    """
+    [start, end] 구간 샘플을 (timestamps(epoch us, int64), values(float64)) 로 반환.
+    구간 시작이 윈도우가 보장하는 범위(최근 LIVE_WINDOW_SECONDS, 기록 시작 이후) 밖이면 None → DB 사용.
+    """
+    if not settings.LIVE_WINDOW_ENABLED:
+        return None
+    start_us, end_us = to_epoch_us(start), to_epoch_us(end)
+    if start_us < to_epoch_us(now()) - settings.LIVE_WINDOW_SECONDS * 1_000_000:
+        return None
+    try:
+        pipe = redis_client.pipeline(transaction=True)
+        pipe.hget(STATS_KEY.format(site_id), 'since')
+        pipe.zrangebyscore(SAMPLES_KEY.format(site_id), start_us, end_us)
+        since, members = pipe.execute()
+    except redis.RedisError:
+        return None
+    if since is None or int(since) > start_us:
+        return None
+
+    timestamps = np.empty(len(members), dtype=np.int64)
+    values = np.empty(len(members), dtype=np.float64)
+    for i, member in enumerate(members):
+        ts, value = member.split(b':', 1)
+        timestamps[i] = int(ts)
+        values[i] = float(value)
+    return timestamps, values
@@ -1,16 +1,90 @@
+import io
+import json
+import multiprocessing
 import os
-import csv
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils.dateparse import parse_datetime
-from django.utils.timezone import make_aware
+from django.db import connections, transaction
+
+from myapp.ml.log_queries import response_time_range, to_epoch_us
 from myapp.models import Site, ResponseTimeLog
 
+PROGRESS_FILE = '.import_progress.json'
+
+
+def _read_header(path):
+    """
+    CSV 헤더 컬럼 목록과 헤더 다음 줄의 바이트 오프셋
+    """
+    with open(path, 'rb') as f:
+        header = f.readline()
+        return [c.strip() for c in header.decode('utf-8-sig').split(',')], f.tell()
+
+
+def _chunk_ranges(path, start, chunk_bytes):
+    """
+    [start, 파일 끝) 을 줄 경계에 맞춘 (start, end) 바이트 구간들로 나눈다.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()  # 줄 중간에서 끊기지 않도록 다음 줄 시작까지
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _parse_chunk(path, start, end, columns, time_zone):
+    """
+    (워커 프로세스) 파일의 바이트 구간을 파싱해 epoch 마이크로초/응답 시간 배열로 반환.
+    타임스탬프는 벡터화 파싱하며, 타임존이 없는 값은 TIME_ZONE 기준으로 해석한다.
+
+    Returns:
+        (np.ndarray[int64], np.ndarray[float64], int): timestamps, values, 건너뛴(잘못된) 행 수
+    """
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    df = pd.read_csv(io.BytesIO(data), names=columns, header=None,
+                     usecols=['timestamp', 'response_time'], dtype={'timestamp': str})
+
+    raw = df['timestamp'].str.strip()
+    ts = pd.to_datetime(raw, errors='coerce', format='ISO8601')
+    if not pd.api.types.is_datetime64_any_dtype(ts):
+        ts = pd.to_datetime(raw, errors='coerce', format='ISO8601', utc=True)  # 오프셋이 섞인 경우
+    if ts.dt.tz is None:
+        ts = ts.dt.tz_localize(time_zone, ambiguous='NaT', nonexistent='NaT')
+    values = pd.to_numeric(df['response_time'], errors='coerce')
+
+    valid = (ts.notna() & values.notna()).to_numpy()
+    timestamps = ts.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy().astype('datetime64[us]').astype(np.int64)
+    return timestamps[valid], values.to_numpy(dtype=np.float64)[valid], int((~valid).sum())
+
 
 class Command(BaseCommand):
-    help = "Import CSV logs into DB (initial)."
+    help = "Import CSV logs into DB (streaming, parallel parsing, resumable)."
 
     def add_arguments(self, parser):
         parser.add_argument('--folder', type=str, required=True, help="Path to the folder containing CSV files.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of parser processes.")
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per bulk_create batch.")
+        parser.add_argument('--chunk-mb', type=int, default=16, help="CSV bytes parsed per task (MB).")
+        parser.add_argument('--dedupe', action='store_true',
+                            help="Skip rows already present for the same (site, timestamp).")
+        parser.add_argument('--restart', action='store_true', help="Ignore saved progress and import from the start.")
+        parser.add_argument('--progress-file', type=str,
+                            help=f"Progress file (default: <folder>/{PROGRESS_FILE}).")
 
     def handle(self, *args, **options):
         folder = options['folder']
@@ -18,41 +92,126 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR(f"Folder not found: {folder}"))
             return
 
-        csv_files = [f for f in os.listdir(folder) if f.endswith('.csv')]
-        total_imported = 0
+        self.batch_size = options['batch_size']
+        self.dedupe = options['dedupe']
+        self.progress_path = options['progress_file'] or os.path.join(folder, PROGRESS_FILE)
+        self.progress = {} if options['restart'] else self._load_progress()
 
-        for fname in csv_files:
+        tasks = []  # (fname, site_id, file_path, columns, start, end, file_state)
+        for fname in sorted(f for f in os.listdir(folder) if f.endswith('.csv')):
             file_path = os.path.join(folder, fname)
+            columns, header_end = _read_header(file_path)
+            if 'timestamp' not in columns or 'response_time' not in columns:
+                self.stdout.write(self.style.ERROR(f"Missing timestamp/response_time columns: {fname}"))
+                continue
             site_domain = fname[:-4]  # Remove ".csv" from filename
             site_obj, created = Site.objects.get_or_create(domain=site_domain, defaults={"active": True})
 
-            bulk_objs = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)  # Use DictReader for header support
-                for row in reader:
-                    try:
-                        ts_str = row.get("timestamp", "").strip()  # Extract timestamp
-                        resp_str = row.get("response_time", "").strip()  # Extract response_time
-
-                        if not ts_str or not resp_str:
-                            continue  # Skip if required fields are missing
-
-                        dt = parse_datetime(ts_str)  # Parse timestamp to datetime
-                        if dt is not None:
-                            dt = make_aware(dt)  # Convert naive datetime to timezone-aware
-
-                        response_time = float(resp_str)  # Convert response_time to float
-                        bulk_objs.append(ResponseTimeLog(
-                            site=site_obj,
-                            timestamp=dt,
-                            response_time=response_time
-                        ))
-                    except Exception as e:
-                        self.stdout.write(self.style.ERROR(f"Error parsing row: {row} - {e}"))
-
-            ResponseTimeLog.objects.bulk_create(bulk_objs)
-            imported_count = len(bulk_objs)
-            total_imported += imported_count
-            self.stdout.write(self.style.SUCCESS(f"Imported {imported_count} logs for site: {site_domain}"))
-
-        self.stdout.write(self.style.SUCCESS(f"Total imported logs: {total_imported}"))
+            stat = os.stat(file_path)
+            file_state = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            saved = self.progress.get(fname)
+            offset = header_end
+            if saved and saved["size"] == stat.st_size and saved["mtime_ns"] == stat.st_mtime_ns:
+                offset = max(saved["offset"], header_end)
+            elif saved:
+                self.stdout.write(self.style.WARNING(f"{fname} changed since last run, importing from the start"))
+            if offset >= stat.st_size:
+                self.stdout.write(f"Already imported: {fname}")
+                continue
+            for start, end in _chunk_ranges(file_path, offset, options['chunk_mb'] * 1024 * 1024):
+                tasks.append((fname, site_obj.id, file_path, columns, start, end, file_state))
+
+        workers = max(1, min(options['workers'], len(tasks) or 1))
+        self.stderr.write(f"Importing {len(tasks)} chunks with {workers} parser processes")
+
+        self.totals = {"imported": 0, "invalid": 0, "duplicates": 0}
+        self.file_stats = {}
+        started = time.perf_counter()
+        # fork 된 자식 프로세스가 부모의 DB 커넥션을 공유하지 않도록 미리 닫는다
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('fork'),
+                                 initializer=connections.close_all) as pool:
+            # 파싱 결과는 제출 순서대로 반영하고(파일별 진행 오프셋이 연속되도록),
+            # 동시에 메모리에 올라오는 청크 수는 workers * 2 로 제한한다
+            pending = deque()
+            for task in tasks:
+                fname, site_id, file_path, columns, start, end, file_state = task
+                pending.append((task, pool.submit(_parse_chunk, file_path, start, end, columns, settings.TIME_ZONE)))
+                if len(pending) >= workers * 2:
+                    self._apply(*pending.popleft())
+            while pending:
+                self._apply(*pending.popleft())
+
+        for fname, stats in self.file_stats.items():
+            self._report(fname, stats)
+        elapsed = time.perf_counter() - started
+        rate = self.totals["imported"] / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Total imported logs: {self.totals['imported']} ({rate:,.0f} rows/s, "
+            f"invalid: {self.totals['invalid']}, duplicates: {self.totals['duplicates']})"
+        ))
+
+    def _apply(self, task, future):
+        """
+        파싱된 청크 하나를 배치 단위로 하나의 트랜잭션에서 저장하고 진행 오프셋 기록.
+        """
+        fname, site_id, file_path, columns, start, end, file_state = task
+        stats = self.file_stats.setdefault(
+            fname, {"imported": 0, "invalid": 0, "duplicates": 0, "started": time.perf_counter()}
+        )
+        timestamps, values, invalid = future.result()
+        duplicates = 0
+        if self.dedupe and len(timestamps):
+            timestamps, values, duplicates = self._drop_existing(site_id, timestamps, values)
+
+        moments = pd.to_datetime(timestamps, unit='us', utc=True).to_pydatetime()
+        with transaction.atomic():
+            for i in range(0, len(values), self.batch_size):
+                ResponseTimeLog.objects.bulk_create([
+                    ResponseTimeLog(site_id=site_id, timestamp=ts, response_time=float(v))
+                    for ts, v in zip(moments[i:i + self.batch_size], values[i:i + self.batch_size])
+                ])
+        self.progress[fname] = dict(file_state, offset=end)
+        self._save_progress()
+
+        for counts in (stats, self.totals):
+            counts["imported"] += len(values)
+            counts["invalid"] += invalid
+            counts["duplicates"] += duplicates
+        stats["finished"] = time.perf_counter()
+
+    def _drop_existing(self, site_id, timestamps, values):
+        """
+        청크 안의 중복과 DB 에 이미 있는 (site, timestamp) 행을 제외.
+        """
+        _, first = np.unique(timestamps, return_index=True)
+        first.sort()
+        bounds = pd.to_datetime([timestamps.min(), timestamps.max()], unit='us', utc=True).to_pydatetime()
+        existing = np.fromiter(
+            (to_epoch_us(ts) for (ts,) in response_time_range(site_id, bounds[0], bounds[1], fields=('timestamp',))),
+            dtype=np.int64,
+        )
+        keep = first[~np.isin(timestamps[first], existing)]
+        return timestamps[keep], values[keep], len(timestamps) - len(keep)
+
+    def _report(self, fname, stats):
+        elapsed = stats.get("finished", stats["started"]) - stats["started"]
+        rate = stats["imported"] / elapsed if elapsed > 0 else 0.0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} logs for site: {fname[:-4]} ({rate:,.0f} rows/s, "
+            f"invalid: {stats['invalid']}, duplicates: {stats['duplicates']})"
+        ))
+
+    def _load_progress(self):
+        try:
+            with open(self.progress_path) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_progress(self):
+        tmp = self.progress_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.progress, f)
+        os.replace(tmp, self.progress_path)
@@ -18,6 +18,12 @@ class Command(BaseCommand):
                 period=IntervalSchedule.SECONDS
             )
 
+            # 5초마다 실행되는 스케줄 생성 (수집 버퍼 flush)
+            schedule_flush, _ = IntervalSchedule.objects.get_or_create(
+                every=5,
+                period=IntervalSchedule.SECONDS
+            )
+
             # 주기적 작업 생성: schedule_regular_crawling
             PeriodicTask.objects.get_or_create(
                 interval=schedule_1min,
@@ -25,6 +31,41 @@ class Command(BaseCommand):
                 task="myapp.tasks.schedule_regular_crawling"
             )
 
+            # 주기적 작업 생성: dispatch_due_crawls (스케줄러 tick 과 같은 5초 간격 사용)
+            PeriodicTask.objects.get_or_create(
+                interval=schedule_flush,
+                name="Dispatch due crawls every 5 seconds",
+                task="myapp.tasks.dispatch_due_crawls"
+            )
+
+            # 주기적 작업 생성: flush_response_logs
+            PeriodicTask.objects.get_or_create(
+                interval=schedule_flush,
+                name="Flush response time logs every 5 seconds",
+                task="myapp.tasks.flush_response_logs"
+            )
+
+            # 주기적 작업 생성: compact_rollups
+            PeriodicTask.objects.get_or_create(
+                interval=schedule_1min,
+                name="Compact response time rollups every 1 minute",
+                task="myapp.tasks.compact_rollups"
+            )
+
+            # 주기적 작업 생성: prune_raw_logs
+            PeriodicTask.objects.get_or_create(
+                interval=schedule_24hours,
+                name="Prune raw response time logs every 24 hours",
+                task="myapp.tasks.prune_raw_logs"
+            )
+
+            # 주기적 작업 생성: archive_cold_logs
+            PeriodicTask.objects.get_or_create(
+                interval=schedule_24hours,
+                name="Archive cold response time logs every 24 hours",
+                task="myapp.tasks.archive_cold_logs"
+            )
+
             # 주기적 작업 생성: daily_train_models
             PeriodicTask.objects.get_or_create(
                 interval=schedule_24hours,
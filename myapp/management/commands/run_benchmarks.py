@@ -0,0 +1,97 @@
+import json
+import platform
+import subprocess
+import time
+
+from django.core.management.base import BaseCommand
+
+from myapp import benchmarks
+
+CASES = ['range_queries', 'training_load', 'tree_eval',
+         'training', 'rolling_stats', 'best_entry_time', 'best_entry_batch', 'api_concurrency',
+         'crawl_site', 'import_csv']
+DB_CASES = {'range_queries', 'training_load'}  # 합성 DB 가 필요한 케이스
+# 합성 DB 를 'default' 로 두고 애플리케이션 함수를 그대로 호출하는 케이스 (실행 순서대로)
+APP_CASES = ['training', 'rolling_stats', 'best_entry_time', 'best_entry_batch', 'api_concurrency',
+             'crawl_site', 'import_csv']
+
+
+class Command(BaseCommand):
+    help = "Run performance benchmarks against a temporary synthetic database and print JSON results."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='*', choices=CASES, help="Benchmark cases to run (default: all).")
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Total synthetic ResponseTimeLog rows.")
+        parser.add_argument('--sites', type=int, default=10, help="Number of synthetic sites.")
+        parser.add_argument('--interval', type=int, default=60, help="Seconds between synthetic samples.")
+        parser.add_argument('--shape', choices=benchmarks.SHAPES, default='daily',
+                            help="Shape of the synthetic response time series.")
+        parser.add_argument('--import-rows', type=int, default=200_000, help="Rows written for the import_csv case.")
+        parser.add_argument('--repeat', type=int, default=50, help="Repetitions per measurement.")
+        parser.add_argument('--output', type=str, help="Write JSON results to this file as well.")
+
+    def _git_commit(self):
+        try:
+            return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        cases = options['only'] or CASES
+        report = {
+            "commit": self._git_commit(),
+            "python": platform.python_version(),
+            "params": {k: options[k] for k in ('rows', 'sites', 'interval', 'shape', 'import_rows', 'repeat')},
+            "results": {},
+        }
+
+        if DB_CASES.intersection(cases) or set(APP_CASES).intersection(cases):
+            with benchmarks.synthetic_database() as using:
+                t0 = time.perf_counter()
+                site_rows = benchmarks.generate_history(
+                    using, sites=options['sites'], rows=options['rows'],
+                    interval_seconds=options['interval'], shape=options['shape'],
+                )
+                report["generate_seconds"] = round(time.perf_counter() - t0, 2)
+                self.stderr.write(f"Generated {options['rows']} rows in {report['generate_seconds']}s")
+
+                if 'range_queries' in cases:
+                    report["results"]["range_queries"] = benchmarks.bench_range_queries(
+                        using, site_rows, repeat=options['repeat']
+                    )
+                if 'training_load' in cases:
+                    report["results"]["training_load"] = benchmarks.bench_training_load(using, site_rows[0][0])
+
+                with benchmarks.app_environment(using):
+                    for case in APP_CASES:
+                        if case not in cases:
+                            continue
+                        self.stderr.write(f"Running {case}")
+                        if case == 'training':
+                            result = benchmarks.bench_training(using, site_rows)
+                        elif case == 'rolling_stats':
+                            result = benchmarks.bench_rolling_stats(using, site_rows, repeat=options['repeat'])
+                        elif case == 'best_entry_time':
+                            result = benchmarks.bench_best_entry_time(
+                                using, site_rows, repeat=max(3, options['repeat'] // 5)
+                            )
+                        elif case == 'best_entry_batch':
+                            result = benchmarks.bench_best_entry_batch(
+                                using, site_rows, repeat=max(3, options['repeat'] // 5)
+                            )
+                        elif case == 'api_concurrency':
+                            result = benchmarks.bench_api_concurrency(using, site_rows)
+                        elif case == 'crawl_site':
+                            result = benchmarks.bench_crawl_site(using, site_rows, repeat=options['repeat'])
+                        else:
+                            result = benchmarks.bench_import_csv(using, site_rows, rows=options['import_rows'])
+                        report["results"][case] = result
+
+        if 'tree_eval' in cases:
+            report["results"]["tree_eval"] = benchmarks.bench_tree_eval(repeat=options['repeat'])
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
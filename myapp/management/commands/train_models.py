@@ -0,0 +1,41 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from myapp.ml.training import run_training_job, summarize_training_results
+from myapp.models import Site
+
+
+class Command(BaseCommand):
+    help = "Train site models in parallel with a local process pool and print a JSON summary."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--domains', nargs='*', help="Site domains to train (default: all active sites).")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of worker processes.")
+        parser.add_argument('--threads-per-job', type=int,
+                            help="XGBoost threads per job (default: cores / workers).")
+
+    def handle(self, *args, **options):
+        domains = options['domains'] or list(
+            Site.objects.filter(active=True).values_list('domain', flat=True)
+        )
+        workers = max(1, min(options['workers'], len(domains) or 1))
+        n_jobs = options['threads_per_job'] or max(1, (os.cpu_count() or 1) // workers)
+        self.stderr.write(f"Training {len(domains)} sites with {workers} workers x {n_jobs} threads")
+
+        # fork 된 자식 프로세스가 부모의 DB 커넥션을 공유하지 않도록 미리 닫는다
+        connections.close_all()
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context('fork'),
+                                 initializer=connections.close_all) as pool:
+            results = list(pool.map(run_training_job, domains, [n_jobs] * len(domains)))
+
+        summary = summarize_training_results(results, time.perf_counter() - started)
+        self.stdout.write(json.dumps(summary, indent=2))
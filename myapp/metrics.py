@@ -0,0 +1,392 @@
+# metrics.py: Prometheus 텍스트 형식 지표 (/metrics)
+# - 프로세스(웹 워커, Celery 워커)마다 증가분을 메모리에 모으고, 백그라운드 스레드가 METRICS_FLUSH_INTERVAL 초마다
+#   Redis HASH(metrics:<이름>)에 HINCRBYFLOAT 로 합친다 → 모든 프로세스의 합계를 한 곳에서 노출
+#   (요청/크롤링/이벤트 루프 경로는 메모리 증가만 하고 Redis 를 기다리지 않는다.
+#    Celery 태스크가 끝나면 flush 스레드를 깨우고, Redis 를 못 쓰면 증가분을 보관했다가 다음 flush 때 재시도)
+# - /metrics 는 Redis 합계 + result_cache / retrain / proxy_pool / model_cache 상태(gauge)를 렌더링
+#   스크레이퍼(METRICS_ALLOWED_IPS 또는 METRICS_TOKEN)만 접근 가능 (scraper_only, 다른 지표 API 도 동일)
+import atexit
+import contextvars
+import functools
+import hmac
+import ipaddress
+import os
+import threading
+import time
+
+import redis
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse, JsonResponse
+
+from myapp.redis_client import redis_client
+
+KEY_PREFIX = "metrics:"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_pending = {}  # (이름, 필드) → 아직 Redis 에 반영하지 않은 증가분
+_lock = threading.Lock()
+_flush_wakeup = threading.Event()
+_flusher_pid = None  # flush 스레드를 띄운 프로세스 (fork 된 자식은 새로 띄운다)
+_metrics = {}  # 이름 → 지표 객체 (렌더링 순서 유지)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _label_text(labels):
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+
+def _add(name, field, amount):
+    with _lock:
+        _pending[(name, field)] = _pending.get((name, field), 0.0) + amount
+    _ensure_flusher()
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        _metrics[name] = self
+
+    def inc(self, amount=1.0, **labels):
+        if settings.METRICS_ENABLED:
+            _add(self.name, _label_text((k, labels[k]) for k in self.labelnames), amount)
+
+    def render(self, values):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(values.items()):
+            lines.append(f"{self.name}{{{labels}}} {_number(value)}" if labels else f"{self.name} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    버킷별 개수(누적 아님)와 sum/count 를 저장하고, 렌더링할 때 누적 버킷으로 바꾼다.
+    필드 형식: "<bucket 인덱스 | sum | count>|<라벨>"
+    """
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help_text, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        _metrics[name] = self
+
+    def observe(self, value, **labels):
+        if not settings.METRICS_ENABLED:
+            return
+        label_text = _label_text((k, labels[k]) for k in self.labelnames)
+        index = next((i for i, upper in enumerate(self.buckets) if value <= upper), len(self.buckets))
+        _add(self.name, f"{index}|{label_text}", 1)
+        _add(self.name, f"sum|{label_text}", value)
+        _add(self.name, f"count|{label_text}", 1)
+
+    def render(self, values):
+        series = {}
+        for field, value in values.items():
+            kind, label_text = field.split("|", 1)
+            series.setdefault(label_text, {})[kind] = value
+
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_text, parts in sorted(series.items()):
+            prefix = f"{label_text}," if label_text else ""
+            cumulative = 0.0
+            for i, upper in enumerate(self.buckets):
+                cumulative += parts.get(str(i), 0.0)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{upper:g}"}} {_number(cumulative)}')
+            count = parts.get("count", 0.0)
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {_number(count)}')
+            suffix = f"{{{label_text}}}" if label_text else ""
+            lines.append(f"{self.name}_sum{suffix} {_number(parts.get('sum', 0.0))}")
+            lines.append(f"{self.name}_count{suffix} {_number(count)}")
+        return lines
+
+
+# --- 지표 정의 ----------------------------------------------------------------
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "API view latency.", ("view", "method", "status"))
+http_db_queries = Histogram(
+    "http_request_db_queries", "DB queries executed per request.", ("view",), buckets=QUERY_BUCKETS)
+task_seconds = Histogram(
+    "celery_task_duration_seconds", "Celery task run time.", ("task", "outcome"), buckets=TASK_BUCKETS)
+tasks_total = Counter("celery_tasks_total", "Celery task runs by outcome.", ("task", "outcome"))
+model_load_seconds = Histogram("model_load_seconds", "Model file load (and compile) time.", ("kind",))
+model_cache_requests = Counter("model_cache_requests_total", "Model cache lookups.", ("result",))
+crawl_seconds = Histogram("crawl_response_seconds", "Crawl response time.", ("site", "proxy"))
+crawl_failures = Counter("crawl_failures_total", "Failed crawl probes.", ("site", "proxy", "failure_class"))
+
+
+# --- Redis 집계 ---------------------------------------------------------------
+
+def _flush_loop():
+    while True:
+        _flush_wakeup.wait(settings.METRICS_FLUSH_INTERVAL)
+        _flush_wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            print(f"[WARNING] Metrics flush failed: {e}")
+
+
+def _ensure_flusher():
+    """
+    이 프로세스의 flush 스레드가 없으면 시작 (첫 증가 시, fork 후 자식에서 다시)
+    """
+    global _flusher_pid
+    pid = os.getpid()
+    if _flusher_pid == pid:
+        return
+    with _lock:
+        if _flusher_pid == pid:
+            return
+        _flusher_pid = pid
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def _reset_after_fork():
+    global _lock, _flush_wakeup
+    _lock = threading.Lock()  # fork 시점에 다른 스레드가 잡고 있었을 수 있다
+    _flush_wakeup = threading.Event()
+    _pending.clear()  # 부모의 증가분은 부모가 반영한다
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def flush():
+    """
+    이 프로세스에 모인 증가분을 Redis 에 반영. 실패하면 다음 flush 때 다시 시도한다.
+    (flush 스레드, /metrics, 프로세스 종료 시에만 호출)
+    """
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if not pending:
+        return
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for (name, field), amount in pending.items():
+            pipe.hincrbyfloat(KEY_PREFIX + name, field, amount)
+        pipe.execute()
+    except redis.RedisError:
+        with _lock:
+            for key, amount in pending.items():
+                _pending[key] = _pending.get(key, 0.0) + amount
+
+
+atexit.register(flush)
+
+
+def collect():
+    """
+    지표 이름 → {필드: 값}. Redis 합계에 아직 flush 되지 않은 이 프로세스 증가분을 더한다.
+    """
+    values = {name: {} for name in _metrics}
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for name in _metrics:
+            pipe.hgetall(KEY_PREFIX + name)
+        for name, raw in zip(_metrics, pipe.execute()):
+            values[name] = {field.decode(): float(value) for field, value in raw.items()}
+    except redis.RedisError:
+        pass
+    with _lock:
+        for (name, field), amount in _pending.items():
+            if name in values:
+                values[name][field] = values[name].get(field, 0.0) + amount
+    return values
+
+
+def _gauges(name, help_text, samples):
+    """
+    samples: [(라벨 튜플, 값)] → gauge 텍스트 줄
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    for labels, value in samples:
+        if value is None:
+            continue
+        label_text = _label_text(labels)
+        lines.append(f"{name}{{{label_text}}} {_number(value)}" if label_text else f"{name} {_number(value)}")
+    return lines
+
+
+def _state_gauges():
+    """
+    다른 모듈이 이미 관리하는 상태 (조회 실패한 항목은 건너뛴다)
+    """
+    from myapp import result_cache
+    from myapp.ml import retrain
+    from myapp.ml.model_cache import model_cache
+    from myapp.proxy_pool import proxy_pool
+
+    lines = []
+    cache_stats = model_cache.stats()
+    lines += _gauges("model_cache_size", "Models held in this process's cache.", [((), cache_stats["size"])])
+    try:
+        stats = result_cache.stats()
+        lines += _gauges("result_cache_events", "best_entry_time result cache events.",
+                         [((("event", key),), stats[key]) for key in ("hits", "misses", "coalesced", "bypass")
+                          if key in stats])
+    except redis.RedisError:
+        pass
+    try:
+        stats = retrain.stats()
+        lines += _gauges("retrain_events", "Fast-mode retrain coordinator events.",
+                         [((("event", key),), value) for key, value in stats.items() if key != "queue_depth"])
+        lines += _gauges("retrain_queue_depth", "Sites waiting for a retrain.", [((), stats["queue_depth"])])
+    except redis.RedisError:
+        pass
+    proxies = proxy_pool.metrics()
+    lines += _gauges("proxy_success_rate", "Proxy success rate EWMA.",
+                     [((("proxy", p["proxy"]),), p["success_rate"]) for p in proxies])
+    lines += _gauges("proxy_latency_seconds", "Proxy latency EWMA.",
+                     [((("proxy", p["proxy"]),), p["latency_ewma"]) for p in proxies])
+    lines += _gauges("proxy_circuit_open", "1 if the proxy circuit is not closed.",
+                     [((("proxy", p["proxy"]),), 0 if p["state"] == "closed" else 1) for p in proxies])
+    return lines
+
+
+def render():
+    values = collect()
+    lines = []
+    for name, metric in _metrics.items():
+        lines += metric.render(values[name])
+    lines += _state_gauges()
+    return "\n".join(lines) + "\n"
+
+
+def scraper_allowed(request):
+    """
+    METRICS_ALLOWED_IPS(IP/CIDR)에서 온 요청이거나 Authorization: Bearer <METRICS_TOKEN> 이 맞으면 True
+    """
+    token = settings.METRICS_TOKEN
+    auth = request.META.get("HTTP_AUTHORIZATION", "")
+    if token and auth.startswith("Bearer ") and hmac.compare_digest(auth[7:], token):
+        return True
+    try:
+        addr = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(addr in ipaddress.ip_network(net, strict=False) for net in settings.METRICS_ALLOWED_IPS)
+
+
+def scraper_only(view):
+    """
+    지표/상태 엔드포인트를 스크레이퍼에게만 허용 (그 외 403)
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not scraper_allowed(request):
+            return JsonResponse({"error": "Forbidden"}, status=403)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+@scraper_only
+def metrics_view(request):
+    """
+    Prometheus 스크레이프 엔드포인트
+    """
+    flush()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+# --- 계측 훅 ------------------------------------------------------------------
+
+# 요청당 DB 쿼리 수: 모든 커넥션에 설치한 execute wrapper 가 현재 컨텍스트의 카운터를 올린다
+# (ContextVar 이므로 sync_to_async / copy_context 로 넘긴 작업 스레드의 쿼리도 같은 요청으로 집계)
+_query_counter = contextvars.ContextVar("metrics_query_counter", default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _query_counter.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def _install_query_counter(sender, connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class MetricsMiddleware:
+    """
+    뷰별 응답 시간과 요청당 DB 쿼리 수 기록 (/metrics 자신은 제외).
+    동기/비동기 모두 지원하므로 ASGI 의 비동기 뷰를 스레드로 감싸지 않는다.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+        token = _query_counter.set([0])
+        counter = _query_counter.get()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _query_counter.reset(token)
+        self._record(request, response, time.perf_counter() - started, counter[0])
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+        token = _query_counter.set([0])
+        counter = _query_counter.get()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _query_counter.reset(token)
+        self._record(request, response, time.perf_counter() - started, counter[0])
+        return response
+
+    def _record(self, request, response, elapsed, queries):
+        match = getattr(request, "resolver_match", None)
+        view = match.url_name if match and match.url_name else "unmatched"
+        if view != "metrics":
+            http_request_seconds.observe(elapsed, view=view, method=request.method, status=response.status_code)
+            http_db_queries.observe(queries, view=view)
+
+
+_task_started = {}
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started.pop(task_id, None)
+    if started is None or task is None:
+        return
+    outcome = (state or "unknown").lower()
+    task_seconds.observe(time.perf_counter() - started, task=task.name, outcome=outcome)
+    tasks_total.inc(task=task.name, outcome=outcome)
+    _flush_wakeup.set()  # 태스크가 드문 워커도 곧바로 반영되도록 flush 스레드를 깨운다
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.18 on 2026-10-18 00:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='responsetimelog',
+            index=models.Index(fields=['site', 'timestamp', 'response_time'], name='rtlog_site_ts_idx'),
+        ),
+    ]
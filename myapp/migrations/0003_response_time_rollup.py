@@ -0,0 +1,33 @@
+# Generated by Django 4.2.18 on 2026-10-18 00:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_response_time_log_site_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResponseTimeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tier', models.CharField(choices=[('minute', 'Minute'), ('hour', 'Hour')], max_length=10)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.IntegerField()),
+                ('total', models.FloatField()),
+                ('sum_sq', models.FloatField()),
+                ('min_value', models.FloatField()),
+                ('max_value', models.FloatField()),
+                ('histogram', models.JSONField(default=dict)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.site')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='responsetimerollup',
+            constraint=models.UniqueConstraint(fields=('site', 'tier', 'bucket_start'), name='rollup_site_tier_bucket_uniq'),
+        ),
+    ]
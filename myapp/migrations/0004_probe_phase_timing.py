@@ -0,0 +1,54 @@
+# Generated by Django 4.2.18 on 2026-10-18 01:29
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0003_response_time_rollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsetimelog',
+            name='connect_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='responsetimelog',
+            name='dns_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='responsetimelog',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='responsetimelog',
+            name='tls_time',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='responsetimelog',
+            name='ttfb',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ProbeFailure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField()),
+                ('failure_class', models.CharField(choices=[('timeout', 'Timeout'), ('ssl', 'SSL error'), ('connection', 'Connection error'), ('proxy', 'Proxy error'), ('other', 'Other')], max_length=16)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('elapsed', models.FloatField(blank=True, null=True)),
+                ('proxy', models.CharField(blank=True, default='', max_length=64)),
+                ('site', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='myapp.site')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['site', 'timestamp'], name='probefail_site_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.18 on 2026-10-18 02:12
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def mark_existing_rollups(apps, schema_editor):
+    # 기존 분 집계는 워터마크 이전의 로그를 모두 포함한 것으로 본다 (이전 동작과 같은 가정)
+    ResponseTimeLog = apps.get_model('myapp', 'ResponseTimeLog')
+    ResponseTimeRollup = apps.get_model('myapp', 'ResponseTimeRollup')
+    minutes = ResponseTimeRollup.objects.filter(tier='minute')
+    for site_id, last in minutes.values('site_id').annotate(last=Max('bucket_start')).values_list('site_id', 'last'):
+        max_id = ResponseTimeLog.objects.filter(
+            site_id=site_id, timestamp__lt=last + timedelta(seconds=60)
+        ).aggregate(max_id=Max('id'))['max_id']
+        if max_id:
+            minutes.filter(site_id=site_id).update(max_log_id=max_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0004_probe_phase_timing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='responsetimerollup',
+            name='max_log_id',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_existing_rollups, migrations.RunPython.noop),
+    ]
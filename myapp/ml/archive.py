@@ -0,0 +1,196 @@
+# archive.py: 오래된 ResponseTimeLog 를 사이트/일(UTC) 단위 컬럼 파일로 보관하는 콜드 저장소
+# - <LOG_ARCHIVE_DIR>/<site_id>/<YYYYMMDD>/<컬럼>.npy
+#   timestamp: epoch 마이크로초 int64 (정렬됨), 그 외 컬럼: float64 (비어 있는 값은 NaN)
+# - 읽을 때는 np.load(mmap_mode='r') 로 메모리 매핑하므로 필요한 구간의 페이지만 디스크에서 읽힌다
+#   (압축 파일(npz)은 메모리 매핑이 안 되므로 압축하지 않는다)
+# - 날짜 디렉터리는 임시 디렉터리에 쓴 뒤 rename 으로 게시한다
+#   (이미 보관된 날에 늦게 들어온 행은 그날 파일에 합쳐 다시 게시한다)
+# 어떤 날을 옮길지(정책)는 rollups.archive_cold_logs 가 정한다.
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.conf import settings
+
+from myapp.models import ResponseTimeLog
+from .log_queries import stream_response_times, to_epoch_us
+
+ARCHIVE_COLUMNS = ('response_time', 'dns_time', 'connect_time', 'tls_time', 'ttfb', 'status_code')
+DAY_FORMAT = '%Y%m%d'
+
+
+def site_dir(site_id):
+    return os.path.join(settings.LOG_ARCHIVE_DIR, str(site_id))
+
+
+def day_start(day):
+    """
+    'YYYYMMDD' → 그날 0시(UTC)
+    """
+    return datetime.strptime(day, DAY_FORMAT).replace(tzinfo=timezone.utc)
+
+
+def day_name(dt):
+    return dt.astimezone(timezone.utc).strftime(DAY_FORMAT)
+
+
+def archived_days(site_id):
+    """
+    게시된 날짜 디렉터리 이름(YYYYMMDD) 목록 (오름차순, 쓰는 중인 임시 디렉터리 제외)
+    """
+    try:
+        names = os.listdir(site_dir(site_id))
+    except FileNotFoundError:
+        return []
+    return sorted(name for name in names if len(name) == 8 and name.isdigit())
+
+
+def archived_until(site_id):
+    """
+    아카이브가 덮는 구간의 끝 (마지막 보관일 다음 날 0시 UTC). 아카이브가 없으면 None.
+    이 시각 이전의 로그는 DB 가 아니라 아카이브에서 읽는다.
+    """
+    days = archived_days(site_id)
+    return day_start(days[-1]) + timedelta(days=1) if days else None
+
+
+def read_day(site_id, day):
+    """
+    게시된 하루치 컬럼 배열 dict (보관되지 않은 날이면 None)
+    """
+    path = os.path.join(site_dir(site_id), day)
+    if not os.path.isdir(path):
+        return None
+    return {name: np.load(os.path.join(path, f'{name}.npy')) for name in ('timestamp',) + ARCHIVE_COLUMNS}
+
+
+def _publish(final, arrays):
+    tmp = final + '.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp, f'{name}.npy'), array)
+    if not os.path.isdir(final):
+        os.replace(tmp, final)
+        return
+    # 디렉터리는 덮어쓸 수 없으므로 기존 날을 옆으로 옮긴 뒤 교체 (이미 열린 mmap 은 그대로 유효)
+    old = final + '.old'
+    shutil.rmtree(old, ignore_errors=True)
+    os.replace(final, old)
+    os.replace(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def write_day(site_id, day, start, end):
+    """
+    [start, end) 구간(하루)의 DB 로그를 그날의 컬럼 파일로 게시.
+    이미 보관된 날이면 아카이브에 없는 행(늦게 들어온 행)만 합쳐 다시 쓴다.
+    (site, timestamp) 를 행 식별자로 본다 (import_csv --dedupe 와 같은 규칙).
+    게시한 파일을 다시 읽어 행 수와 처음/마지막 시각이 기대와 같은지 확인한 뒤에만 삭제할 id 를 돌려준다.
+
+    Returns:
+        (int, list): 새로 보관한 행 수, 아카이브에 들어 있음이 확인된 DB 행 id
+    """
+    rows = list(
+        ResponseTimeLog.objects.filter(site_id=site_id, timestamp__gte=start, timestamp__lt=end)
+        .order_by('timestamp')
+        .values_list('id', 'timestamp', *ARCHIVE_COLUMNS)
+    )
+    if not rows:
+        return 0, []
+
+    columns = list(zip(*rows))
+    ids = list(columns[0])
+    arrays = {'timestamp': np.array([to_epoch_us(ts) for ts in columns[1]], dtype=np.int64)}
+    for name, values in zip(ARCHIVE_COLUMNS, columns[2:]):
+        arrays[name] = np.array(values, dtype=np.float64)  # None → NaN
+
+    new_rows = len(rows)
+    existing = read_day(site_id, day)
+    if existing is not None:
+        fresh = ~np.isin(arrays['timestamp'], existing['timestamp'])
+        new_rows = int(fresh.sum())
+        if not new_rows:  # 게시 후 DB 삭제 전에 중단된 날: 모두 이미 보관됨
+            return 0, ids
+        merged = {name: np.concatenate([existing[name], arrays[name][fresh]]) for name in existing}
+        order = np.argsort(merged['timestamp'], kind='stable')
+        arrays = {name: values[order] for name, values in merged.items()}
+
+    final = os.path.join(site_dir(site_id), day)
+    _publish(final, arrays)
+
+    published = np.load(os.path.join(final, 'timestamp.npy'), mmap_mode='r')
+    expected = arrays['timestamp']
+    if len(published) != len(expected) or published[0] != expected[0] or published[-1] != expected[-1]:
+        raise RuntimeError(f"Archive verification failed for site {site_id}, day {day}")
+    return new_rows, ids
+
+
+def read_archive(site_id, start=None, end=None, value_field='response_time', dtype=np.float64):
+    """
+    아카이브에서 [start, end] 구간을 (epoch 마이크로초 int64, value_field 값) 배열로 반환.
+    값이 비어 있는(NaN) 행은 제외한다 (DB 조회와 같은 규칙).
+    """
+    start_us = None if start is None else to_epoch_us(start)
+    end_us = None if end is None else to_epoch_us(end)
+    ts_parts, value_parts = [], []
+    for day in archived_days(site_id):
+        first = day_start(day)
+        if end is not None and first > end:
+            break
+        if start is not None and first + timedelta(days=1) <= start:
+            continue
+        path = os.path.join(site_dir(site_id), day)
+        timestamps = np.load(os.path.join(path, 'timestamp.npy'), mmap_mode='r')
+        values = np.load(os.path.join(path, f'{value_field}.npy'), mmap_mode='r')
+        lo = 0 if start_us is None else np.searchsorted(timestamps, start_us, side='left')
+        hi = len(timestamps) if end_us is None else np.searchsorted(timestamps, end_us, side='right')
+        ts_parts.append(timestamps[lo:hi])
+        value_parts.append(values[lo:hi])
+
+    if not ts_parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=dtype)
+    timestamps = np.concatenate(ts_parts)
+    values = np.concatenate(value_parts).astype(dtype, copy=False)
+    keep = ~np.isnan(values)
+    if not keep.all():
+        timestamps, values = timestamps[keep], values[keep]
+    return timestamps, values
+
+
+def history_arrays(site_id, start=None, end=None, value_field='response_time', dtype=np.float32):
+    """
+    아카이브(콜드) + DB(핫) 를 이어 붙인 [start, end] 구간 배열.
+    stream_response_times 와 같은 형식이며, 아카이브가 없으면 DB 만 읽는다.
+    아카이브가 덮는 날에도 아직 보관되지 않은 DB 행(늦게 들어온 행)이 있을 수 있으므로 DB 는 전체 구간을 읽고,
+    아카이브에 이미 있는 timestamp 의 행(게시 후 삭제 전에 중단된 경우)만 제외한다.
+    """
+    until = archived_until(site_id)
+    hot_ts, hot_values = stream_response_times(site_id, start, end, dtype=dtype, value_field=value_field)
+    if until is None or (start is not None and start >= until):
+        return hot_ts, hot_values
+
+    cold_ts, cold_values = read_archive(site_id, start, end, value_field=value_field, dtype=dtype)
+    late = hot_ts < to_epoch_us(until)
+    if not late.any():
+        return np.concatenate([cold_ts, hot_ts]), np.concatenate([cold_values, hot_values])
+
+    fresh = np.flatnonzero(late)
+    fresh = fresh[~np.isin(hot_ts[fresh], cold_ts)]
+    old_ts = np.concatenate([cold_ts, hot_ts[fresh]])
+    old_values = np.concatenate([cold_values, hot_values[fresh]])
+    order = np.argsort(old_ts, kind='stable')
+    return (np.concatenate([old_ts[order], hot_ts[~late]]),
+            np.concatenate([old_values[order], hot_values[~late]]))
+
+
+def archive_size(site_id=None):
+    """
+    아카이브 파일 전체 크기(바이트)
+    """
+    root = site_dir(site_id) if site_id is not None else settings.LOG_ARCHIVE_DIR
+    total = 0
+    for directory, _, files in os.walk(root):
+        total += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return total
@@ -0,0 +1,88 @@
+# log_queries.py: ResponseTimeLog 시간 구간 조회 헬퍼
+# (site, timestamp) 복합 인덱스를 타도록 항상 site + timestamp 범위 + timestamp 정렬로 조회하고,
+# 모델 인스턴스를 만들지 않도록 values_list 만 사용한다.
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+
+from myapp.models import ResponseTimeLog
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NULLABLE_VALUE_FIELDS = ('dns_time', 'connect_time', 'tls_time', 'ttfb')
+
+
+def to_epoch_us(dt):
+    """
+    aware datetime → epoch 마이크로초 (정수, 반올림 오차 없음)
+    """
+    return (dt - EPOCH) // timedelta(microseconds=1)
+
+
+def response_time_range(site, start=None, end=None, fields=('timestamp', 'response_time'), using=None):
+    """
+    site 의 [start, end] 구간 로그를 timestamp 순으로 values_list 로 반환.
+
+    Args:
+        site (Site | int): 사이트 또는 site_id
+        start, end (datetime | None): 포함 구간 경계 (None 이면 제한 없음)
+        fields (tuple): 조회할 컬럼
+        using (str | None): DB alias
+    """
+    site_id = getattr(site, 'pk', site)
+    qs = ResponseTimeLog.objects.filter(site_id=site_id)
+    if using:
+        qs = qs.using(using)
+    if start is not None:
+        qs = qs.filter(timestamp__gte=start)
+    if end is not None:
+        qs = qs.filter(timestamp__lte=end)
+    # 단계별 시간(ttfb 등)은 측정되지 않은 로그(재사용 커넥션, 이전 로그)에서 비어 있다
+    for field in fields:
+        if field in NULLABLE_VALUE_FIELDS:
+            qs = qs.filter(**{f'{field}__isnull': False})
+    return qs.order_by('timestamp').values_list(*fields)
+
+
+def stream_response_times(site, start=None, end=None, chunk_size=None, dtype=np.float32,
+                          value_field='response_time', using=None):
+    """
+    [start, end] 구간 로그를 iterator(chunk_size) 로 스트리밍하며 NumPy 배열에 바로 채운다.
+    - 모델 인스턴스/딕셔너리/DataFrame 을 만들지 않고, count() 쿼리도 하지 않는다.
+    - 배열은 청크 크기로 미리 할당하고 부족하면 두 배로 늘린다.
+
+    Returns:
+        (np.ndarray[int64], np.ndarray[dtype]): epoch 마이크로초, 응답 시간
+    """
+    chunk_size = chunk_size or settings.LOG_STREAM_CHUNK_SIZE
+    capacity = chunk_size
+    timestamps = np.empty(capacity, dtype=np.int64)
+    values = np.empty(capacity, dtype=dtype)
+    n = 0
+
+    rows = response_time_range(
+        site, start, end, fields=('timestamp', value_field), using=using
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        k = len(chunk)
+        if n + k > capacity:
+            capacity = max(capacity * 2, n + k)
+            timestamps = np.resize(timestamps, capacity)
+            values = np.resize(values, capacity)
+        ts_chunk, value_chunk = zip(*chunk)
+        timestamps[n:n + k] = [to_epoch_us(ts) for ts in ts_chunk]
+        values[n:n + k] = value_chunk
+        n += k
+
+    return timestamps[:n], values[:n]
+
+
+def fetch_response_times(site, start=None, end=None, using=None, value_field='response_time'):
+    """
+    [start, end] 구간 로그를 (epoch 마이크로초 int64 배열, value_field 값 float64 배열)로 반환.
+    """
+    return stream_response_times(site, start, end, dtype=np.float64, value_field=value_field, using=using)
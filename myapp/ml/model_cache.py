@@ -0,0 +1,107 @@
+# model_cache.py: 프로세스 로컬 모델 캐시 (LRU + 파일 변경 감지)
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from myapp.metrics import model_cache_requests, model_load_seconds
+from myproject import settings
+
+
+class ModelCache:
+    """
+    사이트 도메인을 키로 하는 모델 캐시.
+    - 최대 max_models 개까지 메모리에 유지하고, 초과 시 가장 오래 사용하지 않은 모델을 제거(LRU)
+    - 모델 파일의 (경로, mtime, size)가 바뀌면 자동으로 다시 로드
+    """
+
+    def __init__(self, max_models=None, loader=None):
+        self._max_models = max_models
+        self._loader = loader or self._pickle_loader
+        self._entries = OrderedDict()  # key -> (signature, model)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _pickle_loader(model_path):
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+
+    @property
+    def max_models(self):
+        if self._max_models is not None:
+            return self._max_models
+        return getattr(settings, 'MODEL_CACHE_MAX_MODELS', 32)
+
+    @staticmethod
+    def _signature(model_path):
+        try:
+            st = os.stat(model_path)
+        except FileNotFoundError:
+            return None
+        return model_path, st.st_mtime_ns, st.st_size
+
+    def get(self, key, model_path, loader=None):
+        """
+        캐시된 모델을 반환. 없거나 파일(경로/mtime/크기)이 변경되었으면 디스크에서 로드.
+        파일이 없으면 캐시에서 제거하고 None 반환.
+        """
+        signature = self._signature(model_path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if signature is None:
+                if entry is not None:
+                    del self._entries[key]
+                    self.invalidations += 1
+                return None
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                model_cache_requests.inc(result="hit")
+                return entry[1]
+            if entry is not None:
+                self.invalidations += 1
+            self.misses += 1
+        model_cache_requests.inc(result="miss")
+
+        # 로드는 락 밖에서 수행 (다른 사이트의 캐시 히트를 막지 않도록)
+        started = time.perf_counter()
+        model = (loader or self._loader)(model_path)
+        model_load_seconds.observe(time.perf_counter() - started, kind=key.rpartition("#")[2] if "#" in key else "model")
+
+        with self._lock:
+            self._entries[key] = (signature, model)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_models:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return model
+
+    def invalidate(self, key=None):
+        """
+        특정 키(또는 전체)를 캐시에서 제거.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# 프로세스 전역 캐시 인스턴스
+model_cache = ModelCache()
@@ -1,23 +1,25 @@
 # predict_flow.py: 머신러닝 모델을 사용하여 최적 진입 시간을 예측하는 함수를 정의합니다.
-import os
-import pickle
-import pandas as pd
+import numpy as np
 from datetime import timedelta
 from django.utils.timezone import now
 from myapp.models import ResponseTimeLog, Site
-from .rolling_predict import get_rolling_stats
+from . import registry
+from .rolling_predict import score_candidates
 
 
 def load_model(site_id):
     """
-    특정 사이트에 대한 머신러닝 모델을 로드합니다.
+    특정 사이트에 대한 머신러닝 모델을 로드합니다. (모델 레지스트리 사용)
+    예측 경로에서 사이트를 다시 조회하지 않도록 (모델, 도메인)을 함께 반환합니다.
     """
-    model_path = f"model_site_{site_id}.pkl"
-    if not os.path.exists(model_path):
-        print(f"[ERROR] 모델 파일이 없습니다: {model_path}")
-        return None
-    with open(model_path, 'rb') as f:
-        return pickle.load(f)
+    site_domain = Site.objects.values_list('domain', flat=True).filter(id=site_id).first()
+    if site_domain is None:
+        print(f"[ERROR] 사이트가 없습니다: {site_id}")
+        return None, None
+    model = registry.load_predictor(site_domain)
+    if model is None:
+        print(f"[ERROR] 모델 파일이 없습니다: {site_domain}")
+    return model, site_domain
 
 
 def predict_best_entry_time(site_id, current_time, release_time, interval_seconds=1):
@@ -33,7 +35,7 @@ def predict_best_entry_time(site_id, current_time, release_time, interval_second
     Returns:
         dict: 최적 진입 시점 정보 (시간, 예측 응답속도)
     """
-    model = load_model(site_id)
+    model, site_domain = load_model(site_id)
     if not model:
         return {"optimal_time": None, "message": "모델 파일이 없습니다."}
 
@@ -41,22 +43,12 @@ def predict_best_entry_time(site_id, current_time, release_time, interval_second
     if delta_seconds <= 0:
         return {"optimal_time": None, "message": "발매 시간이 현재 시간보다 빠릅니다."}
 
-    best_time = None
-    best_prediction = float('inf')
-
-    for offset in range(0, delta_seconds, interval_seconds):
-        t = current_time + timedelta(seconds=offset)
-        rolling_mean, rolling_std = get_rolling_stats(site_id, t, window_seconds=60)
+    offsets = np.arange(0, delta_seconds, interval_seconds, dtype=np.int64)
+    best_idx, best_prediction = score_candidates(model, site_domain, current_time, offsets)
 
-        hour = t.hour
-        dayofweek = t.weekday()
-        X = pd.DataFrame([[hour, dayofweek, rolling_mean, rolling_std]],
-                         columns=['hour', 'dayofweek', 'rolling_mean', 'rolling_std'])
-        predicted_response = model.predict(X)[0]
-
-        if predicted_response < best_prediction:
-            best_prediction = predicted_response
-            best_time = t
+    best_time = None
+    if best_idx is not None:
+        best_time = current_time + timedelta(seconds=int(offsets[best_idx]))
 
     if best_time:
         return {
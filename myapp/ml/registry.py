@@ -0,0 +1,219 @@
+# registry.py: 사이트별 버전 관리 모델 저장소
+# MODEL_STORAGE_DIR/<safe_domain>/
+#   v<버전>.ubj   XGBoost 네이티브 바이너리(UBJSON) 모델
+#   v<버전>.json  메타데이터 (version, trained_at, rows, feature_schema, validation_rmse ...)
+#   CURRENT       현재 서비스 중인 버전 이름
+# 모든 파일은 임시 파일에 쓴 뒤 os.replace 로 교체하므로, 읽는 쪽은 반쯤 쓰인 파일을 보지 않는다.
+import json
+import os
+import pickle
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import xgboost
+from xgboost import XGBRegressor
+
+from myproject import settings
+from .model_cache import model_cache
+from .tree_eval import compile_model
+
+MODEL_EXT = ".ubj"
+META_EXT = ".json"
+CURRENT_FILE = "CURRENT"
+
+
+def safe_domain(site_domain):
+    return site_domain.replace(".", "_")
+
+
+def model_dir(site_domain):
+    return os.path.join(settings.MODEL_STORAGE_DIR, safe_domain(site_domain))
+
+
+def legacy_model_path(site_domain):
+    """
+    레지스트리 도입 전 pickle 모델 경로 (MODEL_STORAGE_DIR/<safe_domain>.pkl)
+    """
+    return os.path.join(settings.MODEL_STORAGE_DIR, f"{safe_domain(site_domain)}.pkl")
+
+
+def _atomic_write(path, write):
+    """
+    같은 디렉터리의 임시 파일에 write(tmp_path) 로 쓰고 fsync 후 path 로 교체.
+    """
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.splitext(path)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        with open(tmp_path, 'rb') as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_text(text):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+    return write
+
+
+def current_version(site_domain):
+    try:
+        with open(os.path.join(model_dir(site_domain), CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(site_domain):
+    """
+    저장된 버전 이름 목록 (오래된 순)
+    """
+    try:
+        names = os.listdir(model_dir(site_domain))
+    except FileNotFoundError:
+        return []
+    return sorted(n[:-len(MODEL_EXT)] for n in names if n.startswith("v") and n.endswith(MODEL_EXT))
+
+
+def version_path(site_domain, version):
+    return os.path.join(model_dir(site_domain), f"{version}{MODEL_EXT}")
+
+
+def read_model_file(model_path):
+    """
+    모델 파일 로드 (.ubj 네이티브 포맷, 레거시 .pkl 모두 지원)
+    """
+    if model_path.endswith(".pkl"):
+        with open(model_path, 'rb') as f:
+            return pickle.load(f)
+    model = XGBRegressor()
+    model.load_model(model_path)
+    return model
+
+
+def resolve_model_path(site_domain):
+    """
+    현재 버전 모델 파일 경로. 레지스트리에 없으면 레거시 pickle, 그것도 없으면 None.
+    """
+    version = current_version(site_domain)
+    if version:
+        return version_path(site_domain, version)
+    path = legacy_model_path(site_domain)
+    return path if os.path.exists(path) else None
+
+
+def load_model(site_domain, cached=True):
+    """
+    사이트의 현재 모델 로드 (모든 추론 경로의 공통 진입점).
+    cached=True 면 프로세스 로컬 LRU 캐시를 사용한다. 모델이 없으면 None.
+    """
+    model_path = resolve_model_path(site_domain)
+    if model_path is None:
+        return None
+    if not cached:
+        return read_model_file(model_path)
+    return model_cache.get(site_domain, model_path, loader=read_model_file)
+
+
+def _read_compiled(model_path):
+    return compile_model(read_model_file(model_path), max_rows=settings.FLAT_EVAL_MAX_ROWS)
+
+
+def load_predictor(site_domain):
+    """
+    추론용 예측기 로드 (predict(X) 인터페이스).
+    INFERENCE_BACKEND 가 'flat' 이면 NumPy 평탄 트리 평가기(tree_eval, 큰 배치는 XGBoost 위임),
+    'xgboost' 면 XGBRegressor.
+    둘 다 같은 프로세스 로컬 캐시를 사용한다.
+    """
+    if settings.INFERENCE_BACKEND != 'flat':
+        return load_model(site_domain)
+    model_path = resolve_model_path(site_domain)
+    if model_path is None:
+        return None
+    return model_cache.get(f"{site_domain}#flat", model_path, loader=_read_compiled)
+
+
+def load_metadata(site_domain, version=None):
+    version = version or current_version(site_domain)
+    if not version:
+        return None
+    try:
+        with open(os.path.join(model_dir(site_domain), f"{version}{META_EXT}")) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def model_age_seconds(site_domain):
+    """
+    현재 모델이 게시된 후 지난 시간(초). 모델이 없으면 None.
+    """
+    model_path = resolve_model_path(site_domain)
+    if model_path is None:
+        return None
+    try:
+        return time.time() - os.path.getmtime(model_path)
+    except OSError:
+        return None
+
+
+def publish_model(site_domain, model, **metadata):
+    """
+    모델을 새 버전으로 저장하고 CURRENT 를 원자적으로 교체한 뒤 오래된 버전을 정리.
+
+    Args:
+        model (XGBRegressor): 학습된 모델
+        **metadata: 메타데이터에 함께 기록할 값 (rows, validation_rmse, parent_version ...)
+
+    Returns:
+        str: 새 버전 이름
+    """
+    directory = model_dir(site_domain)
+    os.makedirs(directory, exist_ok=True)
+
+    trained_at = datetime.now(timezone.utc)
+    version = f"v{trained_at.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}"
+    meta = {
+        "site": site_domain,
+        "version": version,
+        "trained_at": trained_at.isoformat(),
+        "format": "xgboost-ubj",
+        "xgboost_version": xgboost.__version__,
+        "feature_schema": model.get_booster().feature_names,
+        **metadata,
+    }
+
+    _atomic_write(version_path(site_domain, version), model.save_model)
+    _atomic_write(os.path.join(directory, f"{version}{META_EXT}"), _write_text(json.dumps(meta, indent=2)))
+    _atomic_write(os.path.join(directory, CURRENT_FILE), _write_text(version))
+
+    prune_versions(site_domain)
+    return version
+
+
+def prune_versions(site_domain, keep=None):
+    """
+    최신 keep 개 버전만 남기고 삭제 (현재 버전은 항상 유지).
+    """
+    keep = keep or settings.MODEL_REGISTRY_KEEP_VERSIONS
+    current = current_version(site_domain)
+    versions = list_versions(site_domain)
+    removed = 0
+    for version in versions[:-keep] if keep else []:
+        if version == current:
+            continue
+        for ext in (MODEL_EXT, META_EXT):
+            try:
+                os.remove(os.path.join(model_dir(site_domain), f"{version}{ext}"))
+            except FileNotFoundError:
+                pass
+        removed += 1
+    return removed
@@ -0,0 +1,133 @@
+# retrain.py: Fast Mode 재학습 조정기
+# 사이트별로 대기 중인 재학습은 하나로 합치고(coalescing), 최소 간격을 지키며,
+# 기존 모델이 있으면 전체 재학습 대신 update_site_model(추가 학습)을 사용하고,
+# 추가 학습할 데이터가 부족하면 전체 재학습으로 대신한다.
+# - retrain:pending:<site>  대기 중인 재학습 표시 (SET NX)
+# - retrain:lock:<site>     실행 중 잠금
+# - retrain:last:<site>     마지막 재학습 완료 시각 (epoch 초)
+# - retrain:stats           카운터 HASH
+import time
+
+import redis
+from django.conf import settings
+
+from myapp.ml import registry
+from myapp.ml.training import train_site_model, update_site_model
+from myapp.redis_client import redis_client
+
+PENDING_KEY = "retrain:pending:{}"
+LOCK_KEY = "retrain:lock:{}"
+LAST_KEY = "retrain:last:{}"
+STATS_KEY = "retrain:stats"
+
+
+def _seconds_until_allowed(site_domain):
+    last = redis_client.get(LAST_KEY.format(site_domain))
+    if last is None:
+        return 0.0
+    return max(0.0, float(last) + settings.RETRAIN_MIN_INTERVAL - time.time())
+
+
+def request_retrain(site_domain):
+    """
+    재학습 요청. 이미 대기 중인 요청이 있으면 합쳐지고, 최소 간격이 남아 있으면 그만큼 늦춰 예약한다.
+
+    Returns:
+        bool: 새 재학습 작업을 예약했으면 True
+    """
+    from myapp.tasks import retrain_site  # 순환 import 방지
+
+    try:
+        redis_client.hincrby(STATS_KEY, "requested", 1)
+        queued = redis_client.set(
+            PENDING_KEY.format(site_domain), 1,
+            nx=True, ex=settings.RETRAIN_MIN_INTERVAL + settings.RETRAIN_LOCK_TIMEOUT,
+        )
+        if not queued:
+            redis_client.hincrby(STATS_KEY, "coalesced", 1)
+            return False
+        delay = _seconds_until_allowed(site_domain)
+    except redis.RedisError as e:
+        print(f"[WARNING] Retrain coordinator unavailable: {e}")
+        return False
+
+    retrain_site.apply_async(args=[site_domain], countdown=delay)
+    print(f"[INFO] Retrain queued for site {site_domain} (in {delay:.1f}s).")
+    return True
+
+
+def _choose_mode(site_domain):
+    """
+    full: 모델이 없거나 추가 학습이 RETRAIN_MAX_INCREMENTAL 번 이상 쌓인 경우 (트리 수가 계속 늘어나므로)
+    incremental: 그 외
+    """
+    if registry.resolve_model_path(site_domain) is None:
+        return "full"
+    meta = registry.load_metadata(site_domain) or {}
+    if meta.get("incremental_updates", 0) >= settings.RETRAIN_MAX_INCREMENTAL:
+        return "full"
+    return "incremental"
+
+
+def run_retrain(site_domain):
+    """
+    대기 중인 재학습 실행 (retrain_site 태스크 본체).
+
+    Returns:
+        str | float: 실행 결과(full | incremental | skipped | locked) 또는 아직 최소 간격이 남았으면 남은 초
+        skipped(학습할 데이터 부족)는 최소 간격을 적용하지 않는다.
+    """
+    wait = _seconds_until_allowed(site_domain)
+    if wait > 0:
+        return wait
+
+    lock = redis_client.lock(LOCK_KEY.format(site_domain), timeout=settings.RETRAIN_LOCK_TIMEOUT, blocking=False)
+    if not lock.acquire():
+        return "locked"
+
+    try:
+        # 학습 시작 전에 pending 을 지워, 학습 중 들어온 요청은 다음 재학습으로 모인다
+        redis_client.delete(PENDING_KEY.format(site_domain))
+        mode = _choose_mode(site_domain)
+        model = None
+        if mode == "incremental":
+            model = update_site_model(
+                site_domain,
+                n_estimators=settings.RETRAIN_INCREMENTAL_TREES,
+                window_seconds=settings.RETRAIN_INCREMENTAL_WINDOW,
+            )
+            if model is None:
+                mode = "full"  # 최근 구간 데이터가 부족하면 전체 재학습
+        if mode == "full":
+            model = train_site_model(site_domain)
+        if model is None:
+            mode = "skipped"
+        else:
+            redis_client.set(LAST_KEY.format(site_domain), time.time(), ex=settings.RETRAIN_MIN_INTERVAL * 10)
+        redis_client.hincrby(STATS_KEY, mode, 1)
+        return mode
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockError:
+            pass
+
+
+def queue_depth():
+    """
+    재학습을 기다리는 사이트 수
+    """
+    return sum(1 for _ in redis_client.scan_iter(match=PENDING_KEY.format("*"), count=500))
+
+
+def stats():
+    """
+    requested: 전체 요청, coalesced: 합쳐져 생략된 요청(= 피한 재학습),
+    full / incremental / skipped: 실행 결과별 횟수, queue_depth: 대기 중인 사이트 수
+    """
+    raw = redis_client.hgetall(STATS_KEY)
+    counts = {key.decode(): int(value) for key, value in raw.items()}
+    result = {name: counts.get(name, 0) for name in ("requested", "coalesced", "full", "incremental", "skipped")}
+    result["retrains_avoided"] = result["coalesced"]
+    result["queue_depth"] = queue_depth()
+    return result
@@ -1,111 +1,295 @@
-import os
-import pickle
 from datetime import timedelta
 
-import pandas as pd
+import numpy as np
 from django.shortcuts import get_object_or_404
+from django.utils.timezone import now
 
-from myapp.models import ResponseTimeLog, Site
+from myapp import live_window
+from myapp.ingest import resolve_site_id
+from myapp.models import ResponseTimeRollup, Site
 from myproject import settings
+from . import registry
+from .log_queries import EPOCH, fetch_response_times, to_epoch_us
+from .rollups import MINUTE, aggregate_window, watermark
+
+# 학습/추론에 사용하는 피처 순서 (training.py 와 동일해야 함)
+FEATURE_COLUMNS = ['hour', 'dayofweek', 'rolling_mean', 'rolling_std']
 
 
 def load_site_model(site_domain):
     """
-    저장된 모델 파일 로드
+    저장된 모델 로드 (모델 레지스트리 + 프로세스 로컬 캐시)
+    """
+    model = registry.load_predictor(site_domain)
+    if model is None:
+        print(f"[ERROR] Model not found for site: {site_domain}")
+    return model
+
+
+def _site_id(site_domain):
+    """
+    도메인 → site_id (공유 캐시 매핑 우선, 없는 사이트면 404)
+    """
+    return resolve_site_id(site_domain) or get_object_or_404(Site, domain=site_domain).id
+
+
+def _rollup_window_sums(site_id, t_us, window_us):
+    """
+    긴 윈도우의 시점별 [t - window, t] 구간 (개수, 합, 제곱합).
+    - 분 경계 안쪽은 분 집계의 누적합, 분에 맞지 않는 양 끝과 아직 집계되지 않은 최신 구간만 원본 로그
+    - 원본 로그는 윈도우 전체가 아니라 양 끝 구간만 읽으므로, 윈도우가 탐색 구간보다 길수록 읽는 양이 줄어든다
+    - 분 집계가 없으면 None (원본 로그 경로 사용)
     """
-    safe_domain = site_domain.replace(".", "_")
-    model_path = os.path.join(settings.MODEL_STORAGE_DIR, f"{safe_domain}.pkl")
-    if not os.path.exists(model_path):
-        print(f"[ERROR] Model file not found: {model_path}")
+    covered = watermark(site_id, MINUTE)
+    if covered is None:
         return None
-    with open(model_path, 'rb') as f:
-        return pickle.load(f)
+    minute_us = 60 * 1_000_000
+    starts = t_us - window_us
+    m0 = -(-starts // minute_us) * minute_us  # 분 경계로 올림
+    m1 = np.maximum(np.minimum(t_us, to_epoch_us(covered)) // minute_us * minute_us, m0)
+
+    # 원본 로그: 왼쪽 끝 [start, m0) 들과 오른쪽 끝 [m1, t] 들을 덮는 구간 (겹치면 한 번에)
+    left_start, left_end = int(starts.min()), int(m0.max())
+    right_start, right_end = int(m1.min()), int(t_us.max())
+    if left_end >= right_start:
+        timestamps, values = fetch_response_times(site_id, _from_us(left_start), _from_us(right_end))
+    else:
+        lt, lv = fetch_response_times(site_id, _from_us(left_start), _from_us(left_end))
+        rt, rv = fetch_response_times(site_id, _from_us(right_start), _from_us(right_end))
+        keep = lt < left_end
+        timestamps, values = np.concatenate([lt[keep], rt]), np.concatenate([lv[keep], rv])
+    raw_sum = np.concatenate(([0.0], np.cumsum(values)))
+    raw_sq = np.concatenate(([0.0], np.cumsum(values * values)))
+
+    rows = list(ResponseTimeRollup.objects.filter(
+        site_id=site_id, tier=MINUTE,
+        bucket_start__gte=_from_us(int(m0.min())), bucket_start__lt=_from_us(int(m1.max())),
+    ).order_by('bucket_start').values_list('bucket_start', 'count', 'total', 'sum_sq'))
+    buckets = np.array([to_epoch_us(r[0]) for r in rows], dtype=np.int64)
+    roll_n = np.concatenate(([0], np.cumsum([r[1] for r in rows], dtype=np.int64)))
+    roll_sum = np.concatenate(([0.0], np.cumsum([r[2] for r in rows], dtype=np.float64)))
+    roll_sq = np.concatenate(([0.0], np.cumsum([r[3] for r in rows], dtype=np.float64)))
+
+    a = np.searchsorted(timestamps, starts, side='left')
+    b = np.searchsorted(timestamps, m0, side='left')
+    c = np.searchsorted(timestamps, m1, side='left')
+    d = np.searchsorted(timestamps, t_us, side='right')
+    i = np.searchsorted(buckets, m0, side='left')
+    j = np.searchsorted(buckets, m1, side='left')
+
+    n = (b - a) + (d - c) + (roll_n[j] - roll_n[i])
+    total = raw_sum[b] - raw_sum[a] + raw_sum[d] - raw_sum[c] + roll_sum[j] - roll_sum[i]
+    total_sq = raw_sq[b] - raw_sq[a] + raw_sq[d] - raw_sq[c] + roll_sq[j] - roll_sq[i]
+    return n, total, total_sq
+
+
+def _from_us(us):
+    return EPOCH + timedelta(microseconds=us)
+
+
+def get_rolling_stats_series(site_domain, current_time, offsets, window_seconds=60):
+    """
+    current_time + offset(초) 시점마다 [t - window, t] 구간의 롤링 평균/표준편차를 한 번에 계산.
+    - 전체 구간 [첫 시점 - window, 마지막 시점] 의 로그를 한 번에 가져온다.
+      구간이 Redis 실시간 윈도우(live_window) 안이면 Redis 에서, 아니면 DB 쿼리 1번. (log_queries)
+    - 누적합(sum, sum-of-squares)과 구간 경계 탐색으로 시점당 O(1)에 통계를 계산.
+    - window_seconds 가 ROLLUP_MIN_WINDOW_SECONDS 이상이면(응답 시간 신호만) 분 집계 + 양 끝 원본 로그로 계산.
+      기본 추론 윈도우(60초, 1초 간격)는 분 단위 집계로 표현할 수 없으므로 원본 로그를 그대로 읽는다.
+    - 구간에 로그가 없으면 (0.0, 0.0)
+
+    Returns:
+        (np.ndarray, np.ndarray): offsets 와 같은 길이의 평균, 표준편차 배열
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    means = np.zeros(len(offsets), dtype=np.float64)
+    stds = np.zeros(len(offsets), dtype=np.float64)
+
+    site_id = _site_id(site_domain)
+    if len(offsets) == 0:
+        return means, stds
+
+    if window_seconds >= settings.ROLLUP_MIN_WINDOW_SECONDS and settings.MODEL_SIGNAL == 'response_time':
+        t_us = to_epoch_us(current_time) + offsets * 1_000_000
+        sums = _rollup_window_sums(site_id, t_us, window_seconds * 1_000_000)
+        if sums is not None:
+            n, total, total_sq = sums
+            has_data = n > 0
+            means[has_data] = total[has_data] / n[has_data]
+            variance = total_sq[has_data] / n[has_data] - means[has_data] ** 2
+            stds[has_data] = np.sqrt(np.maximum(variance, 0.0))
+            return means, stds
+
+    range_start = current_time + timedelta(seconds=int(offsets.min()) - window_seconds)
+    range_end = current_time + timedelta(seconds=int(offsets.max()))
+    live = live_window.window_samples(site_id, range_start, range_end)
+    if live is not None:
+        timestamps, values = live
+    else:
+        timestamps, values = fetch_response_times(
+            site_id, range_start, range_end, value_field=settings.MODEL_SIGNAL
+        )
+    if len(values) == 0:
+        return means, stds
+
+    # 큰 값의 제곱합으로 인한 정밀도 손실을 줄이기 위해 평균 기준으로 이동 후 누적
+    shift = values.mean()
+    centered = values - shift
+    prefix_sum = np.concatenate(([0.0], np.cumsum(centered)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    t_us = to_epoch_us(current_time) + offsets * 1_000_000
+    left = np.searchsorted(timestamps, t_us - window_seconds * 1_000_000, side='left')
+    right = np.searchsorted(timestamps, t_us, side='right')
+    counts = right - left
+
+    has_data = counts > 0
+    n = counts[has_data].astype(np.float64)
+    window_sum = prefix_sum[right[has_data]] - prefix_sum[left[has_data]]
+    window_sq = prefix_sq[right[has_data]] - prefix_sq[left[has_data]]
+    centered_mean = window_sum / n
+    variance = np.maximum(window_sq / n - centered_mean * centered_mean, 0.0)
+
+    means[has_data] = centered_mean + shift
+    stds[has_data] = np.sqrt(variance)
+    return means, stds
 
 
 def get_rolling_stats(site_domain, t, window_seconds=60):
     """
     도메인 이름 기반으로 롤링 통계를 계산.
+    - 현재 시각 기준 LIVE_WINDOW_SECONDS 구간은 Redis 실시간 윈도우의 누적합으로 O(1) 조회
+    - 긴 구간(ROLLUP_MIN_WINDOW_SECONDS 이상)은 분/시간 집계 계층을 사용 (집계는 응답 시간 신호만)
     """
-    site = get_object_or_404(Site, domain=site_domain)
-    start_time = t - timedelta(seconds=window_seconds)
+    if window_seconds == settings.LIVE_WINDOW_SECONDS and abs((now() - t).total_seconds()) < 1:
+        stats = live_window.current_stats(_site_id(site_domain))
+        if stats is not None:
+            return stats
+
+    if window_seconds >= settings.ROLLUP_MIN_WINDOW_SECONDS and settings.MODEL_SIGNAL == 'response_time':
+        return aggregate_window(_site_id(site_domain), t - timedelta(seconds=window_seconds), t)
+
+    means, stds = get_rolling_stats_series(site_domain, t, [0], window_seconds)
+    return float(means[0]), float(stds[0])
 
-    qs = ResponseTimeLog.objects.filter(
-        site=site,
-        timestamp__gte=start_time,
-        timestamp__lte=t
-    ).order_by('timestamp')
 
-    if not qs.exists():
-        return 0.0, 0.0
+def build_feature_matrix(current_time, offsets, rolling_means, rolling_stds):
+    """
+    current_time + offset(초) 시점들의 피처 행렬을 한 번에 생성.
+    - hour/dayofweek 는 current_time 의 벽시계 기준으로 계산 (t.hour, t.weekday() 와 동일)
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    base_seconds = current_time.hour * 3600 + current_time.minute * 60 + current_time.second
+    elapsed = base_seconds + offsets
 
-    response_times = [obj.response_time for obj in qs]
-    rolling_mean = sum(response_times) / len(response_times)
-    rolling_std = (
-        sum((x - rolling_mean) ** 2 for x in response_times) / len(response_times)
-    ) ** 0.5
-    return rolling_mean, rolling_std
+    X = np.empty((len(offsets), len(FEATURE_COLUMNS)), dtype=np.float64)
+    X[:, 0] = (elapsed // 3600) % 24
+    X[:, 1] = (current_time.weekday() + elapsed // 86400) % 7
+    X[:, 2] = rolling_means
+    X[:, 3] = rolling_stds
+    return X
 
 
-def find_best_entry_time(site_domain, current_time, release_time):
+def score_candidates(model, site_domain, current_time, offsets, window_seconds=60):
     """
-    발매시간 전 최적 진입 타이밍 예측 (1초 간격).
-    - current_time < t < release_time 범위를 1초 단위로 탐색한다.
-    - 시작 지점(current_time)과 끝 지점(release_time)은 제외.
-    - 모든 예측값이 동일하더라도, 그중 첫 번째로 발견된 최소값 시점을 반환.
-    - delta_seconds < 2면 '사이 구간'이 없으므로 None 반환.
+    후보 시점(current_time + offset) 전체를 한 번의 predict 호출로 평가.
+    - 가장 먼저 등장한 최소 예측값의 인덱스와 그 예측값을 반환
+    - 유효한 예측값이 없으면 (None, None)
     """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) == 0:
+        return None, None
+
+    rolling_means, rolling_stds = get_rolling_stats_series(
+        site_domain, current_time, offsets, window_seconds
+    )
+
+    X = build_feature_matrix(current_time, offsets, rolling_means, rolling_stds)
+    predictions = np.asarray(model.predict(X), dtype=np.float64)
+
+    # 기존 루프의 `pred < best` 비교와 동일하게 NaN/inf 는 후보에서 제외
+    valid = predictions < np.inf
+    if not valid.any():
+        return None, None
+    best_idx = int(np.argmin(np.where(valid, predictions, np.inf)))
+    return best_idx, float(predictions[best_idx])
+
+
+def _clamp_to_window(best_time, current_time, release_time):
+    """
+    best_time 을 (current_time, release_time) 사이(양 끝 1초 제외)로 보정. 구간이 없으면 None.
+    """
+    lowest_bound = current_time + timedelta(seconds=1)
+    highest_bound = release_time - timedelta(seconds=1)
+
+    # 혹시 lowest_bound > highest_bound면 구간이 없음 → None
+    if lowest_bound > highest_bound:
+        return None
+
+    # best_time이 lowest_bound보다 작으면 lowest_bound로 맞춤
+    if best_time < lowest_bound:
+        best_time = lowest_bound
+
+    # best_time이 highest_bound보다 크면 highest_bound로 맞춤
+    if best_time > highest_bound:
+        best_time = highest_bound
+
+    # 그래도 혹시 current_time 이상 & release_time 이하인지 최종 검사
+    if not (current_time < best_time < release_time):
+        return None
+    return best_time
+
+
+def find_best_entry_times(site_domain, current_time, release_times):
+    """
+    같은 사이트·같은 current_time 에 대한 여러 발매시간의 최적 진입 타이밍 (find_best_entry_time 의 배치 버전).
+    - 후보 시점의 피처는 발매시간과 무관하므로 가장 긴 구간을 한 번만 평가한다
+      (모델 로드, 로그 조회, predict 각 1회).
+    - 발매시간마다 그 앞부분(current_time+1초 ~ release_time-1초)에서 처음 등장한 최소값 시점을 고른다.
+
+    Returns:
+        list: release_times 와 같은 순서의 최적 시점 (구간이 없거나 예측할 수 없으면 None)
+    """
+    release_times = list(release_times)
+    results = [None] * len(release_times)
+    if not release_times:
+        return results
 
     model = load_site_model(site_domain)
     if not model:
-        return None
+        return results
 
-    delta_seconds = int((release_time - current_time).total_seconds())
+    deltas = [int((release_time - current_time).total_seconds()) for release_time in release_times]
     # current_time과 release_time 사이에 1초 이상 차이 나야 '사이' 구간이 있음
-    if delta_seconds < 2:
-        return None
+    horizon = max(deltas)
+    if horizon < 2:
+        return results
 
-    best_time = None
-    best_prediction = float('inf')
+    # (1) 가장 긴 구간 current_time+1초 ~ 마지막 발매시간-1초 를 한 번에 평가
+    offsets = np.arange(1, horizon, dtype=np.int64)
+    rolling_means, rolling_stds = get_rolling_stats_series(site_domain, current_time, offsets)
+    X = build_feature_matrix(current_time, offsets, rolling_means, rolling_stds)
+    predictions = np.asarray(model.predict(X), dtype=np.float64)
+    # score_candidates 와 같이 NaN/inf 는 후보에서 제외
+    predictions = np.where(predictions < np.inf, predictions, np.inf)
 
-    # (1) 기존 로직: current_time+1초 ~ release_time-1초 구간을 1초씩 탐색
-    for offset in range(1, delta_seconds):
-        t = current_time + timedelta(seconds=offset)
+    # (2) 발매시간별 앞부분에서 최소값 선택 후 구간 보정
+    for i, (release_time, delta) in enumerate(zip(release_times, deltas)):
+        if delta < 2:
+            continue
+        candidates = predictions[:delta - 1]
+        best_idx = int(np.argmin(candidates))
+        if candidates[best_idx] < np.inf:
+            best_time = current_time + timedelta(seconds=int(offsets[best_idx]))
+            results[i] = _clamp_to_window(best_time, current_time, release_time)
+    return results
 
-        rolling_mean, rolling_std = get_rolling_stats(site_domain, t, 60)
-        if rolling_mean is None or rolling_std is None:
-            rolling_mean, rolling_std = 0.0, 0.0
 
-        hour = t.hour
-        dayofweek = t.weekday()
-        X = pd.DataFrame(
-            [[hour, dayofweek, rolling_mean, rolling_std]],
-            columns=['hour', 'dayofweek', 'rolling_mean', 'rolling_std']
-        )
-        predicted_response = model.predict(X)[0]
-
-        if predicted_response < best_prediction:
-            best_prediction = predicted_response
-            best_time = t
-
-    # (2) 루프 후 보정 로직: best_time이 혹시 범위를 벗어나면 '클램핑'
-    if best_time is not None:
-        lowest_bound = current_time + timedelta(seconds=1)
-        highest_bound = release_time - timedelta(seconds=1)
-
-        # 혹시 lowest_bound > highest_bound면 구간이 없음 → None
-        if lowest_bound > highest_bound:
-            best_time = None
-        else:
-            # best_time이 lowest_bound보다 작으면 lowest_bound로 맞춤
-            if best_time < lowest_bound:
-                best_time = lowest_bound
-
-            # best_time이 highest_bound보다 크면 highest_bound로 맞춤
-            if best_time > highest_bound:
-                best_time = highest_bound
-
-            # 그래도 혹시 current_time 이상 & release_time 이하인지 최종 검사
-            if not (current_time < best_time < release_time):
-                best_time = None
-
-    return best_time
\ No newline at end of file
+def find_best_entry_time(site_domain, current_time, release_time):
+    """
+    발매시간 전 최적 진입 타이밍 예측 (1초 간격).
+    - current_time < t < release_time 범위를 1초 단위로 탐색한다.
+    - 시작 지점(current_time)과 끝 지점(release_time)은 제외.
+    - 모든 예측값이 동일하더라도, 그중 첫 번째로 발견된 최소값 시점을 반환.
+    - delta_seconds < 2면 '사이 구간'이 없으므로 None 반환.
+    """
+    return find_best_entry_times(site_domain, current_time, [release_time])[0]
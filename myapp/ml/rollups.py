@@ -0,0 +1,406 @@
+# rollups.py: ResponseTimeLog 분/시간 집계 계층 유지 및 조회
+# - compact_site: 닫힌 구간의 원본 로그 → 분 집계, 분 집계 → 시간 집계 (멱등 upsert)
+# - aggregate_window: 구간 통계를 가장 굵은 집계 계층 + 가장자리 원본 로그로 계산
+# - prune_raw_logs: 집계가 끝난 오래된 원본 로그 삭제
+# - archive_cold_logs: 집계가 끝난 오래된 원본 로그를 일 단위 컬럼 파일(archive)로 이동
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max, Q
+from django.utils.timezone import now
+
+from myapp.models import ResponseTimeLog, ResponseTimeRollup, Site
+from . import archive
+from .log_queries import (
+    EPOCH,
+    fetch_response_times,
+    response_time_range,
+    to_epoch_us,
+)
+
+MINUTE = ResponseTimeRollup.TIER_MINUTE
+HOUR = ResponseTimeRollup.TIER_HOUR
+TIER_SECONDS = {MINUTE: 60, HOUR: 3600}
+
+# p95 스케치 구간 경계 (1ms ~ 120s, 로그 스케일 96 구간, 구간당 상대 오차 약 13%)
+HISTOGRAM_EDGES = np.geomspace(0.001, 120.0, 97)
+
+UPDATE_FIELDS = ['count', 'total', 'sum_sq', 'min_value', 'max_value', 'histogram', 'max_log_id']
+
+
+def _floor(dt, seconds):
+    us = to_epoch_us(dt)
+    return EPOCH + timedelta(microseconds=us - us % (seconds * 1_000_000))
+
+
+def _ceil(dt, seconds):
+    floored = _floor(dt, seconds)
+    return floored if floored == dt else floored + timedelta(seconds=seconds)
+
+
+def _from_epoch_us(us):
+    return EPOCH + timedelta(microseconds=int(us))
+
+
+def sketch_quantile(histogram, q, max_value=None):
+    """
+    히스토그램 스케치에서 q 분위수 추정 (해당 구간의 상한, max_value 로 클램핑).
+    """
+    if not histogram:
+        return None
+    bins = sorted((int(b), c) for b, c in histogram.items())
+    target = q * sum(c for _, c in bins)
+    cumulative = 0
+    for b, c in bins:
+        cumulative += c
+        if cumulative >= target:
+            upper = float(HISTOGRAM_EDGES[min(b, len(HISTOGRAM_EDGES) - 1)])
+            return min(upper, max_value) if max_value is not None else upper
+    return max_value
+
+
+def _merge_histograms(histograms):
+    merged = {}
+    for histogram in histograms:
+        for b, c in histogram.items():
+            merged[str(b)] = merged.get(str(b), 0) + c
+    return merged
+
+
+def watermark(site_id, tier):
+    """
+    tier 집계가 완료된 끝 시각 (마지막 구간 시작 + 단위). 집계가 없으면 None.
+    """
+    last = ResponseTimeRollup.objects.filter(site_id=site_id, tier=tier).aggregate(
+        last=Max('bucket_start')
+    )['last']
+    return last + timedelta(seconds=TIER_SECONDS[tier]) if last else None
+
+
+def _upsert(rollups):
+    if rollups:
+        ResponseTimeRollup.objects.bulk_create(
+            rollups,
+            update_conflicts=True,
+            unique_fields=['site', 'tier', 'bucket_start'],
+            update_fields=UPDATE_FIELDS,
+        )
+    return len(rollups)
+
+
+def compacted_log_id(site_id):
+    """
+    분 집계에 이미 포함된 로그의 최대 id (집계가 없으면 0).
+    이 id 이하이고 분 집계 워터마크 이전인 로그는 모두 분 집계에 들어 있다.
+    """
+    return ResponseTimeRollup.objects.filter(site_id=site_id, tier=MINUTE).aggregate(
+        last=Max('max_log_id')
+    )['last'] or 0
+
+
+def _log_arrays(qs):
+    rows = list(qs.order_by('timestamp').values_list('id', 'timestamp', 'response_time'))
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    ids, timestamps, values = zip(*rows)
+    return (
+        np.array(ids, dtype=np.int64),
+        np.array([to_epoch_us(ts) for ts in timestamps], dtype=np.int64),
+        np.array(values, dtype=np.float64),
+    )
+
+
+def _minute_rollups(site_id, ids, timestamps, values):
+    bucket_us = 60 * 1_000_000
+    buckets = timestamps // bucket_us
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(values)]
+    counts = ends - starts
+    totals = np.add.reduceat(values, starts)
+    sums_sq = np.add.reduceat(values * values, starts)
+    mins = np.minimum.reduceat(values, starts)
+    maxs = np.maximum.reduceat(values, starts)
+    max_ids = np.maximum.reduceat(ids, starts)
+    hist_bins = np.searchsorted(HISTOGRAM_EDGES, values, side='left')
+
+    rollups = []
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        bins, bin_counts = np.unique(hist_bins[s:e], return_counts=True)
+        rollups.append(ResponseTimeRollup(
+            site_id=site_id,
+            tier=MINUTE,
+            bucket_start=_from_epoch_us(buckets[s] * bucket_us),
+            count=int(counts[i]),
+            total=float(totals[i]),
+            sum_sq=float(sums_sq[i]),
+            min_value=float(mins[i]),
+            max_value=float(maxs[i]),
+            histogram={str(b): int(c) for b, c in zip(bins, bin_counts)},
+            max_log_id=int(max_ids[i]),
+        ))
+    return rollups
+
+
+def _merge_into_existing(site_id, rollups):
+    """
+    늦게 들어온 로그로 만든 분 집계를 이미 있는 같은 분 집계에 더한다.
+    """
+    existing = {
+        r.bucket_start: r
+        for r in ResponseTimeRollup.objects.filter(
+            site_id=site_id, tier=MINUTE, bucket_start__in=[r.bucket_start for r in rollups]
+        )
+    }
+    for rollup in rollups:
+        old = existing.get(rollup.bucket_start)
+        if old is None:
+            continue
+        rollup.count += old.count
+        rollup.total += old.total
+        rollup.sum_sq += old.sum_sq
+        rollup.min_value = min(rollup.min_value, old.min_value)
+        rollup.max_value = max(rollup.max_value, old.max_value)
+        rollup.histogram = _merge_histograms([old.histogram, rollup.histogram])
+        rollup.max_log_id = max(rollup.max_log_id, old.max_log_id)
+    return rollups
+
+
+def compact_minutes(site_id, until):
+    """
+    [분 집계 워터마크, until) 구간의 원본 로그를 분 단위로 집계.
+    워터마크 이전으로 늦게 들어온 로그(import_csv, 지연 flush 등)는 지난 집계 이후의 id 로 찾아
+    해당 분 집계에 더한다 (분 집계의 max_log_id 로 같은 로그를 두 번 더하지 않는다).
+
+    Returns:
+        (int, set): upsert 한 분 집계 수, 늦은 로그가 더해진 분 집계의 시간 구간 시작 시각
+    """
+    start = watermark(site_id, MINUTE)
+    last_id = compacted_log_id(site_id)
+    # 집계 중에 들어오는 로그는 다음 집계에서 처리하도록 id 상한을 먼저 정한다
+    snapshot = ResponseTimeLog.objects.filter(site_id=site_id).aggregate(last=Max('id'))['last']
+    if snapshot is None:
+        return 0, set()
+    logs = ResponseTimeLog.objects.filter(site_id=site_id, id__lte=snapshot, timestamp__lt=until)
+
+    rollups, late_hours = [], set()
+    if start is not None:
+        late = _log_arrays(logs.filter(id__gt=last_id, timestamp__lt=start))
+        if len(late[0]):
+            merged = _merge_into_existing(site_id, _minute_rollups(site_id, *late))
+            rollups += merged
+            late_hours = {_floor(r.bucket_start, 3600) for r in merged}
+        logs = logs.filter(timestamp__gte=start)
+    fresh = _log_arrays(logs)
+    if len(fresh[0]):
+        rollups += _minute_rollups(site_id, *fresh)
+    return _upsert(rollups), late_hours
+
+
+def compact_hours(site_id, until, late_hours=()):
+    """
+    [시간 집계 워터마크, until) 구간의 분 집계를 시간 단위로 병합.
+    late_hours 중 워터마크 이전의 시간 구간은 분 집계에서 다시 만든다.
+    """
+    start = watermark(site_id, HOUR)
+    qs = ResponseTimeRollup.objects.filter(site_id=site_id, tier=MINUTE, bucket_start__lt=until)
+    if start is not None:
+        recompute = Q(bucket_start__gte=start)
+        for hour_start in late_hours:
+            if hour_start < start:
+                recompute |= Q(bucket_start__gte=hour_start, bucket_start__lt=hour_start + timedelta(hours=1))
+        qs = qs.filter(recompute)
+
+    groups = {}
+    for minute in qs.order_by('bucket_start'):
+        groups.setdefault(_floor(minute.bucket_start, 3600), []).append(minute)
+
+    rollups = [
+        ResponseTimeRollup(
+            site_id=site_id,
+            tier=HOUR,
+            bucket_start=hour_start,
+            count=sum(m.count for m in minutes),
+            total=sum(m.total for m in minutes),
+            sum_sq=sum(m.sum_sq for m in minutes),
+            min_value=min(m.min_value for m in minutes),
+            max_value=max(m.max_value for m in minutes),
+            histogram=_merge_histograms(m.histogram for m in minutes),
+        )
+        for hour_start, minutes in groups.items()
+    ]
+    return _upsert(rollups)
+
+
+def compact_site(site_id, current_time=None):
+    """
+    사이트의 닫힌 분/시간 구간을 집계. 늦게 들어오는 샘플을 위해 ROLLUP_GRACE_SECONDS 만큼 기다린다.
+    """
+    current_time = current_time or now()
+    minute_until = _floor(current_time - timedelta(seconds=settings.ROLLUP_GRACE_SECONDS), 60)
+    minutes, late_hours = compact_minutes(site_id, minute_until)
+    hours = compact_hours(site_id, _floor(minute_until, 3600), late_hours)
+    return minutes, hours
+
+
+def compact_all(current_time=None):
+    totals = {MINUTE: 0, HOUR: 0}
+    for site_id in Site.objects.values_list('id', flat=True):
+        minutes, hours = compact_site(site_id, current_time)
+        totals[MINUTE] += minutes
+        totals[HOUR] += hours
+    return totals
+
+
+def prune_raw_logs(retention_days=None, current_time=None):
+    """
+    retention_days 보다 오래되었고 분 집계로 이미 요약된 원본 로그를 삭제.
+    워터마크 이전이라도 아직 분 집계에 더해지지 않은 늦은 로그(compacted_log_id 초과)는 남겨 두고 다음 집계 후에 지운다.
+    retention_days 가 0/None 이면 아무 것도 하지 않는다.
+    """
+    retention_days = settings.RAW_LOG_RETENTION_DAYS if retention_days is None else retention_days
+    if not retention_days:
+        return 0
+    horizon = (current_time or now()) - timedelta(days=retention_days)
+
+    deleted = 0
+    for site_id in Site.objects.values_list('id', flat=True):
+        covered = watermark(site_id, MINUTE)
+        if covered is None:
+            continue
+        cutoff = min(horizon, covered)
+        count, _ = ResponseTimeLog.objects.filter(
+            site_id=site_id, timestamp__lt=cutoff, id__lte=compacted_log_id(site_id)
+        ).delete()
+        deleted += count
+    return deleted
+
+
+def _delete_logs(ids, batch_size=500):
+    for i in range(0, len(ids), batch_size):
+        ResponseTimeLog.objects.filter(id__in=ids[i:i + batch_size]).delete()
+
+
+def archive_cold_logs(after_days=None, current_time=None):
+    """
+    after_days 보다 오래되었고 분 집계가 끝난 날(UTC)의 원본 로그를 컬럼 파일 아카이브로 옮긴다.
+    하루 단위로 파일을 게시하고 검증한 뒤, 아카이브에 들어간 것이 확인된 DB 행만 삭제하므로
+    중간에 멈춰도 다시 실행하면 이어진다. 이미 보관된 날에 늦게 들어온 행(import_csv 등)은 그날 파일에 합치고,
+    아직 분 집계에 더해지지 않은 행은 다음 집계 후에 지운다.
+    after_days 가 0/None 이면 아무 것도 하지 않는다.
+
+    Returns:
+        (int, int): 보관한 행 수, 새로 쓰거나 다시 쓴 날 수
+    """
+    after_days = settings.LOG_ARCHIVE_AFTER_DAYS if after_days is None else after_days
+    if not after_days:
+        return 0, 0
+    horizon = (current_time or now()) - timedelta(days=after_days)
+
+    rows = days = 0
+    for site_id in Site.objects.values_list('id', flat=True):
+        covered = watermark(site_id, MINUTE)
+        if covered is None:
+            continue
+        cutoff = _floor(min(horizon, covered), 86400)
+        compacted = compacted_log_id(site_id)
+
+        # 아카이브 경계(archived_until) 이전이라도 DB 에 남아 있는 날은 모두 다시 확인한다
+        first = response_time_range(site_id, end=cutoff, fields=('timestamp',))[:1]
+        while first and first[0][0] < cutoff:
+            start = _floor(first[0][0], 86400)
+            end = start + timedelta(days=1)
+            archived, ids = archive.write_day(site_id, archive.day_name(start), start, end)
+            _delete_logs([i for i in ids if i <= compacted])
+            rows += archived
+            days += 1 if archived else 0
+            first = response_time_range(site_id, start=end, end=cutoff, fields=('timestamp',))[:1]
+    return rows, days
+
+
+def _rollup_sums(site_id, tier, start, end):
+    """
+    [start, end) 구간 tier 집계의 (count, sum, sum_sq) 합.
+    """
+    if start >= end:
+        return 0, 0.0, 0.0
+    rows = ResponseTimeRollup.objects.filter(
+        site_id=site_id, tier=tier, bucket_start__gte=start, bucket_start__lt=end
+    ).values_list('count', 'total', 'sum_sq')
+    n, s, sq = 0, 0.0, 0.0
+    for count, total, sum_sq in rows:
+        n, s, sq = n + count, s + total, sq + sum_sq
+    return n, s, sq
+
+
+def _raw_sums(site_id, start, end, include_end):
+    if start > end or (start == end and not include_end):
+        return 0, 0.0, 0.0
+    timestamps, values = fetch_response_times(site_id, start, end)
+    if not include_end:
+        values = values[timestamps < to_epoch_us(end)]
+    return len(values), float(values.sum()), float((values * values).sum())
+
+
+def aggregate_window(site_id, start, end):
+    """
+    [start, end] 구간의 (평균, 표준편차)를 가장 굵은 집계 계층으로 계산.
+    - 시간 집계로 덮이는 구간은 시간 집계, 남는 분 단위 구간은 분 집계,
+      분 경계에 맞지 않는 가장자리와 아직 집계되지 않은 최신 구간은 원본 로그를 읽는다.
+    - 샘플이 없으면 (0.0, 0.0) (get_rolling_stats 와 동일)
+    """
+    minute_covered = watermark(site_id, MINUTE)
+    rollup_end = min(end, minute_covered) if minute_covered else start
+
+    parts = []
+    m0 = _ceil(start, 60)
+    m1 = _floor(rollup_end, 60) if rollup_end > start else m0
+    if m0 < m1:
+        hour_covered = watermark(site_id, HOUR)
+        h0 = _ceil(m0, 3600)
+        h1 = _floor(min(m1, hour_covered), 3600) if hour_covered else h0
+        if h0 < h1:
+            parts.append(_rollup_sums(site_id, HOUR, h0, h1))
+            parts.append(_rollup_sums(site_id, MINUTE, m0, h0))
+            parts.append(_rollup_sums(site_id, MINUTE, h1, m1))
+        else:
+            parts.append(_rollup_sums(site_id, MINUTE, m0, m1))
+        parts.append(_raw_sums(site_id, start, m0, include_end=False))
+        parts.append(_raw_sums(site_id, m1, end, include_end=True))
+    else:
+        parts.append(_raw_sums(site_id, start, end, include_end=True))
+
+    n = sum(p[0] for p in parts)
+    if n == 0:
+        return 0.0, 0.0
+    mean = sum(p[1] for p in parts) / n
+    variance = max(sum(p[2] for p in parts) / n - mean * mean, 0.0)
+    return mean, variance ** 0.5
+
+
+def training_arrays(site_id, value_field='response_time'):
+    """
+    학습용 (epoch 마이크로초 int64, value_field 값 float32) 배열.
+    원본 로그는 아카이브(콜드) + DB(핫)에서 읽고, 원본이 정리(prune)된 과거 구간은
+    분 집계 평균을 1분당 샘플 하나로 사용한다.
+    - 분 평균 행은 count 로 가중하지 않고 원본 행과 같은 무게로 섞는다: 정리된 오래된 구간이 최근 원본 로그보다
+      학습을 좌우하지 않도록 하기 위함이며, 그 구간의 롤링 피처(직전 샘플 20개)는 약 20분에 걸친 값이 된다.
+    (집계는 응답 시간만 유지하므로 다른 신호는 원본 로그만 사용)
+    """
+    raw_timestamps, raw_values = archive.history_arrays(site_id, value_field=value_field)
+    if value_field != 'response_time':
+        return raw_timestamps, raw_values
+
+    minutes = ResponseTimeRollup.objects.filter(site_id=site_id, tier=MINUTE)
+    if len(raw_timestamps):
+        minutes = minutes.filter(bucket_start__lt=_floor(_from_epoch_us(raw_timestamps[0]), 60))
+    rollup_rows = list(minutes.order_by('bucket_start').values_list('bucket_start', 'total', 'count'))
+    if not rollup_rows:
+        return raw_timestamps, raw_values
+
+    rollup_timestamps = np.array([to_epoch_us(b) for b, _, _ in rollup_rows], dtype=np.int64)
+    rollup_values = np.array([total / count for _, total, count in rollup_rows], dtype=np.float32)
+    return (
+        np.concatenate([rollup_timestamps, raw_timestamps]),
+        np.concatenate([rollup_values, raw_values]),
+    )
@@ -1,104 +1,198 @@
-import os
+import numpy as np
 import pandas as pd
-import pickle
+import time
 
 from celery import shared_task
 from xgboost import XGBRegressor
 from datetime import timedelta
+from django.conf import settings
 from django.utils.timezone import now
 from django.shortcuts import get_object_or_404
-from myapp.models import Site, ResponseTimeLog
-from myproject import settings
+from myapp.models import Site
+from myapp.ml import registry
+from myapp.ml.log_queries import stream_response_times
+from myapp.ml.rollups import training_arrays
+from myapp.ml.rolling_predict import FEATURE_COLUMNS
 
-@shared_task
-def train_site_model(site_domain):
+ROLLING_WINDOW = 20  # 학습 피처의 롤링 윈도우 (샘플 수)
+US_PER_HOUR = 3600 * 1_000_000
+US_PER_DAY = 24 * US_PER_HOUR
+
+
+def build_training_features(timestamps, values, window=ROLLING_WINDOW):
     """
-    특정 사이트의 로그 데이터를 학습하여 모델 저장 (사이트 도메인 기반)
+    epoch 마이크로초/응답 시간 배열로 학습 피처 행렬(FEATURE_COLUMNS 순서)을 벡터 연산으로 생성.
+    - hour, dayofweek: UTC 기준 (DB 에서 읽은 timestamp 의 .dt.hour/.dt.dayofweek 와 동일)
+    - rolling_mean/std: 직전 window 개 샘플 (min_periods=1, std 는 ddof=1, 샘플 1개면 0)
+    """
+    n = len(values)
+    X = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float32)
+    X[:, 0] = (timestamps // US_PER_HOUR) % 24
+    X[:, 1] = (timestamps // US_PER_DAY + 3) % 7  # 1970-01-01 은 목요일(3)
+
+    # 누적합으로 윈도우 합/제곱합 계산 (정밀도를 위해 평균 기준으로 이동)
+    v = values.astype(np.float64)
+    shift = v.mean() if n else 0.0
+    centered = v - shift
+    prefix_sum = np.concatenate(([0.0], np.cumsum(centered)))
+    prefix_sq = np.concatenate(([0.0], np.cumsum(centered * centered)))
+
+    right = np.arange(1, n + 1)
+    left = np.maximum(right - window, 0)
+    counts = (right - left).astype(np.float64)
+    window_sum = prefix_sum[right] - prefix_sum[left]
+    window_sq = prefix_sq[right] - prefix_sq[left]
+
+    centered_mean = window_sum / counts
+    X[:, 2] = centered_mean + shift
+    with np.errstate(invalid='ignore', divide='ignore'):
+        variance = (window_sq - window_sum * centered_mean) / (counts - 1)
+    X[:, 3] = np.where(counts > 1, np.sqrt(np.maximum(variance, 0.0)), 0.0)
+    return X
+
+
+def is_model_fresh(site_domain, max_age_seconds):
+    """
+    모델이 존재하고 max_age_seconds 이내에 게시되었는지 확인 (파일 stat 만 사용).
+    """
+    age = registry.model_age_seconds(site_domain)
+    return age is not None and age < max_age_seconds
+
+
+def _fit_site_model(site_domain, n_jobs=None):
+    """
+    사이트 로그로 모델을 학습해 저장하고 (model, 학습 행 수)를 반환. 데이터가 부족하면 (None, 행 수).
+    n_jobs 로 XGBoost 스레드 수를 제한할 수 있다 (None 이면 XGBoost 기본값).
     """
     site = get_object_or_404(Site, domain=site_domain)
-    logs = ResponseTimeLog.objects.filter(site=site).order_by('timestamp')
+    # 정리된 과거 구간은 분 집계로 대체, 나머지는 원본 로그를 배열로 스트리밍
+    timestamps, y = training_arrays(site.id, value_field=settings.MODEL_SIGNAL)
 
     # 최소 데이터 갯수 확인
-    if logs.count() < 30:
+    if len(y) < 30:
         print(f"[INFO] Not enough data to train the model for site: {site.domain}")
-        return None
+        return None, len(y)
 
-    # 데이터프레임 변환
-    data = [{"timestamp": log.timestamp, "response_time": log.response_time} for log in logs]
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])  # Ensure datetime format
-    df['hour'] = df['timestamp'].dt.hour
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    df['rolling_mean'] = df['response_time'].rolling(window=20, min_periods=1).mean()
-    df['rolling_std'] = df['response_time'].rolling(window=20, min_periods=1).std().fillna(0.0)
-
-    # 학습 데이터 준비
-    X = df[['hour', 'dayofweek', 'rolling_mean', 'rolling_std']]
-    y = df['response_time']
+    # 학습 데이터 준비 (피처 이름을 모델에 남기기 위해 DataFrame 으로 감싼다, 복사 없음)
+    X = pd.DataFrame(build_training_features(timestamps, y), columns=FEATURE_COLUMNS, copy=False)
 
     split_idx = int(len(X) * 0.8)
     X_train, X_test = X.iloc[:split_idx], X.iloc[split_idx:]
-    y_train, y_test = y.iloc[:split_idx], y.iloc[split_idx:]
+    y_train, y_test = y[:split_idx], y[split_idx:]
 
     # 모델 학습
-    model = XGBRegressor(n_estimators=100, random_state=42)
+    model = XGBRegressor(n_estimators=100, random_state=42, n_jobs=n_jobs)
     model.fit(X_train, y_train)
 
-    # 파일 이름에 사이트 도메인 포함
-    safe_domain = site_domain.replace(".", "_")
-    model_path = os.path.join(settings.MODEL_STORAGE_DIR, f"{safe_domain}.pkl")
+    # 검증 오차 (뒤쪽 20% 구간)
+    validation_rmse = None
+    if len(X_test):
+        errors = model.predict(X_test) - y_test
+        validation_rmse = float(np.sqrt(np.mean(errors.astype(np.float64) ** 2)))
+
+    # 모델 레지스트리에 새 버전으로 게시
+    version = registry.publish_model(
+        site_domain, model,
+        rows=int(len(y)),
+        train_rows=int(split_idx),
+        validation_rmse=validation_rmse,
+        signal=settings.MODEL_SIGNAL,
+    )
 
-    # 모델 저장
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
+    print(f"[INFO] Trained model published: {site_domain} {version}")
+    return model, len(y)
 
-    print(f"[INFO] Trained model saved at: {model_path}")
+
+@shared_task
+def train_site_model(site_domain, n_jobs=None):
+    """
+    특정 사이트의 로그 데이터를 학습하여 모델 저장 (사이트 도메인 기반)
+    """
+    model, _ = _fit_site_model(site_domain, n_jobs=n_jobs)
     return model
 
 
-def update_site_model(site_domain):
+def run_training_job(site_domain, n_jobs=None):
+    """
+    사이트 하나를 학습하고 결과 요약(dict)을 반환. 예외는 요약에 담아 반환한다.
+    (Celery chord / 로컬 프로세스 풀 모두에서 사용, 결과는 JSON 직렬화 가능)
+    """
+    started = time.perf_counter()
+    try:
+        model, rows = _fit_site_model(site_domain, n_jobs=n_jobs)
+        status = "trained" if model is not None else "skipped"
+        error = None
+    except Exception as e:
+        print(f"[ERROR] Failed to train model for site {site_domain}: {e}")
+        rows, status, error = None, "failed", str(e)
+    return {
+        "site": site_domain,
+        "status": status,
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 3),
+        "error": error,
+    }
+
+
+def summarize_training_results(results, wall_seconds=None):
     """
-    기존 모델에 최근 1분 데이터를 추가 학습
+    사이트별 학습 결과 목록을 집계 (성공/스킵/실패 수, 총 행 수, 느린 사이트 상위 5개).
+    """
+    results = list(results)
+    summary = {
+        "sites": len(results),
+        "trained": sum(1 for r in results if r["status"] == "trained"),
+        "skipped": sum(1 for r in results if r["status"] == "skipped"),
+        "failed": [{"site": r["site"], "error": r["error"]} for r in results if r["status"] == "failed"],
+        "total_rows": sum(r["rows"] or 0 for r in results),
+        "job_seconds": round(sum(r["seconds"] for r in results), 3),
+        "slowest": sorted(
+            ({"site": r["site"], "seconds": r["seconds"], "rows": r["rows"]} for r in results),
+            key=lambda r: r["seconds"], reverse=True,
+        )[:5],
+    }
+    if wall_seconds is not None:
+        summary["wall_seconds"] = round(wall_seconds, 3)
+    return summary
+
+
+def update_site_model(site_domain, n_estimators=100, window_seconds=60):
+    """
+    기존 모델에 최근 window_seconds(기본 1분) 데이터를 추가 학습 (n_estimators 개의 트리를 이어 붙인다)
     """
     site = get_object_or_404(Site, domain=site_domain)
-    logs = ResponseTimeLog.objects.filter(
-        site=site,
-        timestamp__gte=now() - timedelta(minutes=1)
-    ).order_by('timestamp')
+    timestamps, y = stream_response_times(
+        site, start=now() - timedelta(seconds=window_seconds), value_field=settings.MODEL_SIGNAL
+    )
 
-    if logs.count() < 10:
+    if len(y) < 10:
         print(f"[INFO] Not enough data to update the model for site: {site.domain}")
         return None
 
-    # 데이터프레임 생성
-    data = [{"timestamp": log.timestamp, "response_time": log.response_time} for log in logs]
-    df = pd.DataFrame(data)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df['hour'] = df['timestamp'].dt.hour
-    df['dayofweek'] = df['timestamp'].dt.dayofweek
-    df['rolling_mean'] = df['response_time'].rolling(window=20, min_periods=1).mean()
-    df['rolling_std'] = df['response_time'].rolling(window=20, min_periods=1).std().fillna(0.0)
-
     # 학습 데이터 준비
-    X = df[['hour', 'dayofweek', 'rolling_mean', 'rolling_std']]
-    y = df['response_time']
-
-    # 기존 모델 로드
-    safe_domain = site_domain.replace(".", "_")
-    model_path = os.path.join(settings.MODEL_STORAGE_DIR, f"{safe_domain}.pkl")
-    if not os.path.exists(model_path):
-        print(f"[ERROR] Model file not found: {model_path}")
+    X = pd.DataFrame(build_training_features(timestamps, y), columns=FEATURE_COLUMNS, copy=False)
+
+    # 기존 모델 로드 (캐시된 인스턴스를 건드리지 않도록 새로 읽는다)
+    parent_version = registry.current_version(site_domain)
+    existing_model = registry.load_model(site_domain, cached=False)
+    if existing_model is None:
+        print(f"[ERROR] Model not found for site: {site_domain}")
         return None
-    with open(model_path, 'rb') as f:
-        existing_model = pickle.load(f)
 
     # 모델 업데이트
-    model = XGBRegressor(n_estimators=100, random_state=42)
+    model = XGBRegressor(n_estimators=n_estimators, random_state=42)
     model.fit(X, y, xgb_model=existing_model)
-
-    # 업데이트된 모델 저장
-    with open(model_path, 'wb') as f:
-        pickle.dump(model, f)
-
-    print(f"[INFO] Updated model saved at: {model_path}")
+    parent_meta = registry.load_metadata(site_domain, parent_version) or {}
+
+    # 업데이트된 모델을 새 버전으로 게시
+    version = registry.publish_model(
+        site_domain, model,
+        rows=int(len(y)),
+        incremental=True,
+        parent_version=parent_version,
+        incremental_updates=parent_meta.get("incremental_updates", 0) + 1,
+        signal=settings.MODEL_SIGNAL,
+    )
+
+    print(f"[INFO] Updated model published: {site_domain} {version}")
     return model
\ No newline at end of file
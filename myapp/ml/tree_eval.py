@@ -0,0 +1,162 @@
+# tree_eval.py: XGBoost 모델을 평탄한 NumPy 배열로 변환해 순수 NumPy 로 일괄 평가
+# 단일 사이트 조회에서는 XGBoost predict 의 호출 오버헤드(DMatrix 생성, 스레드 기동)가
+# 100개 트리 평가보다 크므로, 작은 배치는 배열 연산으로 직접 평가한다.
+import json
+
+import numpy as np
+
+SUPPORTED_OBJECTIVES = {'reg:squarederror', 'reg:linear'}
+
+
+class FlatForest:
+    """
+    모든 트리의 노드를 하나의 배열로 이어 붙인 회귀 트리 앙상블.
+    - feature[i], threshold[i]: 분기 피처 인덱스와 기준값 (x < threshold 이면 왼쪽)
+    - left[i]: 왼쪽 자식 (오른쪽 자식은 항상 left[i] + 1 에 배치)
+    - 리프는 left 가 자기 자신, threshold 가 NaN 이라(x >= NaN 은 항상 거짓, x = +inf 도) 깊이만큼 반복해도 제자리
+    - default_left[i]: 결측(NaN)일 때 왼쪽으로 갈지 여부
+    - value[i]: 리프 값
+    - roots[t]: t 번째 트리의 루트 노드
+    - fallback: 행 수가 max_rows 를 넘으면 위임할 원본 모델 (없으면 항상 평탄 평가)
+    """
+
+    def __init__(self, feature, threshold, left, default_left, value, roots,
+                 max_depth, base_score, feature_names=None, fallback=None, max_rows=None):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+        self.base_score = np.float32(base_score)
+        self.feature_names = feature_names
+        self.fallback = fallback
+        self.max_rows = max_rows
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def predict(self, X):
+        """
+        XGBRegressor.predict 와 같은 값을 반환 (float32, 트리 순서대로 누적).
+        행이 많으면 XGBoost 의 멀티스레드 C++ 평가가 더 빠르므로 fallback 으로 넘긴다.
+        """
+        if self.fallback is not None and self.max_rows is not None and len(X) > self.max_rows:
+            return self.fallback.predict(X)
+        return self.predict_flat(X)
+
+    def predict_flat(self, X, chunk_size=2048):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float32)
+        for start in range(0, len(X), chunk_size):
+            out[start:start + chunk_size] = self._predict_chunk(X[start:start + chunk_size])
+        return out
+
+    def _predict_chunk(self, X):
+        n_rows, n_features = X.shape
+        flat = np.ascontiguousarray(X).ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int32) * n_features)[:, None]
+        has_nan = bool(np.isnan(flat).any())
+
+        nodes = np.broadcast_to(self.roots, (n_rows, self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = flat[row_offset + self.feature[nodes]]
+            go_right = x >= self.threshold[nodes]
+            if has_nan:
+                go_right = np.where(np.isnan(x), ~self.default_left[nodes], go_right)
+            nodes = self.left[nodes] + go_right
+
+        leaves = self.value[nodes]
+        # XGBoost 와 같은 순서/정밀도로 누적 (base_score 에서 시작해 트리 0 부터 float32 합)
+        total = np.full(n_rows, self.base_score, dtype=np.float32)
+        for t in range(self.n_trees):
+            total += leaves[:, t]
+        return total
+
+
+def _flatten_tree(tree, offset):
+    """
+    한 트리를 너비 우선으로 다시 번호 매겨 형제 노드를 인접하게 배치한다.
+    반환: (feature, threshold, left, default_left, value, max_depth)
+    """
+    t_left = tree['left_children']
+    t_right = tree['right_children']
+    conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+
+    order = [0]
+    new_id = {0: 0}
+    depth = {0: 0}
+    max_depth = 0
+    for node in order:  # order 가 자라면서 너비 우선 순회
+        if t_left[node] != -1:
+            for child in (t_left[node], t_right[node]):
+                new_id[child] = len(order)
+                depth[child] = depth[node] + 1
+                order.append(child)
+            max_depth = max(max_depth, depth[node] + 1)
+
+    n = len(order)
+    feature = np.zeros(n, dtype=np.int32)
+    threshold = np.full(n, np.nan, dtype=np.float32)
+    left = np.arange(n, dtype=np.int32)
+    default_left = np.ones(n, dtype=bool)
+    value = np.zeros(n, dtype=np.float32)
+    for node in order:
+        i = new_id[node]
+        if t_left[node] == -1:
+            value[i] = conditions[node]
+        else:
+            feature[i] = tree['split_indices'][node]
+            threshold[i] = conditions[node]
+            left[i] = new_id[t_left[node]]
+            default_left[i] = bool(tree['default_left'][node])
+    return feature, threshold, left + offset, default_left, value, max_depth
+
+
+def compile_model(model, max_rows=None):
+    """
+    XGBRegressor(또는 Booster)를 FlatForest 로 변환.
+    회귀(squared error) gbtree 모델만 지원한다.
+    max_rows 를 주면 그보다 큰 배치는 원본 모델로 평가한다.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    learner = json.loads(booster.save_raw('json'))['learner']
+
+    objective = learner['objective']['name']
+    if objective not in SUPPORTED_OBJECTIVES:
+        raise ValueError(f"Unsupported objective for flat evaluation: {objective}")
+    gbm = learner['gradient_booster']
+    if gbm.get('name', 'gbtree') != 'gbtree':
+        raise ValueError(f"Unsupported booster for flat evaluation: {gbm.get('name')}")
+    trees = gbm['model']['trees']
+    if int(learner['learner_model_param'].get('num_target', '1')) > 1:
+        raise ValueError("Multi-target models are not supported")
+
+    parts = ([], [], [], [], [])
+    roots = []
+    max_depth = 0
+    offset = 0
+    for tree in trees:
+        *arrays, depth = _flatten_tree(tree, offset)
+        for part, array in zip(parts, arrays):
+            part.append(array)
+        roots.append(offset)
+        max_depth = max(max_depth, depth)
+        offset += len(arrays[0])
+
+    feature, threshold, left, default_left, value = (np.concatenate(p) for p in parts)
+    return FlatForest(
+        feature=feature,
+        threshold=threshold,
+        left=left,
+        default_left=default_left,
+        value=value,
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        base_score=float(learner['learner_model_param']['base_score']),
+        feature_names=booster.feature_names,
+        fallback=model if hasattr(model, 'get_booster') else None,
+        max_rows=max_rows,
+    )
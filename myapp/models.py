@@ -11,7 +11,95 @@ class Site(models.Model):
 class ResponseTimeLog(models.Model):
     site = models.ForeignKey(Site, on_delete=models.CASCADE)  # Site 테이블과 연결
     timestamp = models.DateTimeField()  # 응답 시간
-    response_time = models.FloatField()  # 응답 속도 (초 단위)
+    response_time = models.FloatField()  # 응답 속도 (초 단위, 본문 다운로드까지 포함한 전체 시간)
+    # 단계별 시간 (초, monotonic clock). 재사용된 커넥션이면 dns/connect/tls 는 비어 있다
+    dns_time = models.FloatField(null=True, blank=True)  # DNS 조회
+    connect_time = models.FloatField(null=True, blank=True)  # TCP 연결
+    tls_time = models.FloatField(null=True, blank=True)  # TLS 핸드셰이크 (프록시 CONNECT 포함)
+    ttfb = models.FloatField(null=True, blank=True)  # 요청 시작 → 응답 헤더 수신
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # site + timestamp 범위 조회용 복합 인덱스.
+            # response_time 까지 포함해 인덱스만으로 조회가 끝나도록 한다 (covering).
+            models.Index(fields=['site', 'timestamp', 'response_time'], name='rtlog_site_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.site.domain} | {self.timestamp} => {self.response_time}s"
+
+class ProbeFailure(models.Model):
+    """
+    실패한 크롤링 요청 기록 (ResponseTimeLog 에는 성공한 측정만 남는다)
+    """
+    TIMEOUT = 'timeout'
+    SSL = 'ssl'
+    CONNECTION = 'connection'
+    PROXY = 'proxy'
+    OTHER = 'other'
+    FAILURE_CHOICES = [
+        (TIMEOUT, 'Timeout'),
+        (SSL, 'SSL error'),
+        (CONNECTION, 'Connection error'),
+        (PROXY, 'Proxy error'),
+        (OTHER, 'Other'),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+    failure_class = models.CharField(max_length=16, choices=FAILURE_CHOICES)
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    elapsed = models.FloatField(null=True, blank=True)  # 실패까지 걸린 시간 (초)
+    proxy = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['site', 'timestamp'], name='probefail_site_ts_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.site.domain} | {self.timestamp} => {self.failure_class}"
+
+class ResponseTimeRollup(models.Model):
+    """
+    ResponseTimeLog 의 사이트별 분/시간 단위 집계 (다운샘플링 계층)
+    """
+    TIER_MINUTE = 'minute'
+    TIER_HOUR = 'hour'
+    TIER_CHOICES = [
+        (TIER_MINUTE, 'Minute'),
+        (TIER_HOUR, 'Hour'),
+    ]
+
+    site = models.ForeignKey(Site, on_delete=models.CASCADE)
+    tier = models.CharField(max_length=10, choices=TIER_CHOICES)  # 집계 단위
+    bucket_start = models.DateTimeField()  # 구간 시작 시각 (포함), 구간 끝은 시작 + 단위 (미포함)
+    count = models.IntegerField()  # 샘플 수
+    total = models.FloatField()  # 응답 속도 합계
+    sum_sq = models.FloatField()  # 응답 속도 제곱합
+    min_value = models.FloatField()
+    max_value = models.FloatField()
+    histogram = models.JSONField(default=dict)  # p95 추정용 로그 스케일 히스토그램 {bin: count}
+    max_log_id = models.BigIntegerField(default=0)  # 분 집계에 포함된 ResponseTimeLog 의 최대 id (늦게 들어온 로그 판별용)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['site', 'tier', 'bucket_start'], name='rollup_site_tier_bucket_uniq'),
+        ]
+
+    @property
+    def mean(self):
+        return self.total / self.count
+
+    @property
+    def std(self):
+        return max(self.sum_sq / self.count - self.mean ** 2, 0.0) ** 0.5
+
+    @property
+    def p95(self):
+        from myapp.ml.rollups import sketch_quantile  # 순환 import 방지
+        return sketch_quantile(self.histogram, 0.95, self.max_value)
+
+    def __str__(self):
+        return f"{self.site.domain} | {self.tier} {self.bucket_start} => n={self.count}"
@@ -0,0 +1,228 @@
+# probe_timing.py: 크롤링 요청의 단계별 시간 측정 (monotonic clock)
+# 단계: dns_time, connect_time, tls_time, ttfb(요청 시작 → 응답 헤더), response_time(본문까지 전체)
+# - 동기(requests): TimedHTTPAdapter 의 urllib3 커넥션이 DNS/TCP/TLS 시간을 스레드 로컬 측정값에 기록
+# - 비동기(aiohttp): trace_config() 의 TraceConfig 콜백이 요청별 측정값(trace_request_ctx)에 기록
+#   (aiohttp 는 TLS 를 TCP 연결과 구분하지 않으므로 connect_time 에 TLS 가 포함되고 tls_time 은 비어 있다)
+# 재사용된 keep-alive 커넥션은 연결 단계가 없으므로 dns/connect/tls 값이 없다.
+import asyncio
+import re
+import socket
+import threading
+import time
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from myapp.models import ProbeFailure
+
+PHASE_FIELDS = ("dns_time", "connect_time", "tls_time", "ttfb")
+
+_current = threading.local()
+
+
+# --- requests / urllib3 ------------------------------------------------------
+
+class _TimedConnectionMixin:
+    def _new_conn(self):
+        timings = getattr(_current, "timings", None)
+        if timings is None:
+            return super()._new_conn()
+        host = self._dns_host
+        t0 = time.monotonic()
+        try:
+            address = socket.getaddrinfo(host, self.port, 0, socket.SOCK_STREAM)[0][4][0]
+        except (OSError, UnicodeError):
+            return super()._new_conn()  # 원래 경로에서 urllib3 예외로 변환되도록
+        t1 = time.monotonic()
+        self._dns_host = address  # 이미 조회한 주소로 연결 (SNI/Host 헤더는 self.host 사용)
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        timings["dns_time"] = t1 - t0
+        timings["connect_time"] = time.monotonic() - t1
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        t0 = time.monotonic()
+        super().connect()
+        timings = getattr(_current, "timings", None)
+        if timings is not None and "connect_time" in timings:
+            # _new_conn 이후 (프록시 CONNECT 터널 +) TLS 핸드셰이크에 걸린 시간
+            timings["tls_time"] = max(
+                time.monotonic() - t0 - timings["dns_time"] - timings["connect_time"], 0.0
+            )
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+POOL_CLASSES = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """
+    커넥션 생성 단계를 측정하는 HTTPAdapter (프록시 경유 요청 포함)
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = POOL_CLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        manager.pool_classes_by_scheme = POOL_CLASSES
+        return manager
+
+
+def classify_requests_error(exc):
+    # ProxyError / SSLError / ConnectTimeout 은 모두 ConnectionError 의 하위 클래스라 순서가 중요
+    if isinstance(exc, requests.exceptions.ProxyError):
+        return ProbeFailure.PROXY
+    if isinstance(exc, requests.exceptions.SSLError):
+        return ProbeFailure.SSL
+    if isinstance(exc, requests.exceptions.Timeout):
+        return ProbeFailure.TIMEOUT
+    if isinstance(exc, requests.exceptions.ConnectionError):
+        return ProbeFailure.CONNECTION
+    return ProbeFailure.OTHER
+
+
+_TUNNEL_STATUS = re.compile(r"Tunnel connection failed: (\d{3})")
+
+
+def proxy_status(exc):
+    """
+    프록시가 CONNECT 터널 요청에 HTTP 상태로 답한 실패면 그 상태 (예: 대상 사이트 장애로 502), 아니면 None.
+    상태로 답했다면 프록시 자체는 살아 있다.
+    """
+    status = getattr(exc, "status", None)  # aiohttp.ClientHttpProxyError
+    if isinstance(exc, aiohttp.ClientHttpProxyError) and status:
+        return status
+    if isinstance(exc, requests.exceptions.ProxyError):
+        match = _TUNNEL_STATUS.search(str(exc))
+        return int(match.group(1)) if match else None
+    return None
+
+
+def connected(timings):
+    """
+    실패 전에 (프록시 또는 대상) 연결이 이미 맺어졌는지: 새 연결의 connect_time 이 있거나 재사용 커넥션이었으면 True.
+    """
+    return bool(timings) and ("connect_time" in timings or timings.get("_connected", False))
+
+
+def timed_get(session, url, timeout):
+    """
+    session.get 을 단계별로 측정.
+
+    Returns:
+        (dict, int | None, str | None): 측정값(PHASE_FIELDS + response_time 또는 elapsed),
+        상태 코드(실패면 프록시가 CONNECT 에 답한 상태 또는 None), 실패 분류 (성공이면 None)
+    """
+    timings = {}
+    _current.timings = timings
+    t0 = time.monotonic()
+    try:
+        with session.get(url, timeout=timeout, stream=True) as response:
+            timings["ttfb"] = time.monotonic() - t0
+            response.content  # 본문 다운로드까지 포함
+            timings["response_time"] = time.monotonic() - t0
+            return timings, response.status_code, None
+    except requests.RequestException as e:
+        timings["elapsed"] = time.monotonic() - t0
+        if isinstance(e, requests.exceptions.ReadTimeout):
+            timings["_connected"] = True  # 연결 후(재사용 커넥션 포함) 응답 대기 중 타임아웃
+        print(f"[ERROR] Failed to crawl {url}: {e}")
+        return timings, proxy_status(e), classify_requests_error(e)
+    finally:
+        _current.timings = None
+
+
+# --- aiohttp -----------------------------------------------------------------
+
+def classify_aiohttp_error(exc):
+    if isinstance(exc, asyncio.TimeoutError):
+        return ProbeFailure.TIMEOUT
+    if isinstance(exc, (aiohttp.ClientProxyConnectionError, aiohttp.ClientHttpProxyError)):
+        return ProbeFailure.PROXY
+    if isinstance(exc, aiohttp.ClientSSLError):
+        return ProbeFailure.SSL
+    if isinstance(exc, (aiohttp.ClientConnectionError, aiohttp.ClientOSError)):
+        return ProbeFailure.CONNECTION
+    return ProbeFailure.OTHER
+
+
+class _TraceContext:
+    def __init__(self, trace_request_ctx=None):
+        self.trace_request_ctx = trace_request_ctx if trace_request_ctx is not None else {}
+
+
+async def _on_request_start(session, context, params):
+    context.trace_request_ctx["_start"] = time.monotonic()
+
+
+async def _on_dns_start(session, context, params):
+    context.trace_request_ctx["_dns_start"] = time.monotonic()
+
+
+async def _on_dns_end(session, context, params):
+    timings = context.trace_request_ctx
+    timings["dns_time"] = time.monotonic() - timings.pop("_dns_start")
+
+
+async def _on_connection_start(session, context, params):
+    context.trace_request_ctx["_connect_start"] = time.monotonic()
+
+
+async def _on_connection_end(session, context, params):
+    timings = context.trace_request_ctx
+    # 커넥션 생성 구간에는 DNS 조회도 들어 있으므로 제외
+    elapsed = time.monotonic() - timings.pop("_connect_start")
+    timings["connect_time"] = max(elapsed - timings.get("dns_time", 0.0), 0.0)
+    timings["_connected"] = True
+
+
+async def _on_connection_reuse(session, context, params):
+    context.trace_request_ctx["_connected"] = True
+
+
+async def _on_request_end(session, context, params):
+    timings = context.trace_request_ctx
+    timings["ttfb"] = time.monotonic() - timings["_start"]
+
+
+def trace_config():
+    """
+    요청마다 session.get(..., trace_request_ctx={}) 로 넘긴 dict 에 단계별 시간을 기록하는 TraceConfig
+    """
+    config = aiohttp.TraceConfig(trace_config_ctx_factory=_TraceContext)
+    config.on_request_start.append(_on_request_start)
+    config.on_dns_resolvehost_start.append(_on_dns_start)
+    config.on_dns_resolvehost_end.append(_on_dns_end)
+    config.on_connection_create_start.append(_on_connection_start)
+    config.on_connection_create_end.append(_on_connection_end)
+    config.on_connection_reuseconn.append(_on_connection_reuse)
+    config.on_request_end.append(_on_request_end)
+    return config
+
+
+def phase_values(timings):
+    """
+    측정값에서 저장할 단계별 시간만 추려 반환 (내부용 키 제외, 측정되지 않은 단계는 None)
+    """
+    return {field: timings.get(field) for field in PHASE_FIELDS}
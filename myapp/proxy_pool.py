@@ -0,0 +1,299 @@
+# proxy_pool.py: 상태(health) 기반 프록시 선택 + 서킷 브레이커
+# - 프록시별 성공률/지연 시간 EWMA 를 Redis 에 공유 (Redis 를 못 쓰면 프로세스 로컬 상태로 동작)
+# - 성공률²/지연 시간 가중치로 선택하므로 느리거나 자주 실패하는 프록시는 트래픽을 덜 받는다
+# - 연속 실패(또는 낮은 성공률) 시 open → 쿨다운 후 half_open 에서 한 요청만 흘려 보내 복구 여부 확인
+# - 동기 크롤링(requests)은 프록시별 Session 으로 keep-alive 커넥션을 재사용 (단계별 시간 측정 어댑터)
+import random
+import threading
+import time
+
+import redis
+import requests
+from django.conf import settings
+
+from myapp.models import ProbeFailure
+from myapp.probe_timing import TimedHTTPAdapter, connected
+from myapp.redis_client import redis_client
+
+# 프록시 리스트
+PROXY_LIST = [
+    "134.195.230.206:5725",
+    "134.195.231.33:5988",
+    "216.185.223.54:5577",
+    "134.195.229.107:6176",
+    "216.185.221.79:6781"
+]
+
+# 프록시 인증 정보
+PROXY_AUTH = {
+    "username": "ANPU229576",
+    "password": "BCDLMW39"
+}
+
+STATE_KEY = "proxy:state:{}"
+PROBE_KEY = "proxy:probe:{}"
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+PROXY_FAILURE_STATUS = {407}  # 프록시 자체 오류로 보는 HTTP 상태
+
+# 결과 한 건을 반영해 EWMA/서킷 상태를 원자적으로 갱신 (_apply_outcome 과 같은 규칙)
+# KEYS: state / ARGV: ok, latency, now, alpha, failure_threshold, min_success_rate, min_requests
+_RECORD_LUA = """
+local h = KEYS[1]
+local ok, lat, now, alpha = tonumber(ARGV[1]), tonumber(ARGV[2]), ARGV[3], tonumber(ARGV[4])
+local s = redis.call('HMGET', h, 'success', 'latency', 'consecutive', 'state', 'requests', 'failures')
+local success = tonumber(s[1]) or 1.0
+local latency = tonumber(s[2])
+local consecutive = tonumber(s[3]) or 0
+local state = s[4] or 'closed'
+local requests = (tonumber(s[5]) or 0) + 1
+local failures = tonumber(s[6]) or 0
+success = success + alpha * (ok - success)
+if ok == 1 then
+  consecutive = 0
+  if latency then latency = latency + alpha * (lat - latency) else latency = lat end
+  if state == 'half_open' then state = 'closed' end
+else
+  consecutive = consecutive + 1
+  failures = failures + 1
+  if state == 'half_open' or consecutive >= tonumber(ARGV[5])
+      or (requests >= tonumber(ARGV[7]) and success < tonumber(ARGV[6])) then
+    state = 'open'
+    redis.call('HSET', h, 'opened_at', now)
+  end
+end
+redis.call('HSET', h, 'success', tostring(success), 'latency', tostring(latency or ''),
+           'consecutive', consecutive, 'state', state, 'requests', requests, 'failures', failures)
+return state
+"""
+
+
+def proxy_url(proxy):
+    return f"http://{PROXY_AUTH['username']}:{PROXY_AUTH['password']}@{proxy}"
+
+
+def _parse_state(raw):
+    """
+    Redis HASH(bytes) 또는 로컬 dict → 정규화된 상태 dict
+    """
+    get = (lambda k: raw.get(k.encode(), raw.get(k))) if raw else (lambda k: None)
+
+    def number(key, default):
+        value = get(key)
+        if value in (None, b"", ""):
+            return default
+        return float(value)
+
+    state = get("state")
+    return {
+        "success": number("success", 1.0),
+        "latency": number("latency", None),
+        "consecutive": int(number("consecutive", 0)),
+        "state": state.decode() if isinstance(state, bytes) else (state or CLOSED),
+        "opened_at": number("opened_at", 0.0),
+        "requests": int(number("requests", 0)),
+        "failures": int(number("failures", 0)),
+    }
+
+
+def _apply_outcome(state, ok, latency, now):
+    """
+    로컬 상태에 결과 한 건 반영 (_RECORD_LUA 와 같은 규칙)
+    """
+    alpha = settings.PROXY_EWMA_ALPHA
+    state["requests"] += 1
+    state["success"] += alpha * ((1.0 if ok else 0.0) - state["success"])
+    if ok:
+        state["consecutive"] = 0
+        state["latency"] = latency if state["latency"] is None else state["latency"] + alpha * (latency - state["latency"])
+        if state["state"] == HALF_OPEN:
+            state["state"] = CLOSED
+    else:
+        state["consecutive"] += 1
+        state["failures"] += 1
+        if (state["state"] == HALF_OPEN
+                or state["consecutive"] >= settings.PROXY_FAILURE_THRESHOLD
+                or (state["requests"] >= settings.PROXY_MIN_REQUESTS
+                    and state["success"] < settings.PROXY_MIN_SUCCESS_RATE)):
+            state["state"] = OPEN
+            state["opened_at"] = now
+    return state["state"]
+
+
+class ProxyPool:
+    """
+    프록시 선택/결과 기록/지표 제공.
+    상태 스냅샷은 PROXY_STATE_REFRESH 초 동안 프로세스에 캐시해 요청마다 Redis 를 조회하지 않는다.
+    """
+
+    def __init__(self, proxies, client=None):
+        self.proxies = list(proxies)
+        self.client = client or redis_client
+        self._record_script = self.client.register_script(_RECORD_LUA)
+        self._local = {p: _parse_state(None) for p in self.proxies}  # Redis 장애 시 사용
+        self._local_probe_until = {}
+        self._snapshot = None
+        self._snapshot_at = 0.0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    # --- 상태 조회 -------------------------------------------------------
+
+    def states(self, refresh=False):
+        """
+        proxy → 상태 dict. Redis 를 못 쓰면 로컬 상태.
+        """
+        now = time.monotonic()
+        if not refresh and self._snapshot is not None and now - self._snapshot_at < settings.PROXY_STATE_REFRESH:
+            return self._snapshot
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for proxy in self.proxies:
+                pipe.hgetall(STATE_KEY.format(proxy))
+            snapshot = {p: _parse_state(raw) for p, raw in zip(self.proxies, pipe.execute())}
+        except redis.RedisError:
+            snapshot = {p: dict(s) for p, s in self._local.items()}
+        self._snapshot, self._snapshot_at = snapshot, now
+        return snapshot
+
+    def _weight(self, state):
+        latency = max(state["latency"] or settings.CRAWL_TIMEOUT / 2, 0.05)
+        return max(state["success"], 0.01) ** 2 / latency
+
+    def _claim_probe(self, proxy):
+        """
+        쿨다운이 끝난 open 프록시를 half_open 으로 전환하고 점검 요청 한 건의 권한을 얻는다 (워커 간 하나만).
+        """
+        cooldown = settings.PROXY_CIRCUIT_COOLDOWN
+        try:
+            if not self.client.set(PROBE_KEY.format(proxy), 1, nx=True, ex=int(cooldown)):
+                return False
+            self.client.hset(STATE_KEY.format(proxy), "state", HALF_OPEN)
+        except redis.RedisError:
+            if self._local_probe_until.get(proxy, 0.0) > time.time():
+                return False
+            self._local_probe_until[proxy] = time.time() + cooldown
+            self._local[proxy]["state"] = HALF_OPEN
+        self._snapshot = None
+        return True
+
+    # --- 선택 / 기록 -----------------------------------------------------
+
+    def choose(self):
+        """
+        요청에 사용할 프록시(host:port) 선택.
+        - 쿨다운이 끝난 open 프록시가 있으면 그 프록시로 점검 요청(half-open probe)
+        - 그 외에는 closed 프록시 중 건강도 가중치로 선택
+        - 모두 open 이면 가장 먼저 열린 프록시 (요청을 버리지 않음)
+        """
+        states = self.states()
+        wall = time.time()
+        for proxy, state in states.items():
+            # half_open 인데 점검 결과가 기록되지 않은 채 쿨다운이 지나면(워커 종료 등) 다시 점검
+            if state["state"] != CLOSED and wall - state["opened_at"] >= settings.PROXY_CIRCUIT_COOLDOWN:
+                if self._claim_probe(proxy):
+                    return proxy
+
+        closed = [p for p, s in states.items() if s["state"] == CLOSED]
+        if not closed:
+            return min(states, key=lambda p: states[p]["opened_at"])
+        weights = [self._weight(states[p]) for p in closed]
+        return random.choices(closed, weights=weights, k=1)[0]
+
+    def record(self, proxy, ok, latency=None):
+        self.record_many([(proxy, ok, latency)])
+
+    def record_many(self, outcomes):
+        """
+        (proxy, ok, latency) 결과를 한 번의 파이프라인으로 반영.
+        """
+        outcomes = [o for o in outcomes if o[0] in self._local]
+        if not outcomes:
+            return
+        now = time.time()
+        args_common = [settings.PROXY_EWMA_ALPHA, settings.PROXY_FAILURE_THRESHOLD,
+                       settings.PROXY_MIN_SUCCESS_RATE, settings.PROXY_MIN_REQUESTS]
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for proxy, ok, latency in outcomes:
+                self._record_script(
+                    keys=[STATE_KEY.format(proxy)],
+                    args=[1 if ok else 0, latency or 0, now] + args_common,
+                    client=pipe,
+                )
+            pipe.execute()
+        except redis.RedisError:
+            with self._lock:
+                for proxy, ok, latency in outcomes:
+                    _apply_outcome(self._local[proxy], ok, latency or 0, now)
+        if any(not ok for _, ok, _ in outcomes):
+            self._snapshot = None  # 서킷 상태가 바뀌었을 수 있으므로 다음 선택 때 다시 읽는다
+
+    # --- 커넥션 / 지표 ---------------------------------------------------
+
+    def session(self, proxy):
+        """
+        프록시별 requests.Session (keep-alive 커넥션 풀 재사용)
+        """
+        with self._lock:
+            session = self._sessions.get(proxy)
+            if session is None:
+                session = requests.Session()
+                url = proxy_url(proxy)
+                session.proxies = {"http": url, "https": url}
+                adapter = TimedHTTPAdapter(pool_connections=4, pool_maxsize=settings.CRAWL_PER_HOST_LIMIT)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[proxy] = session
+            return session
+
+    def metrics(self):
+        """
+        프록시별 상태/성공률/지연 시간 EWMA/누적 요청·실패 수
+        """
+        states = self.states(refresh=True)
+        return [
+            {
+                "proxy": proxy,
+                "state": s["state"],
+                "success_rate": round(s["success"], 4),
+                "latency_ewma": None if s["latency"] is None else round(s["latency"], 4),
+                "requests": s["requests"],
+                "failures": s["failures"],
+                "consecutive_failures": s["consecutive"],
+                "weight": round(self._weight(s), 4) if s["state"] == CLOSED else 0.0,
+            }
+            for proxy, s in states.items()
+        ]
+
+    def reset(self, proxy=None):
+        proxies = [proxy] if proxy else self.proxies
+        try:
+            self.client.delete(*[STATE_KEY.format(p) for p in proxies], *[PROBE_KEY.format(p) for p in proxies])
+        except redis.RedisError:
+            pass
+        for p in proxies:
+            self._local[p] = _parse_state(None)
+            self._local_probe_until.pop(p, None)
+        self._snapshot = None
+
+
+def is_proxy_failure(response_time, status_code, failure_class=None, timings=None):
+    """
+    크롤링 결과를 프록시 실패로 볼지 (실패 분류는 probe_timing 의 classify_*_error).
+    - 프록시 실패: 프록시 인증 오류(407), 프록시 연결 실패(proxy), 연결이 맺어지기 전의 연결 오류/타임아웃
+    - 대상 사이트 문제: HTTP 응답(5xx 포함), 프록시가 CONNECT 에 다른 상태로 답한 경우, 연결 후 타임아웃, TLS 오류
+      → 대상 사이트가 내려가도 멀쩡한 프록시의 서킷이 열리지 않는다
+    """
+    if status_code in PROXY_FAILURE_STATUS:
+        return True
+    if response_time != -1 or status_code is not None:
+        return False
+    if failure_class == ProbeFailure.PROXY:
+        return True
+    if failure_class in (ProbeFailure.CONNECTION, ProbeFailure.TIMEOUT):
+        return not connected(timings)
+    return False
+
+
+proxy_pool = ProxyPool(PROXY_LIST)
@@ -0,0 +1,10 @@
+# redis_client.py: 앱 전체에서 공유하는 Redis 클라이언트
+import redis
+from django.conf import settings
+
+# 커넥션 풀을 공유하므로 프로세스당 하나만 생성
+redis_client = redis.StrictRedis.from_url(
+    settings.REDIS_URL,
+    socket_connect_timeout=1,
+    socket_timeout=2,
+)
@@ -0,0 +1,194 @@
+# result_cache.py: best_entry_time 결과 캐시 + 동일 요청 single-flight
+# 릴리즈 직전 같은 사이트/릴리즈 시간 요청이 몰려도 전체 스캔은 (버킷당) 한 번만 수행한다.
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from myapp.ml import registry
+from myapp.ml.rolling_predict import _clamp_to_window, find_best_entry_time, find_best_entry_times
+
+KEY_PREFIX = "best_entry"
+STATS_KEY_PREFIX = "best_entry:stats"
+STATS_FIELDS = ("hits", "misses", "coalesced", "wait_ms")
+POLL_INTERVAL = 0.02  # 다른 프로세스의 계산 결과를 확인하는 간격(초)
+MISSING = object()
+
+# 같은 프로세스 안의 동시 요청은 Event 로 대기 (키 → threading.Event)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def result_key(site_domain, current_time, release_time, version=None):
+    """
+    사이트, 릴리즈 시각, current_time 버킷, 모델 버전으로 캐시 키 생성.
+    새 모델이 배포되면 버전이 바뀌므로 이전 결과는 자연히 사용되지 않는다.
+    """
+    bucket = int(current_time.timestamp()) // settings.RESULT_CACHE_BUCKET_SECONDS
+    version = version or registry.current_version(site_domain) or "legacy"
+    return f"{KEY_PREFIX}:{site_domain}:{int(release_time.timestamp())}:{bucket}:{version}"
+
+
+def _cached_result(key, current_time, release_time):
+    """
+    캐시된 결과를 이 요청 기준으로 확인. 없거나 쓸 수 없으면 MISSING.
+    같은 버킷의 더 이른 current_time 으로 계산된 절대 시각은 이 요청의 current_time 이전일 수 있으므로
+    (current_time, release_time) 구간 안에 있는 결과만 사용한다.
+    """
+    cached = cache.get(key)
+    if cached is None:
+        return MISSING
+    return _usable(cached["optimal_time"], current_time, release_time)
+
+
+def _usable(optimal_time, current_time, release_time):
+    if optimal_time is None or _clamp_to_window(optimal_time, current_time, release_time) == optimal_time:
+        return optimal_time
+    return MISSING
+
+
+def _incr(field, amount=1):
+    key = f"{STATS_KEY_PREFIX}:{field}"
+    try:
+        cache.incr(key, amount)
+    except ValueError:  # 키 없음
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, amount)
+
+
+def _record_wait(started):
+    _incr("coalesced")
+    _incr("wait_ms", int((time.monotonic() - started) * 1000))
+
+
+def _compute(key, site_domain, current_time, release_time):
+    optimal_time = find_best_entry_time(site_domain, current_time, release_time)
+    cache.set(key, {"optimal_time": optimal_time}, timeout=settings.RESULT_CACHE_TTL)
+    _incr("misses")
+    return optimal_time
+
+
+def _lead(key, site_domain, current_time, release_time):
+    """
+    프로세스 간 single-flight: cache.add 로 잠금을 얻은 요청만 계산하고,
+    나머지는 결과가 저장될 때까지 폴링한다.
+    """
+    lock_key = f"{key}:lock"
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout=settings.RESULT_CACHE_LOCK_TIMEOUT):
+        try:
+            return _compute(key, site_domain, current_time, release_time), "miss"
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    started = time.monotonic()
+    deadline = started + settings.RESULT_CACHE_WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        cached = cache.get(key)
+        if cached is not None:
+            optimal_time = _usable(cached["optimal_time"], current_time, release_time)
+            if optimal_time is MISSING:
+                break
+            _record_wait(started)
+            return optimal_time, "coalesced"
+        if cache.get(lock_key) is None:  # 계산하던 요청이 실패/종료
+            break
+    return _compute(key, site_domain, current_time, release_time), "miss"
+
+
+def cached_best_entry_time(site_domain, current_time, release_time):
+    """
+    find_best_entry_time 의 캐시 버전.
+    반환: (optimal_time, outcome) — outcome 은 hit | miss | coalesced | bypass
+    """
+    if not settings.RESULT_CACHE_ENABLED:
+        return find_best_entry_time(site_domain, current_time, release_time), "bypass"
+
+    key = result_key(site_domain, current_time, release_time)
+    optimal_time = _cached_result(key, current_time, release_time)
+    if optimal_time is not MISSING:
+        _incr("hits")
+        return optimal_time, "hit"
+
+    with _inflight_lock:
+        event = _inflight.get(key)
+        leader = event is None
+        if leader:
+            event = _inflight[key] = threading.Event()
+
+    if not leader:
+        started = time.monotonic()
+        event.wait(settings.RESULT_CACHE_WAIT_TIMEOUT)
+        optimal_time = _cached_result(key, current_time, release_time)
+        if optimal_time is not MISSING:
+            _record_wait(started)
+            return optimal_time, "coalesced"
+        return _compute(key, site_domain, current_time, release_time), "miss"
+
+    try:
+        return _lead(key, site_domain, current_time, release_time)
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        event.set()
+
+
+def cached_best_entry_times(site_domain, current_time, release_times):
+    """
+    한 사이트의 여러 발매시간을 한 번에 처리하는 cached_best_entry_time (배치 API 용).
+    캐시에 없거나 이 요청의 구간 밖인 발매시간만 모아 find_best_entry_times 한 번(모델 로드/로그 조회 1회)으로
+    계산하고 함께 저장한다.
+    배치 경로는 single-flight 잠금을 거치지 않으므로, 같은 사이트의 배치/단건 요청이 동시에 캐시를 놓치면
+    각자 스캔한다 (배치 한 번의 스캔이 여러 발매시간을 덮으므로 키별 잠금 대기보다 싸다).
+
+    Returns:
+        list: release_times 와 같은 순서의 (optimal_time, outcome)
+    """
+    release_times = list(release_times)
+    if not settings.RESULT_CACHE_ENABLED:
+        return [(t, "bypass") for t in find_best_entry_times(site_domain, current_time, release_times)]
+
+    version = registry.current_version(site_domain) or "legacy"
+    keys = [result_key(site_domain, current_time, release_time, version) for release_time in release_times]
+    cached = cache.get_many(keys)
+    results = []
+    for key, release_time in zip(keys, release_times):
+        optimal_time = (_usable(cached[key]["optimal_time"], current_time, release_time)
+                        if key in cached else MISSING)
+        results.append(None if optimal_time is MISSING else (optimal_time, "hit"))
+
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        computed = find_best_entry_times(site_domain, current_time, [release_times[i] for i in missing])
+        cache.set_many({keys[i]: {"optimal_time": t} for i, t in zip(missing, computed)},
+                       timeout=settings.RESULT_CACHE_TTL)
+        for i, optimal_time in zip(missing, computed):
+            results[i] = (optimal_time, "miss")
+        _incr("misses", len(missing))
+    if len(keys) > len(missing):
+        _incr("hits", len(keys) - len(missing))
+    return results
+
+
+def stats():
+    """
+    공유 캐시에 누적된 결과 캐시 지표.
+    hit_rate 는 직접 계산하지 않은 요청(hit + coalesced)의 비율, avg_wait_ms 는 coalesced 요청의 평균 대기 시간.
+    """
+    values = cache.get_many([f"{STATS_KEY_PREFIX}:{f}" for f in STATS_FIELDS])
+    counts = {f: int(values.get(f"{STATS_KEY_PREFIX}:{f}", 0)) for f in STATS_FIELDS}
+    requests = counts["hits"] + counts["misses"] + counts["coalesced"]
+    return {
+        **counts,
+        "requests": requests,
+        "hit_rate": (counts["hits"] + counts["coalesced"]) / requests if requests else 0.0,
+        "avg_wait_ms": counts["wait_ms"] / counts["coalesced"] if counts["coalesced"] else 0.0,
+    }
+
+
+def reset_stats():
+    cache.delete_many([f"{STATS_KEY_PREFIX}:{f}" for f in STATS_FIELDS])
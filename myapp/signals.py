@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+import redis
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from myapp import crawl_scheduler, site_cache
 from myapp.models import Site
-from myapp.tasks import crawl_site, schedule_regular_crawling, activate_fast_mode
+from myapp.tasks import crawl_site, activate_fast_mode
 
 @receiver(post_save, sender=Site)
 def start_crawl_on_new_site(sender, instance, created, **kwargs):
@@ -12,5 +17,30 @@ def start_crawl_on_new_site(sender, instance, created, **kwargs):
         print(f"[SIGNAL] New site added: {instance.domain}")
         crawl_site.delay(instance.domain)  # 즉시 크롤링 실행
 
-        # 주기적 크롤링 업데이트 스케줄링
-        schedule_regular_crawling.delay()
+    # 정기 크롤링 스케줄 갱신 (활성 사이트만 유지)
+    transaction.on_commit(partial(_update_schedule, instance.domain, instance.active))
+
+@receiver(post_delete, sender=Site)
+def unschedule_deleted_site(sender, instance, **kwargs):
+    transaction.on_commit(partial(_update_schedule, instance.domain, False))
+
+def _update_schedule(domain, active):
+    """
+    커밋 후 크롤링 스케줄(ZSET) 갱신. 롤백된 저장은 스케줄에 남지 않고,
+    Redis 장애는 사이트 저장을 막지 않는다 (놓친 변경은 sync_sites 가 맞춘다).
+    """
+    try:
+        if active:
+            crawl_scheduler.add_site(domain)
+        else:
+            crawl_scheduler.remove_site(domain)
+    except redis.RedisError as e:
+        print(f"[WARNING] Crawl schedule update skipped for {domain}: {e}")
+
+@receiver(post_save, sender=Site)
+@receiver(post_delete, sender=Site)
+def invalidate_site_list(sender, **kwargs):
+    """
+    사이트 목록 캐시 무효화. 커밋 전 데이터로 목록이 다시 캐시되지 않도록 커밋 후에 갱신한다.
+    """
+    transaction.on_commit(site_cache.invalidate)
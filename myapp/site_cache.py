@@ -0,0 +1,53 @@
+# site_cache.py: 사이트 목록 공유 캐시 (/api/sites/, 사이트 리스트 페이지)
+# - 목록은 마지막 변경 시각(sites:changed_at)이 들어간 키에 보관하고, Site 저장/삭제 시그널이 변경 시각을 갱신해 무효화한다
+#   (무효화와 겹쳐 이전 데이터로 다시 만든 목록은 이전 키에 남으므로 새 키로 게시되지 않는다)
+# - 변경 시각은 ETag / Last-Modified 로도 사용해, 바뀌지 않은 목록은 DB 조회 없이 304 로 응답한다
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+from myapp.models import Site
+
+CHANGED_KEY = "sites:changed_at"
+LIST_KEY = "sites:list:{}"
+
+
+def changed_at():
+    """
+    사이트 목록의 마지막 변경 시각 (epoch 마이크로초). 기록이 없으면(캐시 초기화 등) 지금부터 시작한다.
+    """
+    stamp = cache.get(CHANGED_KEY)
+    if stamp is None:
+        cache.add(CHANGED_KEY, time.time_ns() // 1000, timeout=None)
+        stamp = cache.get(CHANGED_KEY)
+    return stamp
+
+
+def etag():
+    return f'"sites-{changed_at()}"'
+
+
+def last_modified():
+    return datetime.fromtimestamp(changed_at() / 1_000_000, tz=timezone.utc)
+
+
+def get_sites():
+    """
+    전체 사이트 목록 [{"id", "domain", "name", "active"}] (id 순). 캐시에 없으면 한 번의 쿼리로 만든다.
+    """
+    key = LIST_KEY.format(changed_at())
+    sites = cache.get(key)
+    if sites is None:
+        sites = list(Site.objects.order_by('id').values('id', 'domain', 'name', 'active'))
+        cache.set(key, sites, timeout=settings.SITE_LIST_CACHE_TTL)
+    return sites
+
+
+def invalidate():
+    """
+    변경 시각을 갱신해 이후 요청이 새 목록을 만들게 한다 (이전 목록 키는 TTL 로 만료).
+    """
+    previous = cache.get(CHANGED_KEY) or 0
+    cache.set(CHANGED_KEY, max(time.time_ns() // 1000, previous + 1), timeout=None)
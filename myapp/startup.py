@@ -0,0 +1,83 @@
+# startup.py: 서버/워커 시작 시 모델 점검 (settings.MODEL_STARTUP_TRAINING)
+# - skip : 아무 것도 하지 않음
+# - lazy : 모델 파일이 없거나 오래된 사이트만 백그라운드 학습 예약 (기본값)
+# - eager: 모든 사이트를 시작 시점에 동기 학습 (기존 동작)
+# AppConfig.ready() 가 아니라 서버/워커 진입점에서만 호출한다:
+# myproject/wsgi.py, myproject/asgi.py (runserver, gunicorn, uvicorn), Celery worker_ready (myproject/celery.py).
+# 관리 명령, celery beat, django.setup() 만 하는 스크립트에서는 실행되지 않는다.
+import time
+
+import redis
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.utils import OperationalError, ProgrammingError
+
+STARTUP_TRAIN_KEY = "model:startup_train:{}"  # 시작 시 학습 예약 중복 방지 (사이트별)
+
+
+def run_startup_model_check():
+    mode = settings.MODEL_STARTUP_TRAINING
+    if mode == 'skip':
+        return
+
+    started = time.perf_counter()
+    try:
+        if mode == 'eager':
+            _train_all_sites()
+        else:
+            _enqueue_stale_sites()
+    except (OperationalError, ProgrammingError):
+        print("[INFO] Database not ready. Skipping model training during initialization.")
+    print(f"[INFO] Startup model check ({mode}) finished in {time.perf_counter() - started:.3f}s")
+
+
+def _train_all_sites():
+    from myapp.models import Site
+    from myapp.ml.training import train_site_model
+
+    for site in Site.objects.all():
+        try:
+            print(f"[INFO] Training model for site: {site.domain}")
+            train_site_model(site.domain)
+        except ObjectDoesNotExist:
+            print(f"[WARNING] Site not found: {site.domain}. Skipping training.")
+        except Exception as e:
+            print(f"[ERROR] Failed to train model for site {site.domain}: {e}")
+
+
+def _enqueue_stale_sites():
+    from myapp.models import Site
+    from myapp.ml.training import is_model_fresh, train_site_model
+    from myapp.redis_client import redis_client
+
+    stale = [
+        domain for domain in Site.objects.values_list('domain', flat=True)
+        if not is_model_fresh(domain, settings.MODEL_STALE_AFTER_SECONDS)
+    ]
+    if not stale:
+        return
+
+    # 여러 프로세스(웹 워커, Celery 워커)가 동시에 시작해도 사이트당 한 번만 예약.
+    # 데이터가 부족해 모델이 만들어지지 않는 사이트도 TTL 동안은 다시 예약하지 않는다.
+    try:
+        claimed = [
+            domain for domain in stale
+            if redis_client.set(STARTUP_TRAIN_KEY.format(domain), 1, nx=True,
+                                ex=settings.MODEL_STALE_AFTER_SECONDS)
+        ]
+    except redis.RedisError as e:
+        # 브로커도 같은 Redis 이므로 예약할 수 없다
+        print(f"[WARNING] Redis unavailable, skipping startup training for {len(stale)} stale sites: {e}")
+        return
+
+    for i, domain in enumerate(claimed):
+        try:
+            # 브로커 장애 시 재시도하며 시작을 지연시키지 않도록 retry=False
+            train_site_model.apply_async(args=[domain], retry=False)
+        except Exception as e:
+            # 브로커에 연결할 수 없으면 나머지 사이트도 실패하므로 중단, 예약 표시는 되돌려 다음 시작 때 재시도
+            print(f"[WARNING] Could not enqueue training for {len(claimed) - i} stale sites: {e}")
+            redis_client.delete(*[STARTUP_TRAIN_KEY.format(d) for d in claimed[i:]])
+            return
+    if claimed:
+        print(f"[INFO] Enqueued background training for {len(claimed)} stale sites.")
@@ -1,46 +1,25 @@
-import random
 import time as _time
-import redis
-import requests
-from celery import shared_task
+import uuid
+from datetime import timedelta
+
+from celery import chord, shared_task
+from django.conf import settings
 from django.core.cache import cache
-from django.utils.timezone import now
-from myapp.ml.training import train_site_model
-from myapp.models import Site, ResponseTimeLog
-
-# Redis 클라이언트 설정
-redis_client = redis.StrictRedis(host='localhost', port=6379, db=0)
-
-# 프록시 리스트
-PROXY_LIST = [
-    "134.195.230.206:5725",
-    "134.195.231.33:5988",
-    "216.185.223.54:5577",
-    "134.195.229.107:6176",
-    "216.185.221.79:6781"
-]
-
-# 프록시 인증 정보
-PROXY_AUTH = {
-    "username": "ANPU229576",
-    "password": "BCDLMW39"
-}
-
-def get_random_proxy():
-    """랜덤으로 프록시를 선택하고 인증 정보를 포함한 프록시 URL을 반환합니다."""
-    proxy = random.choice(PROXY_LIST)
-    return {
-        "http": f"http://{PROXY_AUTH['username']}:{PROXY_AUTH['password']}@{proxy}",
-        "https": f"http://{PROXY_AUTH['username']}:{PROXY_AUTH['password']}@{proxy}"
-    }
-
-def normalize_domain_for_db(domain: str) -> str:
-    """도메인을 데이터베이스에 저장하기 위해 정규화합니다."""
-    return domain.replace("https://", "").replace(".", "_")
-
-def denormalize_domain_from_db(domain: str) -> str:
-    """데이터베이스에서 도메인을 원래 형식으로 복원합니다."""
-    return f"https://{domain.replace('_', '.')}"
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from myapp.ml import retrain, rollups
+from myapp.ml.training import run_training_job, summarize_training_results, train_site_model
+from myapp import crawl_scheduler
+from myapp.crawler import (
+    crawl_domains,
+    denormalize_domain_from_db,
+    normalize_domain_for_db,
+    record_crawl_result,
+)
+from myapp.models import Site
+from myapp.ingest import flush_buffer
+from myapp.probe_timing import timed_get
+from myapp.proxy_pool import is_proxy_failure, proxy_pool
 
 @shared_task
 def set_event_mode(site_domain: str, enable: bool):
@@ -51,134 +30,282 @@ def set_event_mode(site_domain: str, enable: bool):
         cache.set(f"fast_mode_{site_domain}", True, timeout=60)
         print(f"[INFO] Fast mode activated for site {site_domain}.")
     else:
-        cache.delete(f"fast_mode_{site_domain}")
+        # 세션을 지우면 진행 중인 fast_mode_tick 체인은 다음 tick 에서 멈춘다
+        cache.delete_many([f"fast_mode_{site_domain}", f"fast_mode_session_{site_domain}"])
         print(f"[INFO] Fast mode deactivated for site {site_domain}.")
 
 @shared_task
 def crawl_site(domain: str):
-    """프록시를 사용하여 사이트를 크롤링하고 응답 시간을 기록합니다."""
+    """프록시 풀에서 고른 프록시로 사이트를 크롤링하고 단계별 응답 시간을 기록합니다."""
     denormalized_domain = denormalize_domain_from_db(domain)
-    proxies = get_random_proxy()  # 랜덤 프록시 선택
-
-    try:
-        t0 = now().timestamp()
-        response = requests.get(denormalized_domain, timeout=10, proxies=proxies)
-        response_time = now().timestamp() - t0
-        status_code = response.status_code
-    except requests.exceptions.Timeout:
-        print(f"[ERROR] Timeout while crawling {denormalized_domain}")
-        response_time = -1
-        status_code = None
-    except requests.exceptions.SSLError:
-        print(f"[ERROR] SSL error while crawling {denormalized_domain}")
-        response_time = -1
-        status_code = None
-    except requests.RequestException as e:
-        print(f"[ERROR] Failed to crawl {denormalized_domain}: {e}")
-        response_time = -1
-        status_code = None
-
-    site_obj = Site.objects.filter(domain=domain).first()
-    if site_obj:
-        if response_time != -1:  # 유효한 응답 시간만 기록
-            ResponseTimeLog.objects.create(
-                site=site_obj,
-                timestamp=now(),
-                response_time=round(response_time, 3)
-            )
-            print(f"[CRAWL] {denormalized_domain} => {response_time:.3f}s (status: {status_code})")
-        else:
-            print(f"[CRAWL] {denormalized_domain} => Failed to crawl")
-    else:
-        print(f"[ERROR] Site not found for domain: {domain}")
+    proxy = proxy_pool.choose()  # 건강도 가중치로 프록시 선택
+    session = proxy_pool.session(proxy)  # 프록시별 keep-alive 세션 (단계별 시간 측정 어댑터)
+
+    timings, status_code, failure_class = timed_get(session, denormalized_domain, timeout=10)
+    response_time = -1 if failure_class else timings["response_time"]
+
+    record_crawl_result(domain, response_time, status_code, timings, failure_class, proxy)
+    proxy_pool.record(proxy, not is_proxy_failure(response_time, status_code, failure_class, timings), response_time)
 
 @shared_task
-def update_predictions_and_train(site_domain: str, release_time):
+def crawl_sites_batch(domains=None):
     """
-    release_time을 인자로 받아 Fast Mode 동작.
+    여러 사이트를 asyncio 크롤 엔진으로 동시에 크롤링.
+    domains 가 없으면 Fast Mode 가 아닌 모든 활성 사이트를 대상으로 한다.
     """
-    site = Site.objects.filter(domain=site_domain, active=True).first()
-    if not site:
-        print(f"[ERROR] Site not found or inactive: {site_domain}")
-        return
+    if domains is None:
+        domains = [
+            normalize_domain_for_db(site.domain)
+            for site in Site.objects.filter(active=True)
+            if not cache.get(f"fast_mode_{site.domain}")
+        ]
+    results = crawl_domains(domains)
+    failed = sum(1 for r in results if r["response_time"] == -1)
+    print(f"[INFO] Batch crawl finished: {len(results)} sites, {failed} failed.")
+    return {"crawled": len(results), "failed": failed}
+
+@shared_task
+def flush_response_logs():
+    """
+    수집 버퍼(Redis)에 쌓인 응답 시간 샘플을 DB에 일괄 기록.
+    """
+    written = flush_buffer()
+    if written:
+        print(f"[INGEST] Flushed {written} response time logs.")
+    return written
+
+@shared_task
+def compact_rollups():
+    """
+    닫힌 분/시간 구간의 응답 시간을 집계 테이블에 반영.
+    """
+    totals = rollups.compact_all()
+    print(f"[ROLLUP] Compacted {totals['minute']} minute / {totals['hour']} hour buckets.")
+    return totals
+
+@shared_task
+def prune_raw_logs():
+    """
+    보존 기간이 지난(그리고 집계가 끝난) 원본 응답 시간 로그 삭제.
+    """
+    deleted = rollups.prune_raw_logs()
+    print(f"[ROLLUP] Pruned {deleted} raw response time logs.")
+    return deleted
+
+@shared_task
+def archive_cold_logs():
+    """
+    보관 기간이 지난(그리고 집계가 끝난) 원본 응답 시간 로그를 컬럼 파일 아카이브로 이동.
+    """
+    rows, days = rollups.archive_cold_logs()
+    print(f"[ARCHIVE] Archived {rows} raw response time logs ({days} site-days).")
+    return rows
+
+def _parse_release_time(release_time):
+    """
+    태스크 인자로 받은 release_time(datetime 또는 JSON 직렬화된 ISO 문자열) → aware datetime
+    """
+    if isinstance(release_time, str):
+        release_time = parse_datetime(release_time)
+    if release_time is not None and is_naive(release_time):
+        release_time = make_aware(release_time)
+    return release_time
+
+
+def _fast_mode_until(release_time):
+    """
+    이번 활성화로 Fast Mode 가 유지될 시각: 마지막 요청 후 FAST_MODE_DURATION 또는 릴리즈 직후 중 이른 쪽
+    """
+    return min(
+        now() + timedelta(seconds=settings.FAST_MODE_DURATION),
+        release_time + timedelta(seconds=settings.FAST_MODE_AFTER_RELEASE),
+    )
+
+
+def _start_fast_mode(site_domain, release_time):
+    """
+    Fast Mode 세션을 시작하거나(첫 tick 예약) 이미 진행 중이면 종료 시각만 늘린다.
+    세션: cache fast_mode_session_<site> = {"token", "until"} — token 이 다른 tick 체인은 스스로 멈춘다.
+
+    Returns:
+        bool: 새 체인을 시작했으면 True
+    """
+    release_time = _parse_release_time(release_time)
+    if not release_time or now() >= release_time:
+        print(f"[INFO] Release time not provided or already passed for site: {site_domain}")
+        return False
+
+    session_key = f"fast_mode_session_{site_domain}"
+    session_timeout = settings.FAST_MODE_DURATION + settings.FAST_MODE_AFTER_RELEASE + settings.FAST_MODE_INTERVAL
+    until = _fast_mode_until(release_time)
+    session = {"token": uuid.uuid4().hex, "until": until}
+    if cache.add(session_key, session, timeout=session_timeout):
+        cache.set(f"fast_mode_{site_domain}", True, timeout=settings.FAST_MODE_INTERVAL * 3)
+        fast_mode_tick.delay(site_domain, session["token"])
+        print(f"[INFO] Fast mode session started for site {site_domain} (until {until}).")
+        return True
 
-    current_time = now()
+    extend_fast_mode(site_domain, release_time)
+    return False
 
-    # release_time이 None인 경우 처리
-    if not release_time:
-        print(f"[INFO] Release time not provided for site: {site.domain}")
+
+def extend_fast_mode(site_domain, release_time):
+    """
+    진행 중인 Fast Mode 세션의 종료 시각을 이번 요청 기준(_fast_mode_until)으로 늘린다 (줄이지는 않음).
+    태스크를 예약하지 않고 캐시만 갱신하므로 Fast Mode 중 들어오는 요청마다 뷰에서 직접 호출한다.
+
+    Returns:
+        bool: 연장했으면 True (세션이 없으면 False)
+    """
+    release_time = _parse_release_time(release_time)
+    if not release_time or now() >= release_time:
+        return False
+    session_key = f"fast_mode_session_{site_domain}"
+    session = cache.get(session_key)
+    until = _fast_mode_until(release_time)
+    if not session or until <= session["until"]:
+        return False
+    session["until"] = until
+    session_timeout = settings.FAST_MODE_DURATION + settings.FAST_MODE_AFTER_RELEASE + settings.FAST_MODE_INTERVAL
+    cache.set(session_key, session, timeout=session_timeout)
+    print(f"[INFO] Fast mode session extended for site {site_domain} (until {until}).")
+    return True
+
+
+@shared_task
+def fast_mode_tick(site_domain: str, token: str):
+    """
+    Fast Mode 한 주기: 크롤링/재학습을 예약하고 FAST_MODE_INTERVAL 뒤의 자신을 다시 예약한다.
+    sleep 으로 워커를 붙잡지 않으므로 solo 풀에서도 다른 태스크가 사이사이 실행된다.
+    세션이 없거나(비활성화) token 이 다르면(새 세션) 조용히 종료.
+    """
+    session_key = f"fast_mode_session_{site_domain}"
+    session = cache.get(session_key)
+    if not session or session["token"] != token:
+        print(f"[INFO] Fast mode chain for site {site_domain} cancelled.")
         return
 
-    # 이미 release_time이 지난 경우에는 빠른 모드 실행 불필요
-    if current_time >= release_time:
-        print(f"[INFO] Release time has passed for site: {site.domain}")
+    if now() >= session["until"]:
+        cache.delete_many([session_key, f"fast_mode_{site_domain}"])
+        print(f"[INFO] Completed fast-mode crawling and training for site: {site_domain}")
         return
 
-    # 총 6번의 빠른 크롤링과 모델 재학습
-    for _ in range(6):
-        crawl_site(site_domain)
-        print(f"[INFO] Re-training model for site: {site.domain}")
-        train_site_model.delay(site_domain)
-        _time.sleep(10)
+    if not Site.objects.filter(domain=site_domain, active=True).exists():
+        cache.delete_many([session_key, f"fast_mode_{site_domain}"])
+        print(f"[ERROR] Site not found or inactive: {site_domain}")
+        return
 
-    print(f"[INFO] Completed fast-mode crawling and training for site: {site.domain}")
+    cache.set(f"fast_mode_{site_domain}", True, timeout=settings.FAST_MODE_INTERVAL * 3)
+    crawl_site.delay(site_domain)
+    retrain.request_retrain(site_domain)
+    fast_mode_tick.apply_async(args=[site_domain, token], countdown=settings.FAST_MODE_INTERVAL)
+
+@shared_task
+def retrain_site(site_domain: str):
+    """
+    재학습 조정기(myapp.ml.retrain)가 예약하는 사이트 재학습.
+    최소 간격이 남았거나 다른 워커가 학습 중이면 다시 예약한다 (대기 표시는 유지되어 요청이 계속 합쳐진다).
+    """
+    result = retrain.run_retrain(site_domain)
+    if result == "locked":
+        retrain_site.apply_async(args=[site_domain], countdown=settings.RETRAIN_MIN_INTERVAL)
+    elif isinstance(result, float):
+        retrain_site.apply_async(args=[site_domain], countdown=result)
+    else:
+        print(f"[INFO] Retrain for site {site_domain}: {result}")
+    return result
+
+@shared_task
+def update_predictions_and_train(site_domain: str, release_time):
+    """
+    release_time을 인자로 받아 Fast Mode 동작.
+    (이전 버전과의 호환용: 이미 큐에 들어간 작업은 fast_mode_tick 체인으로 넘긴다)
+    """
+    _start_fast_mode(site_domain, release_time)
 
 @shared_task
 def schedule_regular_crawling():
     """
-    활성화된 사이트마다 정기 크롤링을 스케줄링.
-    Fast Mode 중인 사이트는 스킵.
+    정기 크롤링 스케줄(crawl_scheduler)을 활성 사이트 목록과 동기화.
+    실제 크롤링 예약은 dispatch_due_crawls 가 예정 시각이 된 사이트만 골라 수행한다.
+    """
+    added, removed = crawl_scheduler.sync_sites()
+    if added or removed:
+        print(f"[SCHEDULE] Crawl schedule synced: +{added} / -{removed} sites.")
+
+@shared_task
+def dispatch_due_crawls():
+    """
+    예정 시각이 지난 사이트를 배치로 꺼내 crawl_sites_batch 로 넘긴다 (CRAWL_SCHEDULER_TICK 마다 실행).
+    Fast Mode 중인 사이트는 fast_mode_tick 이 크롤링하므로 건너뛴다 (다음 주기로 밀림).
+    """
+    batch_size = settings.CRAWL_DISPATCH_BATCH_SIZE
+    dispatched = skipped = 0
+    while dispatched + skipped < settings.CRAWL_SCHEDULER_MAX_DUE:
+        due = crawl_scheduler.pop_due(batch_size)
+        if not due:
+            break
+        fast = cache.get_many([f"fast_mode_{domain}" for domain in due])
+        domains = [normalize_domain_for_db(d) for d in due if not fast.get(f"fast_mode_{d}")]
+        skipped += len(due) - len(domains)
+        if domains:
+            crawl_sites_batch.delay(domains)
+            dispatched += len(domains)
+        if len(due) < batch_size:
+            break
+    if dispatched or skipped:
+        print(f"[SCHEDULE] Dispatched {dispatched} due crawls ({skipped} in fast mode).")
+    return {"dispatched": dispatched, "skipped": skipped}
+
+@shared_task
+def train_site_job(site_domain: str, n_jobs=None):
+    """
+    사이트 하나의 학습 작업 (daily_train_models 의 fan-out 단위).
     """
-    sites = Site.objects.filter(active=True)
-    for site in sites:
-        if cache.get(f"fast_mode_{site.domain}"):
-            print(f"[INFO] Fast mode is active for site {site.domain}. Skipping regular crawling.")
-            continue
+    return run_training_job(site_domain, n_jobs=n_jobs)
 
-        domain = normalize_domain_for_db(site.domain)
-        delay = random.uniform(60, 180)  # 1~3분 랜덤 지연
-        print(f"[SCHEDULE] Next crawl for {domain} in {delay:.1f} seconds.")
-        crawl_site.apply_async(args=[domain], countdown=delay)
+@shared_task
+def summarize_training(results, started_at=None):
+    """
+    daily_train_models chord 콜백: 사이트별 학습 결과를 집계해 로그로 남긴다.
+    """
+    wall_seconds = _time.time() - started_at if started_at else None
+    summary = summarize_training_results(results, wall_seconds)
+    print(f"[INFO] Completed daily model training: {summary['trained']} trained, "
+          f"{summary['skipped']} skipped, {len(summary['failed'])} failed, "
+          f"{summary['total_rows']} rows.")
+    for failure in summary["failed"]:
+        print(f"[ERROR] Failed to train model for site {failure['site']}: {failure['error']}")
+    return summary
 
 @shared_task
 def daily_train_models():
     """
     하루 한 번씩 모든 활성 사이트에 대한 모델 학습.
+    사이트별 학습을 chord 로 분산하고, 끝나면 summarize_training 이 결과를 집계한다.
     """
-    sites = Site.objects.filter(active=True)
-    for site in sites:
-        try:
-            print(f"[INFO] Training model for site: {site.domain}")
-            train_site_model(site.domain)
-        except Exception as e:
-            print(f"[ERROR] Failed to train model for site {site.domain}: {e}")
-            continue
+    domains = list(Site.objects.filter(active=True).values_list('domain', flat=True))
+    if not domains:
+        print("[INFO] No active sites to train.")
+        return
 
-    print("[INFO] Completed daily model training for all sites.")
+    n_jobs = settings.TRAINING_THREADS_PER_JOB
+    header = [train_site_job.s(domain, n_jobs) for domain in domains]
+    chord(header)(summarize_training.s(started_at=_time.time()))
+    print(f"[INFO] Dispatched daily model training for {len(domains)} sites.")
 
 @shared_task
 def activate_fast_mode(site_domain: str, release_time):
     """
     Fast Mode 활성화 태스크.
-    이미 Fast Mode면 TTL 갱신 후 크롤링/학습 다시 수행.
+    여러 번 호출해도 tick 체인은 하나만 돌고, 이미 진행 중이면 종료 시각만 연장된다.
     """
-    if cache.get(f"fast_mode_{site_domain}"):
-        print("[INFO] Fast mode is already activated. Renewing TTL and re-running tasks.")
-        # Fast Mode 유지 시간을 새로 갱신(재설정)
-        cache.set(f"fast_mode_{site_domain}", True, timeout=60)
-        # 추가적으로 크롤링 & 재학습 재개
-        update_predictions_and_train.delay(site_domain, release_time)
-        return
-
-    # 처음 Fast Mode 켜는 경우
-    set_event_mode(site_domain, enable=True)
-    update_predictions_and_train.delay(site_domain, release_time)
-    print(f"[INFO] Fast mode activated for site {site_domain}.")
+    _start_fast_mode(site_domain, release_time)
 
 @shared_task
 def deactivate_fast_mode(site_domain: str):
     """
-    Fast Mode 비활성화 태스크.
+    Fast Mode 비활성화 태스크. 진행 중인 tick 체인은 다음 주기에 멈춘다.
     """
     set_event_mode(site_domain, enable=False)
-    print(f"[INFO] Fast mode deactivated for site {site_domain}.")
\ No newline at end of file
+    print(f"[INFO] Fast mode deactivated for site {site_domain}.")
@@ -1,3 +1,1091 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+import redis
+import requests
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+
+from myapp import ingest, live_window, metrics, proxy_pool, result_cache, views
+from myapp.crawler import crawl_domains
+from myapp.ml import predict_flow, retrain, rollups, rolling_predict
+from myapp.ml.log_queries import to_epoch_us
+from myapp.ml.training import train_site_model
+from myapp.models import ProbeFailure, Site, ResponseTimeLog, ResponseTimeRollup
+from myproject import settings as project_settings
+
+try:
+    import fakeredis  # Lua 스크립트(EVALSHA)는 lupa 가 필요
+    import lupa  # noqa: F401
+except ImportError:
+    fakeredis = None
+
+# 테스트는 Redis 없이 프로세스 로컬 캐시 사용
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        if self.path == "/broken":
+            self.send_response(500)
+        else:
+            self.send_response(200)
+        body = b"ok"
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(CRAWL_USE_PROXY=False, CRAWL_TIMEOUT=2, INGEST_BUFFER_ENABLED=False,
+                   LIVE_WINDOW_ENABLED=False, CACHES=LOCMEM_CACHES)
+class CrawlEngineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def _url(self, domain):
+        port = self.server.server_address[1]
+        if domain == "down_example_com":
+            return "http://127.0.0.1:1/"  # 연결 거부
+        return f"http://127.0.0.1:{port}/{domain}"
+
+    def test_crawl_records_successful_probes(self):
+        # bulk_create 로 생성해 post_save 시그널(크롤링 예약)을 건너뛴다
+        Site.objects.bulk_create([Site(domain=f"site{i}_example_com") for i in range(20)])
+        domains = [f"site{i}_example_com" for i in range(20)]
+
+        results = crawl_domains(domains, concurrency=5, url_builder=self._url)
+
+        self.assertEqual(len(results), 20)
+        self.assertTrue(all(r["status_code"] == 200 for r in results))
+        self.assertEqual(ResponseTimeLog.objects.count(), 20)
+
+    def test_failed_probe_is_not_recorded(self):
+        site = Site.objects.bulk_create([Site(domain="down_example_com")])[0]
+
+        results = crawl_domains(["down_example_com"], url_builder=self._url)
+
+        self.assertEqual(results[0]["response_time"], -1)
+        self.assertFalse(ResponseTimeLog.objects.exists())
+        failure = ProbeFailure.objects.get()
+        self.assertEqual((failure.site_id, failure.failure_class, failure.proxy), (site.id, "connection", ""))
+        self.assertIsNotNone(failure.elapsed)
+
+    def test_async_probe_records_phase_timings(self):
+        Site.objects.bulk_create([Site(domain="timed_example_com")])
+        port = self.server.server_address[1]
+
+        results = crawl_domains(["timed_example_com"], url_builder=lambda d: f"http://localhost:{port}/{d}")
+
+        self.assertTrue({"dns_time", "connect_time", "ttfb"} <= results[0]["timings"].keys())
+        log = ResponseTimeLog.objects.get()
+        self.assertIsNone(log.tls_time)  # aiohttp 는 TLS 를 connect_time 에 포함
+        for field in ("dns_time", "connect_time", "ttfb"):
+            self.assertIsNotNone(getattr(log, field), field)
+        self.assertLessEqual(log.ttfb, log.response_time)
+        self.assertEqual(log.status_code, 200)
+
+    def test_sync_probe_records_phase_timings(self):
+        from myapp.crawler import record_crawl_result
+        from myapp.probe_timing import TimedHTTPAdapter, timed_get
+
+        Site.objects.bulk_create([Site(domain="timed_example_com")])
+        session = requests.Session()
+        session.mount("http://", TimedHTTPAdapter())
+        url = f"http://localhost:{self.server.server_address[1]}/timed_example_com"
+
+        first, status_code, failure_class = timed_get(session, url, timeout=2)
+        reused, _, _ = timed_get(session, url, timeout=2)  # keep-alive: 연결 단계 없음
+        record_crawl_result("timed_example_com", first["response_time"], status_code, first)
+
+        self.assertEqual((status_code, failure_class), (200, None))
+        self.assertTrue({"dns_time", "connect_time", "ttfb", "response_time"} <= first.keys())
+        self.assertEqual(set(reused), {"ttfb", "response_time"})
+        log = ResponseTimeLog.objects.get()
+        for field in ("dns_time", "connect_time", "ttfb"):
+            self.assertAlmostEqual(getattr(log, field), first[field], places=6)
+
+
+def _use_fake_redis(test):
+    """
+    수집 버퍼/실시간 윈도우의 Redis 를 테스트별 fakeredis 로 교체 (Lua 스크립트 포함)
+    """
+    client = fakeredis.FakeRedis()
+    for target, name, value in ((ingest, "redis_client", client),
+                                (live_window, "redis_client", client),
+                                (live_window, "_push_script", client.register_script(live_window._PUSH_LUA))):
+        patcher = mock.patch.object(target, name, value)
+        patcher.start()
+        test.addCleanup(patcher.stop)
+    return client
+
+
+@skipUnless(fakeredis, "fakeredis[lua] not installed")
+@override_settings(CACHES=LOCMEM_CACHES, INGEST_BUFFER_ENABLED=True, INGEST_BATCH_SIZE=3,
+                   LIVE_WINDOW_ENABLED=False)
+class IngestBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = _use_fake_redis(self)
+        self.site = Site.objects.bulk_create([Site(domain="kith_com")])[0]
+        start = datetime(2025, 1, 22, 11, 0, 0, tzinfo=timezone.utc)
+        self.samples = [
+            {"site_id": self.site.id, "timestamp": (start + timedelta(seconds=i)).isoformat(),
+             "status_code": 200, "response_time": 0.1 * (i + 1), "ttfb": 0.05, "dns_time": None}
+            for i in range(4)
+        ] + [{"site_id": self.site.id, "timestamp": (start + timedelta(seconds=4)).isoformat(),
+              "status_code": None, "failure_class": "timeout", "elapsed": 10.0, "proxy": "p1"}]
+
+    def test_flush_writes_batches_and_trims_only_after_writing(self):
+        with mock.patch("myapp.tasks.flush_response_logs.delay") as schedule_flush:
+            ingest.enqueue_samples(self.samples)
+        schedule_flush.assert_called_once()  # 배치 크기를 넘는 순간 한 번 예약
+        self.assertEqual(ingest.buffer_length(), 5)
+        self.assertFalse(ResponseTimeLog.objects.exists())
+
+        with mock.patch.object(ingest, "_write_samples", side_effect=RuntimeError("db down")):
+            with self.assertRaises(RuntimeError):
+                ingest.flush_buffer()
+        self.assertEqual(ingest.buffer_length(), 5)  # 기록 실패 시 버퍼에 남는다 (LTRIM 전)
+
+        self.assertEqual(ingest.flush_buffer(max_batches=1), 3)
+        self.assertEqual(ingest.buffer_length(), 2)
+        self.assertEqual(ResponseTimeLog.objects.count(), 3)
+
+        lock = self.redis.lock(ingest.FLUSH_LOCK_KEY, timeout=60)
+        lock.acquire()
+        self.assertEqual(ingest.flush_buffer(), 0)  # 다른 flusher 가 실행 중
+        self.assertEqual(ingest.buffer_length(), 2)
+        lock.release()
+
+        self.assertEqual(ingest.flush_buffer(), 2)
+        self.assertEqual(ingest.buffer_length(), 0)
+        self.assertEqual(list(ResponseTimeLog.objects.order_by("timestamp").values_list("response_time", "ttfb")),
+                         [(s["response_time"], 0.05) for s in self.samples[:4]])
+        failure = ProbeFailure.objects.get()
+        self.assertEqual((failure.site_id, failure.failure_class, failure.elapsed, failure.proxy),
+                         (self.site.id, "timeout", 10.0, "p1"))
+
+    def test_redis_outage_writes_directly(self):
+        with mock.patch.object(ingest.redis_client, "pipeline", side_effect=redis.ConnectionError("down")):
+            ingest.enqueue_samples(self.samples)
+        self.assertEqual(ResponseTimeLog.objects.count(), 4)
+        self.assertEqual(ProbeFailure.objects.count(), 1)
+
+
+@skipUnless(fakeredis, "fakeredis[lua] not installed")
+@override_settings(CACHES=LOCMEM_CACHES, LIVE_WINDOW_ENABLED=True, LIVE_WINDOW_SECONDS=60,
+                   MODEL_SIGNAL="response_time")
+class LiveWindowTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.redis = _use_fake_redis(self)
+        self.now = now()
+
+    def _push(self, site_id, *points):
+        live_window.push_samples([
+            {"site_id": site_id, "timestamp": (self.now + timedelta(seconds=s)).isoformat(), "response_time": v}
+            for s, v in points
+        ])
+
+    def _stats_hash(self, site_id):
+        raw = self.redis.hgetall(live_window.STATS_KEY.format(site_id))
+        return int(raw[b"n"]), float(raw[b"sum"]), float(raw[b"sumsq"])
+
+    def test_push_evicts_old_samples_and_keeps_running_sums(self):
+        self._push(1, (-70, 0.7), (-30, 0.2))
+        self.assertEqual(self._stats_hash(1)[0], 2)  # 가장 최신 샘플 기준 윈도우 안
+        self._push(1, (-5, 0.4), (-5, 0.4))  # 같은 샘플은 한 번만
+        n, total, total_sq = self._stats_hash(1)  # -70초 샘플은 밀려난다
+        self.assertEqual(n, 2)
+        self.assertAlmostEqual(total, 0.6)
+        self.assertAlmostEqual(total_sq, 0.2)
+        self.assertEqual(self.redis.zcard(live_window.SAMPLES_KEY.format(1)), 2)
+        self.assertGreater(self.redis.pttl(live_window.STATS_KEY.format(1)), 0)
+
+        mean, std = live_window.current_stats(1)
+        self.assertAlmostEqual(mean, 0.3)
+        self.assertAlmostEqual(std, 0.1)
+        timestamps, values = live_window.window_samples(1, self.now - timedelta(seconds=50), self.now)
+        np.testing.assert_allclose(values, [0.2, 0.4])
+        self.assertEqual(list(timestamps), [to_epoch_us(self.now + timedelta(seconds=s)) for s in (-30, -5)])
+
+    def test_cold_window_falls_back_to_database(self):
+        self._push(2, (-10, 0.5))  # 기록이 시작된 지 윈도우 길이만큼 지나지 않음
+        self.assertIsNone(live_window.current_stats(2))
+        self.assertIsNone(live_window.window_samples(2, self.now - timedelta(seconds=60), self.now))
+        self.assertIsNotNone(live_window.window_samples(2, self.now - timedelta(seconds=5), self.now))
+        self.assertIsNone(live_window.current_stats(3))  # 샘플이 없는 사이트: 키를 만들지 않는다
+        self.assertFalse(self.redis.exists(live_window.STATS_KEY.format(3)))
+        self.assertIsNone(live_window.window_samples(2, self.now - timedelta(seconds=120), self.now))
+
+        self._push(4, (-200, 0.5))  # 윈도우는 warm 이지만 최근 샘플이 모두 빠짐
+        self.assertEqual(live_window.current_stats(4), (0.0, 0.0))
+
+    def test_rolling_stats_series_reads_the_live_window(self):
+        site = Site.objects.bulk_create([Site(domain="kith_com")])[0]
+        points = [(s, 0.1 + (s % 7) / 10) for s in range(-90, 0, 3)]
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site=site, timestamp=self.now + timedelta(seconds=s), response_time=v) for s, v in points
+        ])
+        self._push(site.id, *points)
+
+        offsets = np.arange(-20, 1)
+        with mock.patch.object(rolling_predict, "fetch_response_times") as database:
+            means, stds = rolling_predict.get_rolling_stats_series("kith_com", self.now, offsets, window_seconds=30)
+        database.assert_not_called()
+        expected = [_naive_rolling_stats(site, self.now + timedelta(seconds=int(o)), 30) for o in offsets]
+        np.testing.assert_allclose(means, [m for m, _ in expected], rtol=1e-9)
+        np.testing.assert_allclose(stds, [sd for _, sd in expected], rtol=1e-6, atol=1e-12)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RESULT_CACHE_ENABLED=True)
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = datetime(2025, 1, 22, 11, 0, 3, tzinfo=timezone.utc)
+        self.release = self.now + timedelta(minutes=10)
+
+    def test_concurrent_identical_requests_compute_once(self):
+        calls = []
+
+        def slow_scan(site_domain, current_time, release_time):
+            calls.append(current_time)
+            time.sleep(0.2)
+            return release_time - timedelta(seconds=30)
+
+        outcomes = []
+        with mock.patch.object(result_cache, "find_best_entry_time", side_effect=slow_scan):
+            threads = [
+                threading.Thread(target=lambda: outcomes.append(
+                    result_cache.cached_best_entry_time("kith_com", self.now, self.release)))
+                for _ in range(8)
+            ]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual({value for value, _ in outcomes}, {self.release - timedelta(seconds=30)})
+        stats = result_cache.stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"] + stats["coalesced"], 7)
+
+    def test_new_bucket_recomputes(self):
+        with mock.patch.object(result_cache, "find_best_entry_time", return_value=None) as scan:
+            result_cache.cached_best_entry_time("kith_com", self.now, self.release)
+            _, outcome = result_cache.cached_best_entry_time("kith_com", self.now, self.release)
+            self.assertEqual(outcome, "hit")
+            later = self.now + timedelta(seconds=10)
+            result_cache.cached_best_entry_time("kith_com", later, self.release)
+        self.assertEqual(scan.call_count, 2)
+
+    def test_later_caller_in_same_bucket_never_gets_a_past_time(self):
+        def scan(site_domain, current_time, release_time):
+            return current_time + timedelta(seconds=1)
+
+        leader_time = self.now - timedelta(seconds=3)  # 버킷 시작
+        follower_time = self.now + timedelta(seconds=1)  # 같은 버킷, leader 결과보다 늦음
+        with mock.patch.object(result_cache, "find_best_entry_time", side_effect=scan) as scanner:
+            first, _ = result_cache.cached_best_entry_time("kith_com", leader_time, self.release)
+            optimal, outcome = result_cache.cached_best_entry_time("kith_com", follower_time, self.release)
+            early, early_outcome = result_cache.cached_best_entry_time("kith_com", leader_time, self.release)
+
+        self.assertEqual(first, leader_time + timedelta(seconds=1))
+        self.assertEqual((optimal, outcome), (follower_time + timedelta(seconds=1), "miss"))
+        self.assertEqual((early, early_outcome), (optimal, "hit"))  # 새 결과는 더 이른 요청에도 유효
+        self.assertEqual(scanner.call_count, 2)
+
+    def test_batch_rechecks_cached_times_for_later_caller(self):
+        def scan(site_domain, current_time, release_times):
+            return [current_time + timedelta(seconds=1) for _ in release_times]
+
+        leader_time = self.now - timedelta(seconds=3)
+        follower_time = self.now + timedelta(seconds=1)
+        later_release = self.release + timedelta(minutes=5)
+        with mock.patch.object(result_cache, "find_best_entry_times", side_effect=scan) as scanner:
+            result_cache.cached_best_entry_times("kith_com", leader_time, [self.release, later_release])
+            results = result_cache.cached_best_entry_times("kith_com", follower_time, [self.release, later_release])
+
+        self.assertEqual(results, [(follower_time + timedelta(seconds=1), "miss")] * 2)
+        self.assertEqual(scanner.call_count, 2)
+
+
+class _FakeModel:
+    def predict(self, X):
+        return (X[:, 2] - 150.0) ** 2 + X[:, 0]
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LIVE_WINDOW_ENABLED=False)
+class BestEntryBatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.sites = Site.objects.bulk_create([Site(domain="kith_com"), Site(domain="bdgastore_com")])
+        self.now = datetime(2025, 1, 22, 11, 0, 0, tzinfo=timezone.utc)
+        rng = np.random.default_rng(0)
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site=self.sites[0], timestamp=self.now + timedelta(seconds=i),
+                            response_time=float(rng.uniform(50, 250)))
+            for i in range(-60, 900, 3)
+        ])
+
+    def test_batch_scan_matches_single_release_scans(self):
+        releases = [self.now + timedelta(seconds=s) for s in (1, 45, 300, 899)]
+        with mock.patch.object(rolling_predict, "load_site_model", return_value=_FakeModel()):
+            batch = rolling_predict.find_best_entry_times("kith_com", self.now, releases)
+            single = [rolling_predict.find_best_entry_time("kith_com", self.now, r) for r in releases]
+        self.assertEqual(batch, single)
+        self.assertIsNone(batch[0])
+        self.assertTrue(all(self.now < t < r for t, r in zip(batch[1:], releases[1:])))
+
+    def test_api_scores_each_site_once_and_keeps_item_order(self):
+        def scan(site_domain, current_time, release_times):
+            return [(r - timedelta(seconds=5), "miss") for r in release_times]
+
+        payload = {
+            "current_time": "2025-01-22T20:00:00",
+            "timezone": "Asia/Seoul",
+            "items": [
+                {"site_domain": "kith_com", "release_time": "2025-01-22T20:10:00"},
+                {"site_domain": "unknown_com", "release_time": "2025-01-22T20:10:00"},
+                {"site_domain": "bdgastore_com", "release_time": "2025-01-22T20:05:00"},
+                {"site_domain": "kith_com", "release_time": "2025-01-22T19:00:00"},
+                {"site_domain": "kith_com", "release_time": "2025-01-22T20:30:00"},
+            ],
+        }
+        with mock.patch.object(views, "cached_best_entry_times", side_effect=scan) as scorer, \
+                mock.patch.object(views.activate_fast_mode, "delay") as activate:
+            response = self.client.post("/api/best_entry_time/batch/", payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(scorer.call_count, 2)
+        self.assertEqual(activate.call_count, 2)
+        results = response.json()["results"]
+        self.assertEqual([r.get("optimal_time") for r in results], [
+            "2025-01-22T20:09:55+09:00", None, "2025-01-22T20:04:55+09:00", None, "2025-01-22T20:29:55+09:00",
+        ])
+        self.assertEqual([r.get("status") for r in results], [None, 400, None, 400, None])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SiteListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        Site.objects.bulk_create([Site(domain="kith_com", name="Kith")])
+
+    def test_unchanged_list_revalidates_without_query(self):
+        first = self.client.get("/api/sites/")
+        self.assertEqual(first.json(), {"sites": [{"domain": "kith_com", "name": "Kith"}]})
+        self.assertIn("no-cache", first["Cache-Control"])
+
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/sites/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+
+    def test_site_change_invalidates_list(self):
+        first = self.client.get("/api/sites/")
+        with mock.patch("myapp.signals.crawl_site"), mock.patch("myapp.signals.crawl_scheduler"), \
+                self.captureOnCommitCallbacks(execute=True):
+            Site.objects.create(domain="bdgastore_com")
+
+        response = self.client.get("/api/sites/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], first["ETag"])
+        self.assertEqual([s["domain"] for s in response.json()["sites"]], ["kith_com", "bdgastore_com"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SiteScheduleSignalTests(TestCase):
+    def test_schedule_updates_after_commit_and_survives_redis_outage(self):
+        with mock.patch("myapp.signals.crawl_site"), mock.patch("myapp.signals.crawl_scheduler") as scheduler:
+            scheduler.add_site.side_effect = redis.ConnectionError("down")
+            with self.captureOnCommitCallbacks(execute=True):
+                site = Site.objects.create(domain="kith_com")
+                scheduler.add_site.assert_not_called()  # 커밋 전에는 Redis 를 건드리지 않는다
+            scheduler.add_site.assert_called_once_with("kith_com")
+            self.assertTrue(Site.objects.filter(id=site.id).exists())
+
+            with self.captureOnCommitCallbacks(execute=True):
+                site.delete()
+            scheduler.remove_site.assert_called_once_with("kith_com")
+
+    def test_rolled_back_save_is_not_scheduled(self):
+        with mock.patch("myapp.signals.crawl_site"), mock.patch("myapp.signals.crawl_scheduler") as scheduler, \
+                self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                Site.objects.create(domain="kith_com")
+                raise RuntimeError
+        self.assertEqual(len(callbacks), 0)
+        scheduler.add_site.assert_not_called()
+
+
+@override_settings(CACHES=LOCMEM_CACHES, RETRAIN_INCREMENTAL_WINDOW=600)
+class FastModeRetrainTests(TestCase):
+    def setUp(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir, ignore_errors=True)
+        for patcher in (mock.patch.object(project_settings, "MODEL_STORAGE_DIR", model_dir),
+                        mock.patch.object(retrain, "redis_client")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        retrain.redis_client.get.return_value = None  # 최소 간격 없음
+        retrain.redis_client.lock.return_value.acquire.return_value = True
+
+        # Fast Mode 주기(10초)로 최근 10분 동안 수집된 로그
+        site = Site.objects.bulk_create([Site(domain="kith_com")])[0]
+        rng = np.random.default_rng(0)
+        current = now()
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site=site, timestamp=current - timedelta(seconds=10 * i),
+                            response_time=float(rng.uniform(0.1, 0.5)))
+            for i in range(60)
+        ])
+
+    def test_existing_model_is_updated_at_fast_mode_cadence(self):
+        train_site_model("kith_com")
+        self.assertEqual(retrain.run_retrain("kith_com"), "incremental")
+        retrain.redis_client.set.assert_called_once()  # 마지막 재학습 시각
+
+    def test_falls_back_to_full_retrain_when_window_is_sparse(self):
+        train_site_model("kith_com")
+        with override_settings(RETRAIN_INCREMENTAL_WINDOW=60):
+            self.assertEqual(retrain.run_retrain("kith_com"), "full")
+
+    def test_skipped_retrain_is_not_debounced(self):
+        ResponseTimeLog.objects.filter(response_time__gt=0.12).delete()
+        self.assertEqual(retrain.run_retrain("kith_com"), "skipped")
+        retrain.redis_client.set.assert_not_called()
+
+
+class _TieModel:
+    """
+    값이 겹치는(동률) 예측, 표준편차가 0 인 구간(샘플 0~1개)은 NaN
+    """
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        predictions = np.round(X[:, 2] * 10) / 10 + X[:, 0] * 0.0
+        predictions[X[:, 3] == 0] = np.nan
+        return predictions
+
+
+def _naive_rolling_stats(site, t, window_seconds=60):
+    """
+    기존(벡터화 이전) get_rolling_stats: [t - window, t] 구간 로그를 그대로 평균/표준편차
+    """
+    values = list(ResponseTimeLog.objects.filter(
+        site=site, timestamp__gte=t - timedelta(seconds=window_seconds), timestamp__lte=t
+    ).values_list('response_time', flat=True))
+    if not values:
+        return 0.0, 0.0
+    mean = sum(values) / len(values)
+    return mean, (sum((v - mean) ** 2 for v in values) / len(values)) ** 0.5
+
+
+@override_settings(CACHES=LOCMEM_CACHES, LIVE_WINDOW_ENABLED=False)
+class RollingPredictTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.site = Site.objects.bulk_create([Site(domain="kith_com")])[0]
+        self.now = datetime(2025, 1, 22, 11, 0, 0, tzinfo=timezone.utc)
+        # 7초 간격, 몇 가지 값만 사용(동률 예측), 중간에 90초 공백(빈 윈도우)
+        seconds = [s for s in range(-30, 400, 7) if not 150 <= s < 240]
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site=self.site, timestamp=self.now + timedelta(seconds=s),
+                            response_time=(0.1, 0.9, 0.2, 0.5, 0.3)[(s * s // 7) % 5])
+            for s in seconds
+        ])
+
+    def _loop_best_entry_time(self, model, current_time, release_time):
+        """
+        기존 1초 단위 루프: 시점마다 롤링 통계 + 한 행 predict, 처음 나온 최소값 (NaN 은 후보 아님)
+        """
+        best_time, best_prediction = None, float('inf')
+        for offset in range(1, int((release_time - current_time).total_seconds())):
+            t = current_time + timedelta(seconds=offset)
+            rolling_mean, rolling_std = _naive_rolling_stats(self.site, t)
+            prediction = model.predict([[t.hour, t.weekday(), rolling_mean, rolling_std]])[0]
+            if prediction < best_prediction:
+                best_time, best_prediction = t, prediction
+        return best_time
+
+    def test_rolling_stats_series_matches_naive_windows(self):
+        offsets = np.arange(-40, 420)
+        means, stds = rolling_predict.get_rolling_stats_series("kith_com", self.now, offsets, window_seconds=60)
+
+        expected = [_naive_rolling_stats(self.site, self.now + timedelta(seconds=int(o))) for o in offsets]
+        np.testing.assert_allclose(means, [m for m, _ in expected], rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(stds, [sd for _, sd in expected], rtol=1e-7, atol=1e-9)
+
+        # 로그가 없는 윈도우(첫 로그 이전, 공백 구간)는 (0.0, 0.0)
+        empty = (offsets < -30) | ((offsets >= 150 + 60) & (offsets < 241))
+        self.assertTrue(empty.any())
+        self.assertTrue((means[empty] == 0.0).all() and (stds[empty] == 0.0).all())
+
+        # 왼쪽 경계(t - window)에 정확히 걸린 로그는 포함: offset 30 의 윈도우 [-30, 30] 은 첫 로그(-30초)를 포함한다
+        index = int(np.flatnonzero(offsets == 30)[0])
+        first = ResponseTimeLog.objects.filter(site=self.site).order_by('timestamp').first()
+        self.assertEqual(first.timestamp, self.now - timedelta(seconds=30))
+        with_edge = [first.response_time] + list(ResponseTimeLog.objects.filter(
+            site=self.site, timestamp__gt=first.timestamp, timestamp__lte=self.now + timedelta(seconds=30)
+        ).values_list('response_time', flat=True))
+        self.assertAlmostEqual(means[index], sum(with_edge) / len(with_edge))
+
+    def test_long_windows_use_minute_rollups_and_match_naive(self):
+        site = Site.objects.bulk_create([Site(domain="bdgastore_com")])[0]
+        rng = np.random.default_rng(1)
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site=site, timestamp=self.now + timedelta(seconds=s),
+                            response_time=float(rng.uniform(0.05, 2.0)))
+            for s in range(-3 * 3600, 900, 7)
+        ])
+        rollups.compact_site(site.id, current_time=self.now)  # 집계 워터마크 ≈ now - 2분, 이후는 원본만
+
+        offsets = np.arange(-400, 600, 13)
+        with mock.patch.object(rolling_predict, "_rollup_window_sums",
+                               wraps=rolling_predict._rollup_window_sums) as rollup_path:
+            means, stds = rolling_predict.get_rolling_stats_series(
+                "bdgastore_com", self.now + timedelta(milliseconds=500), offsets, window_seconds=3600)
+        rollup_path.assert_called_once()
+        self.assertIsNotNone(rollups.watermark(site.id, rollups.MINUTE))
+
+        expected = [_naive_rolling_stats(site, self.now + timedelta(seconds=int(o), milliseconds=500), 3600)
+                    for o in offsets]
+        np.testing.assert_allclose(means, [m for m, _ in expected], rtol=1e-9)
+        np.testing.assert_allclose(stds, [sd for _, sd in expected], rtol=1e-6)
+
+    def test_vectorized_scan_matches_per_second_loop(self):
+        model = _TieModel()
+        cases = [(self.now, 60), (self.now, 400), (self.now + timedelta(seconds=160), 60),
+                 (self.now + timedelta(seconds=205), 30), (self.now, 1)]
+        with mock.patch.object(rolling_predict, "load_site_model", return_value=model):
+            for current_time, horizon in cases:
+                release_time = current_time + timedelta(seconds=horizon)
+                with self.subTest(current_time=current_time, horizon=horizon):
+                    self.assertEqual(
+                        rolling_predict.find_best_entry_time("kith_com", current_time, release_time),
+                        self._loop_best_entry_time(model, current_time, release_time),
+                    )
+
+    def test_predict_flow_queries_site_once(self):
+        with mock.patch.object(predict_flow.registry, "load_predictor", return_value=_TieModel()), \
+                mock.patch.object(predict_flow, "score_candidates", return_value=(3, 0.25)) as score:
+            with self.assertNumQueries(1):
+                result = predict_flow.predict_best_entry_time(
+                    self.site.id, self.now, self.now + timedelta(seconds=10))
+        self.assertEqual(score.call_args.args[1], "kith_com")
+        self.assertEqual(result["optimal_time"], self.now + timedelta(seconds=3))
+
+
+class LogArchiveTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        self.site = Site.objects.bulk_create([Site(domain="archive.example")])[0]
+        start = datetime.now(timezone.utc) - timedelta(days=4)
+        ResponseTimeLog.objects.bulk_create([
+            ResponseTimeLog(site_id=self.site.id, timestamp=start + timedelta(seconds=60 * i),
+                            response_time=0.1 + (i % 5) / 10)
+            for i in range(4 * 24 * 60)
+        ])
+
+    def test_archived_history_matches_database(self):
+        with override_settings(LOG_ARCHIVE_DIR=self.archive_dir):
+            rollups.compact_site(self.site.id)
+            before = rollups.training_arrays(self.site.id)
+            rows, days = rollups.archive_cold_logs(after_days=1)
+            after = rollups.training_arrays(self.site.id)
+
+        self.assertGreater(days, 0)
+        self.assertEqual(ResponseTimeLog.objects.filter(site_id=self.site.id).count(), len(before[0]) - rows)
+        np.testing.assert_array_equal(before[0], after[0])
+        np.testing.assert_array_equal(before[1], after[1])
+
+    def test_late_rows_below_watermark_are_archived_not_dropped(self):
+        with override_settings(LOG_ARCHIVE_DIR=self.archive_dir):
+            rollups.compact_site(self.site.id)
+            rollups.archive_cold_logs(after_days=1)
+            oldest = rollups.training_arrays(self.site.id)[0][0]
+            late_start = datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(microseconds=int(oldest) + 30_000_000)
+            ResponseTimeLog.objects.bulk_create([
+                ResponseTimeLog(site_id=self.site.id, timestamp=late_start + timedelta(seconds=60 * i),
+                                response_time=5.0)
+                for i in range(100)
+            ])
+            visible = rollups.training_arrays(self.site.id)
+            rows, days = rollups.archive_cold_logs(after_days=1)
+            after = rollups.training_arrays(self.site.id)
+
+        self.assertEqual(rows, 100)
+        self.assertGreater(days, 0)
+        self.assertEqual(int((visible[1] == 5.0).sum()), 100)
+        self.assertEqual(int((after[1] == 5.0).sum()), 100)
+        np.testing.assert_array_equal(visible[0], after[0])
+        self.assertTrue((np.diff(after[0]) >= 0).all())
+
+    def test_late_rows_below_watermark_reach_rollups_before_prune(self):
+        rollups.compact_site(self.site.id)
+        first = ResponseTimeLog.objects.filter(site_id=self.site.id).earliest('timestamp').timestamp
+        minute = rollups._floor(first, 60)
+        hour = rollups._floor(first, 3600)
+        late = ResponseTimeLog.objects.create(site_id=self.site.id, timestamp=first + timedelta(seconds=1),
+                                              response_time=5.0)
+
+        rollups.prune_raw_logs(retention_days=1)  # 아직 집계되지 않은 늦은 로그는 남긴다
+        self.assertTrue(ResponseTimeLog.objects.filter(id=late.id).exists())
+
+        rollups.compact_site(self.site.id)
+        rollups.compact_site(self.site.id)  # 다시 집계해도 두 번 더하지 않는다
+        rollups.prune_raw_logs(retention_days=1)
+
+        self.assertFalse(ResponseTimeLog.objects.filter(id=late.id).exists())
+        bucket = ResponseTimeRollup.objects.get(site_id=self.site.id, tier=rollups.MINUTE, bucket_start=minute)
+        self.assertEqual(bucket.count, 2)
+        self.assertAlmostEqual(bucket.total, 0.1 + 5.0)
+        self.assertEqual(bucket.max_value, 5.0)
+        hour_bucket = ResponseTimeRollup.objects.get(site_id=self.site.id, tier=rollups.HOUR, bucket_start=hour)
+        minutes = ResponseTimeRollup.objects.filter(
+            site_id=self.site.id, tier=rollups.MINUTE, bucket_start__gte=hour,
+            bucket_start__lt=hour + timedelta(hours=1))
+        self.assertEqual(hour_bucket.count, sum(m.count for m in minutes))
+        self.assertAlmostEqual(float(rollups.training_arrays(self.site.id)[1][0]), (0.1 + 5.0) / 2, places=5)
+
+
+class _TunnelRefusingProxy(BaseHTTPRequestHandler):
+    def do_CONNECT(self):
+        self.send_response(502)  # 프록시는 살아 있고 대상 사이트에 연결하지 못함
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(PROXY_EWMA_ALPHA=0.2, PROXY_FAILURE_THRESHOLD=3, PROXY_MIN_SUCCESS_RATE=0.5,
+                   PROXY_MIN_REQUESTS=20, PROXY_CIRCUIT_COOLDOWN=30, PROXY_STATE_REFRESH=0)
+class ProxyPoolTests(TestCase):
+    OUTCOMES = [(True, 0.2), (True, 0.4), (False, None), (True, 0.3), (False, None), (False, None)]
+
+    def _pool(self, connected=True):
+        server = fakeredis.FakeServer()
+        server.connected = connected
+        return proxy_pool.ProxyPool(["p1", "p2"], client=fakeredis.FakeRedis(server=server))
+
+    def test_target_failures_are_not_charged_to_the_proxy(self):
+        from myapp.probe_timing import TimedHTTPAdapter, timed_get
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _TunnelRefusingProxy)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        outcomes = {}
+        for name, proxy in (("target_down", f"http://127.0.0.1:{server.server_address[1]}"),
+                            ("proxy_down", "http://127.0.0.1:1")):
+            session = requests.Session()
+            session.proxies = {"https": proxy}
+            session.mount("https://", TimedHTTPAdapter())
+            timings, status_code, failure_class = timed_get(session, "https://example.invalid/", timeout=2)
+            outcomes[name] = proxy_pool.is_proxy_failure(-1, status_code, failure_class, timings)
+
+        self.assertEqual(outcomes, {"target_down": False, "proxy_down": True})
+        self.assertFalse(proxy_pool.is_proxy_failure(1.2, 503))
+        self.assertTrue(proxy_pool.is_proxy_failure(0.1, 407))
+        self.assertFalse(proxy_pool.is_proxy_failure(-1, None, "timeout", {"connect_time": 0.01}))  # 연결 후
+        self.assertTrue(proxy_pool.is_proxy_failure(-1, None, "timeout", {}))  # 프록시 연결 중
+        self.assertFalse(proxy_pool.is_proxy_failure(-1, None, "ssl", {}))
+
+    @skipUnless(fakeredis, "fakeredis[lua] not installed")
+    def test_lua_ewma_matches_local_fallback(self):
+        shared, local = self._pool(), self._pool(connected=False)
+        for ok, latency in self.OUTCOMES:
+            shared.record("p1", ok, latency)
+            local.record("p1", ok, latency)
+
+        expected = {"success": 1.0, "latency": None, "consecutive": 0, "state": "closed",
+                    "opened_at": 0.0, "requests": 0, "failures": 0}
+        for ok, latency in self.OUTCOMES:  # 기대값: 0.2 가중 EWMA
+            proxy_pool._apply_outcome(expected, ok, latency or 0, 0.0)
+        redis_state = shared.states(refresh=True)["p1"]
+        local_state = local.states(refresh=True)["p1"]
+        for key in ("success", "latency"):  # Redis 는 문자열로 저장하므로 근사 비교
+            self.assertAlmostEqual(redis_state[key], expected[key], msg=key)
+            self.assertEqual(local_state[key], expected[key], msg=key)
+        for key in ("consecutive", "requests", "failures", "state"):
+            self.assertEqual(redis_state[key], expected[key], msg=key)
+            self.assertEqual(local_state[key], expected[key], msg=key)
+        self.assertAlmostEqual(expected["latency"], 0.2 + 0.2 * (0.4 - 0.2) + 0.2 * (0.3 - 0.24))
+        self.assertEqual(redis_state["state"], "closed")  # 연속 실패 2회 < 3
+
+    @skipUnless(fakeredis, "fakeredis[lua] not installed")
+    def test_circuit_opens_probes_once_and_closes(self):
+        for connected in (True, False):
+            with self.subTest(redis=connected):
+                pool = self._pool(connected)
+                other_worker = proxy_pool.ProxyPool(["p1", "p2"], client=pool.client)
+                for _ in range(3):
+                    pool.record("p1", False)
+                self.assertEqual(pool.states(refresh=True)["p1"]["state"], "open")
+                self.assertEqual({pool.choose() for _ in range(20)}, {"p2"})  # 쿨다운 중에는 제외
+
+                later = time.time() + 31
+                with mock.patch.object(proxy_pool.time, "time", return_value=later):
+                    self.assertEqual(pool.choose(), "p1")  # half_open 점검 요청
+                    if connected:  # 점검 권한(SET NX)은 워커 간에 하나만
+                        self.assertEqual(other_worker.choose(), "p2")
+                    self.assertEqual(pool.states(refresh=True)["p1"]["state"], "half_open")
+                    pool.record("p1", True, 0.1)
+                self.assertEqual(pool.states(refresh=True)["p1"]["state"], "closed")
+
+                for _ in range(3):
+                    pool.record("p1", False)
+                if connected:
+                    pool.client.delete(proxy_pool.PROBE_KEY.format("p1"))  # 점검 권한 TTL 만료
+                with mock.patch.object(proxy_pool.time, "time", return_value=later + 31):
+                    self.assertEqual(pool.choose(), "p1")
+                    pool.record("p1", False)  # half_open 에서 실패하면 바로 다시 open
+                self.assertEqual(pool.states(refresh=True)["p1"]["state"], "open")
+
+
+class TrainingFeatureTests(TestCase):
+    def test_vectorized_features_match_pandas_pipeline(self):
+        import pandas as pd
+        from myapp.ml.training import build_training_features
+
+        site = Site.objects.bulk_create([Site(domain="kith_com")])[0]
+        start = datetime(2025, 1, 19, 23, 58, 0, tzinfo=timezone.utc)  # 일요일 → 월요일 자정(UTC)을 넘는 구간
+        rng = np.random.default_rng(3)
+        offsets = np.sort(rng.choice(600, size=60, replace=False))
+        values = np.round(rng.uniform(0.05, 900.0, size=60), 3)
+        values[10:32] = 0.25  # 윈도우(20개)가 모두 같은 값인 구간 → std 0
+        logs = [ResponseTimeLog(site=site, timestamp=start + timedelta(seconds=int(o)), response_time=float(v))
+                for o, v in zip(offsets, values)]
+        ResponseTimeLog.objects.bulk_create([logs[i] for i in rng.permutation(len(logs))])  # 삽입 순서와 무관
+
+        timestamps, y = rollups.training_arrays(site.id)
+        X = build_training_features(timestamps, y)
+
+        # 벡터화 이전 파이프라인 (DataFrame + rolling)
+        df = pd.DataFrame(list(ResponseTimeLog.objects.filter(site=site).order_by('timestamp')
+                               .values('timestamp', 'response_time')))
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
+        df['hour'] = df['timestamp'].dt.hour
+        df['dayofweek'] = df['timestamp'].dt.dayofweek
+        df['rolling_mean'] = df['response_time'].rolling(window=20, min_periods=1).mean()
+        df['rolling_std'] = df['response_time'].rolling(window=20, min_periods=1).std().fillna(0.0)
+        expected = df[rolling_predict.FEATURE_COLUMNS].to_numpy()
+
+        np.testing.assert_allclose(y, df['response_time'], rtol=1e-6)  # timestamp 순서
+        self.assertEqual(set(X[:, 0]), {23.0, 0.0})
+        self.assertEqual(set(X[:, 1]), {6.0, 0.0})
+        np.testing.assert_array_equal(X[:, :2], expected[:, :2])
+        self.assertFalse(np.isnan(X).any())
+        self.assertEqual(X[0, 3], 0.0)  # 샘플 1개 윈도우의 std(NaN) → 0
+        self.assertAlmostEqual(float(X[31, 3]), 0.0, places=4)
+        np.testing.assert_allclose(X[:, 2:], expected[:, 2:], rtol=1e-5, atol=1e-4)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, TRAINING_THREADS_PER_JOB=1)
+class DailyTrainingTests(TestCase):
+    def setUp(self):
+        model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, model_dir, ignore_errors=True)
+        patcher = mock.patch.object(project_settings, "MODEL_STORAGE_DIR", model_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chord_summarizes_trained_skipped_and_failed_sites(self):
+        from myapp import tasks
+        from myapp.ml import registry, training
+        from myproject.celery import app
+
+        sites = Site.objects.bulk_create([Site(domain=d) for d in ("kith_com", "sparse_com", "broken_com")]
+                                         + [Site(domain="inactive_com", active=False)])
+        start = now() - timedelta(hours=1)
+        ResponseTimeLog.objects.bulk_create(
+            [ResponseTimeLog(site=sites[0], timestamp=start + timedelta(seconds=10 * i), response_time=0.1 + i % 3 / 10)
+             for i in range(40)]
+            + [ResponseTimeLog(site=sites[1], timestamp=start, response_time=0.2)]
+        )
+        fit = training._fit_site_model
+
+        def fit_or_fail(site_domain, n_jobs=None):
+            if site_domain == "broken_com":
+                raise ValueError("corrupt logs")
+            return fit(site_domain, n_jobs=n_jobs)
+
+        summaries = []
+
+        def summarize(results, wall_seconds=None):
+            summaries.append(training.summarize_training_results(results, wall_seconds))
+            return summaries[-1]
+
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True  # chord 헤더와 콜백을 이 프로세스에서 바로 실행
+        self.addCleanup(setattr, app.conf, "task_always_eager", eager)
+        with mock.patch.object(training, "_fit_site_model", side_effect=fit_or_fail), \
+                mock.patch.object(tasks, "summarize_training_results", side_effect=summarize):
+            tasks.daily_train_models()
+
+        self.assertEqual(len(summaries), 1)
+        summary = summaries[0]
+        self.assertEqual((summary["sites"], summary["trained"], summary["skipped"]), (3, 1, 1))
+        self.assertEqual(summary["failed"], [{"site": "broken_com", "error": "corrupt logs"}])
+        self.assertEqual(summary["total_rows"], 41)  # 실패한 사이트는 행 수 없음
+        self.assertGreaterEqual(summary["wall_seconds"], 0)
+        slowest = [s["seconds"] for s in summary["slowest"]]
+        self.assertEqual(len(slowest), 3)
+        self.assertEqual(slowest, sorted(slowest, reverse=True))
+        self.assertIsNotNone(registry.current_version("kith_com"))
+
+
+class ModelCacheTests(TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir, ignore_errors=True)
+
+    def _write(self, name, model):
+        import pickle
+        path = os.path.join(self.model_dir, f"{name}.pkl")
+        with open(path, "wb") as f:
+            pickle.dump(model, f)
+        return path
+
+    def test_lru_eviction_and_file_change_invalidation(self):
+        from myapp.ml.model_cache import ModelCache
+
+        cache_ = ModelCache(max_models=2)
+        paths = {name: self._write(name, {"site": name}) for name in ("a", "b", "c")}
+        self.assertEqual(cache_.get("a", paths["a"]), {"site": "a"})
+        cache_.get("b", paths["b"])
+        self.assertIs(cache_.get("a", paths["a"]), cache_.get("a", paths["a"]))  # 히트는 같은 객체
+        cache_.get("c", paths["c"])  # 가장 오래 쓰지 않은 b 를 밀어낸다
+        self.assertEqual(cache_.stats(), {"size": 2, "max_models": 2, "hits": 2, "misses": 3,
+                                          "evictions": 1, "invalidations": 0})
+        cache_.get("b", paths["b"])
+        self.assertEqual(cache_.stats()["misses"], 4)
+
+        self._write("c", {"site": "c", "version": 2})  # 크기(와 mtime)가 바뀐 새 모델 파일
+        self.assertEqual(cache_.get("c", paths["c"]), {"site": "c", "version": 2})
+        stat = os.stat(paths["c"])
+        os.utime(paths["c"], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))  # 크기는 같고 mtime 만 변경
+        cache_.get("c", paths["c"])
+        os.remove(paths["b"])
+        self.assertIsNone(cache_.get("b", paths["b"]))
+        stats = cache_.stats()
+        self.assertEqual((stats["invalidations"], stats["misses"], stats["size"]), (3, 6, 1))
+
+
+class ModelRegistryTests(TestCase):
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.model_dir, ignore_errors=True)
+        patcher = mock.patch.object(project_settings, "MODEL_STORAGE_DIR", self.model_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.X = np.random.default_rng(0).normal(size=(60, 4))
+
+    def _model(self, shift):
+        import xgboost as xgb
+        return xgb.XGBRegressor(n_estimators=5, max_depth=2).fit(self.X, self.X[:, 2] + shift)
+
+    def test_publish_flips_current_and_prunes_old_versions(self):
+        from myapp.ml import registry
+
+        first_model, second_model = self._model(0.0), self._model(5.0)
+        first = registry.publish_model("kith.com", first_model, rows=60)
+        self.assertEqual(registry.current_version("kith.com"), first)
+        second = registry.publish_model("kith.com", second_model, rows=61)
+
+        self.assertEqual(registry.current_version("kith.com"), second)
+        self.assertEqual(registry.list_versions("kith.com"), [first, second])
+        self.assertEqual(registry.load_metadata("kith.com")["rows"], 61)
+        np.testing.assert_allclose(registry.load_model("kith.com").predict(self.X), second_model.predict(self.X))
+        self.assertFalse([n for n in os.listdir(registry.model_dir("kith.com")) if n.startswith(".tmp-")])
+
+        self.assertEqual(registry.prune_versions("kith.com", keep=1), 1)
+        self.assertEqual(registry.list_versions("kith.com"), [second])
+        self.assertIsNone(registry.load_metadata("kith.com", first))
+
+    def test_failed_write_keeps_the_published_file(self):
+        from myapp.ml import registry
+
+        path = os.path.join(self.model_dir, registry.CURRENT_FILE)
+        registry._atomic_write(path, registry._write_text("v1"))
+
+        def broken(tmp_path):
+            with open(tmp_path, "w") as f:
+                f.write("v2-partial")
+            raise OSError("disk full")
+
+        with self.assertRaises(OSError):
+            registry._atomic_write(path, broken)
+        with open(path) as f:
+            self.assertEqual(f.read(), "v1")
+        self.assertEqual(os.listdir(self.model_dir), [registry.CURRENT_FILE])
+
+    def test_legacy_pickle_is_loaded_until_a_version_is_published(self):
+        import pickle
+        from myapp.ml import registry
+
+        legacy = self._model(1.0)
+        with open(registry.legacy_model_path("old.example"), "wb") as f:
+            pickle.dump(legacy, f)
+
+        self.assertEqual(registry.resolve_model_path("old.example"), registry.legacy_model_path("old.example"))
+        np.testing.assert_allclose(registry.load_model("old.example").predict(self.X), legacy.predict(self.X))
+        with mock.patch.object(project_settings, "INFERENCE_BACKEND", "flat"):
+            np.testing.assert_allclose(registry.load_predictor("old.example").predict(self.X[:8]),
+                                       legacy.predict(self.X[:8]), rtol=1e-6)
+
+        version = registry.publish_model("old.example", self._model(2.0))
+        self.assertEqual(registry.resolve_model_path("old.example"), registry.version_path("old.example", version))
+
+
+class FlatForestTests(TestCase):
+    def test_flat_evaluation_matches_xgboost(self):
+        import xgboost as xgb
+        from myapp.ml.tree_eval import compile_model
+
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(500, 5)).astype(np.float32)
+        y = 2 * X[:, 0] + np.sin(X[:, 1]) + rng.normal(scale=0.1, size=500)
+        X[rng.random(X.shape) < 0.1] = np.nan  # 결측 분기 방향(default_left)도 학습되도록
+        model = xgb.XGBRegressor(n_estimators=30, max_depth=4).fit(X, y)
+        forest = compile_model(model, max_rows=64)
+
+        rows = (rng.normal(size=(200, 5)) * 3).astype(np.float32)
+        rows[rng.random(rows.shape) < 0.15] = np.nan
+        rows[rng.random(rows.shape) < 0.05] = np.inf
+        rows[rng.random(rows.shape) < 0.05] = -np.inf
+        expected = model.predict(rows)
+
+        np.testing.assert_allclose(forest.predict_flat(rows), expected, rtol=1e-6, atol=1e-6)
+        with mock.patch.object(model, "predict", wraps=model.predict) as xgb_predict:
+            np.testing.assert_allclose(forest.predict(rows[:64]), expected[:64], rtol=1e-6, atol=1e-6)
+            xgb_predict.assert_not_called()
+            np.testing.assert_allclose(forest.predict(rows), expected, rtol=1e-6, atol=1e-6)
+            xgb_predict.assert_called_once()
+
+
+class StartupModelCheckTests(TestCase):
+    def test_only_worker_and_server_entrypoints_run_the_check(self):
+        from celery.signals import worker_ready
+        from django.apps import apps
+
+        with mock.patch("myapp.startup.run_startup_model_check") as check:
+            apps.get_app_config("myapp").ready()  # django.setup(), 관리 명령, beat
+            check.assert_not_called()
+            worker_ready.send(sender=None)
+            check.assert_called_once_with()
+
+    @override_settings(MODEL_STARTUP_TRAINING="lazy")
+    def test_redis_outage_skips_lazy_enqueue(self):
+        from myapp import startup
+
+        Site.objects.bulk_create([Site(domain="kith_com")])
+        with mock.patch("myapp.redis_client.redis_client.set", side_effect=redis.ConnectionError("down")), \
+                mock.patch("myapp.ml.training.train_site_model.apply_async") as enqueue:
+            startup.run_startup_model_check()
+        enqueue.assert_not_called()
+
+
+class MetricsTests(TestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.Histogram("test_latency_seconds", "Test.", ("view",), buckets=(0.1, 1.0))
+        self.addCleanup(metrics._metrics.pop, "test_latency_seconds")
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value, view="a")
+
+        text = self.client.get("/metrics").content.decode()
+        self.assertIn('test_latency_seconds_bucket{view="a",le="0.1"} 1', text)
+        self.assertIn('test_latency_seconds_bucket{view="a",le="1"} 3', text)
+        self.assertIn('test_latency_seconds_bucket{view="a",le="+Inf"} 4', text)
+        self.assertIn('test_latency_seconds_sum{view="a"} 4.25', text)
+
+    def test_recording_never_flushes_inline(self):
+        with mock.patch.object(metrics, "flush") as flush:
+            for _ in range(100):
+                metrics.crawl_failures.inc(site="a", proxy="direct", failure_class="timeout")
+        flush.assert_not_called()
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.1.0.0/16"], METRICS_TOKEN="s3cret")
+    def test_metrics_restricted_to_scraper(self):
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="192.0.2.7").status_code, 403)
+        self.assertEqual(self.client.get("/api/proxies/stats/", REMOTE_ADDR="192.0.2.7").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", REMOTE_ADDR="10.1.4.2").status_code, 200)
+        response = self.client.get("/metrics", REMOTE_ADDR="192.0.2.7", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncBestEntryTimeTests(TestCase):
+    url = "/api/best_entry_time/async/"
+
+    def setUp(self):
+        cache.clear()
+        Site.objects.bulk_create([Site(domain="kith_com")])
+        self.payload = {
+            "site_domain": "kith_com",
+            "current_time": "2025-01-22T11:00:00Z",
+            "release_time": "2025-01-22T11:10:00Z",
+            "timezone": "UTC",
+        }
+
+    async def test_returns_optimal_time_in_user_timezone(self):
+        optimal = datetime(2025, 1, 22, 11, 5, tzinfo=timezone.utc)
+        with mock.patch.object(views, "cached_best_entry_time", return_value=(optimal, "miss")), \
+                mock.patch.object(views.activate_fast_mode, "delay") as activate:
+            response = await self.async_client.post(self.url, self.payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["optimal_time"], "2025-01-22T11:05:00+00:00")
+        activate.assert_called_once()
+
+    def test_request_during_fast_mode_extends_session(self):
+        current = now()
+        session_key = "fast_mode_session_kith_com"
+        cache.set("fast_mode_kith_com", True)
+        cache.set(session_key, {"token": "t", "until": current + timedelta(seconds=5)})
+        payload = dict(self.payload, current_time=current.isoformat(),
+                       release_time=(current + timedelta(minutes=10)).isoformat())
+        optimal = current + timedelta(minutes=5)
+        with mock.patch.object(views, "cached_best_entry_time", return_value=(optimal, "hit")), \
+                mock.patch.object(views.activate_fast_mode, "delay") as activate:
+            response = self.client.post("/api/best_entry_time/", payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        activate.assert_not_called()
+        self.assertGreaterEqual(cache.get(session_key)["until"], current + timedelta(seconds=59))
+
+    async def test_rejects_with_retry_after_when_saturated(self):
+        with mock.patch.object(views, "_inference_slots", asyncio.Semaphore(0)):
+            response = await self.async_client.post(self.url, self.payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "1")
@@ -1,13 +1,22 @@
+import asyncio
+import contextvars
 import json
 import logging
 import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import pytz
 from pytz import timezone, UTC
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed, JsonResponse
 from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import condition
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
@@ -21,7 +30,12 @@ from datetime import datetime, timedelta
 
 # 필요한 Celery 태스크, 모델, 폼, 유틸 등을 import
 from myapp.tasks import set_event_mode, deactivate_fast_mode, activate_fast_mode, update_predictions_and_train
-from myapp.ml.rolling_predict import find_best_entry_time
+from myapp.tasks import extend_fast_mode
+from myapp import result_cache, site_cache
+from myapp.metrics import scraper_only
+from myapp.ml import retrain
+from myapp.proxy_pool import proxy_pool
+from myapp.result_cache import cached_best_entry_time, cached_best_entry_times
 from .models import Site
 from .forms import AddSiteForm
 
@@ -42,21 +56,19 @@ def to_utc(dt, user_tz):
         return dt.astimezone(UTC)
 
 
-@api_view(['POST'])
-def best_entry_time_api(request):
+def _parse_best_entry_params(data):
     """
-    사용자 현지 시간(current_time, release_time)을 받아,
+    best_entry_time 요청 파라미터 검증 및 시간 변환 (DB 조회 없음, 동기/비동기 뷰 공통).
     1) 사용자 시간대 → UTC 변환
-    2) UTC → KST 변환 후 ML 모델 처리
-    3) 결과(모델이 제공한 시간)를 다시 사용자 현지 시간대로 변환해 반환
+    2) UTC → KST 변환 (ML 모델 기준 시간)
 
-    Fast Mode(캐시) 로직도 함께 포함
+    Returns:
+        (dict | None, (dict, int) | None): 파싱 결과, 오류 응답(본문, 상태 코드)
     """
-
-    site_domain = request.data.get('site_domain')
-    release_time_str = request.data.get('release_time')
-    current_time_str = request.data.get('current_time')
-    user_timezone_str = request.data.get('timezone', 'UTC')  # 사용자 시간대 문자열
+    site_domain = data.get('site_domain')
+    release_time_str = data.get('release_time')
+    current_time_str = data.get('current_time')
+    user_timezone_str = data.get('timezone', 'UTC')  # 사용자 시간대 문자열
 
     # 요청으로 들어온 주요 파라미터를 모두 로그로 남김
     logger.info(f"[Request In] site_domain={site_domain}, release_time_str={release_time_str}, "
@@ -65,9 +77,9 @@ def best_entry_time_api(request):
     # 필수 파라미터 확인
     if not site_domain or not release_time_str or not current_time_str:
         logger.info("[Error] 필수 파라미터 누락")
-        return Response(
+        return None, (
             {"error": "필수 파라미터가 누락되었습니다: site_domain, release_time, current_time"},
-            status=status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST,
         )
 
     # 문자열 → datetime 파싱
@@ -76,9 +88,9 @@ def best_entry_time_api(request):
         user_current_time = parse_datetime(current_time_str)
     except (TypeError, ValueError):
         logger.info("[Error] 파싱 오류(올바르지 않은 시간 형식)")
-        return Response(
+        return None, (
             {"error": "올바르지 않은 시간 형식입니다. ISO 8601 형식(예: 2025-01-22T11:00:00Z)을 사용하세요."},
-            status=status.HTTP_400_BAD_REQUEST,
+            status.HTTP_400_BAD_REQUEST,
         )
 
     # 파싱된 결과도 로그로 남김
@@ -86,36 +98,19 @@ def best_entry_time_api(request):
 
     if not release_time or not user_current_time:
         logger.info("[Error] 파싱된 시간 값이 None")
-        return Response(
-            {"error": "유효하지 않은 날짜/시간입니다."},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        return None, ({"error": "유효하지 않은 날짜/시간입니다."}, status.HTTP_400_BAD_REQUEST)
 
     # 릴리즈 시간이 현재 시간보다 과거거나 같으면 에러
     if release_time <= user_current_time:
         logger.info("[Error] 릴리즈 시간이 현재 시간과 같거나 과거")
-        return Response(
-            {"error": "릴리즈 시간은 현재 시간보다 미래여야 합니다."},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    # 사이트 도메인 확인
-    if not Site.objects.filter(domain=site_domain).exists():
-        logger.info("[Error] 존재하지 않는 사이트 도메인")
-        return Response(
-            {"error": f"사이트를 찾을 수 없습니다: {site_domain}"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        return None, ({"error": "릴리즈 시간은 현재 시간보다 미래여야 합니다."}, status.HTTP_400_BAD_REQUEST)
 
     # 사용자 시간대를 pytz 객체로 가져오기
     try:
         user_timezone = timezone(user_timezone_str)
     except Exception:
         logger.info("[Error] 유효하지 않은 사용자 시간대")
-        return Response(
-            {"error": f"유효하지 않은 시간대입니다: {user_timezone_str}"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
+        return None, ({"error": f"유효하지 않은 시간대입니다: {user_timezone_str}"}, status.HTTP_400_BAD_REQUEST)
 
     # 1) 사용자 현지 시간 → UTC 변환
     try:
@@ -124,9 +119,9 @@ def best_entry_time_api(request):
         logger.info(f"[UTC Times] user_current_time_utc={user_current_time_utc}, release_time_utc={release_time_utc}")
     except Exception as e:
         logger.info(f"[Error] 시간 변환 중 예외 발생: {str(e)}")
-        return Response(
+        return None, (
             {"error": f"시간 변환 중 오류가 발생했습니다: {str(e)}"},
-            status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status.HTTP_500_INTERNAL_SERVER_ERROR,
         )
 
     # 2) UTC → KST 변환
@@ -135,83 +130,353 @@ def best_entry_time_api(request):
     release_time_kst = release_time_utc.astimezone(kst)
     logger.info(f"[KST Times] user_current_time_kst={user_current_time_kst}, release_time_kst={release_time_kst}")
 
+    return {
+        "site_domain": site_domain,
+        "user_timezone": user_timezone,
+        "current_time_kst": user_current_time_kst,
+        "release_time_kst": release_time_kst,
+        "release_time_utc": release_time_utc,
+    }, None
+
+
+def _site_not_found(site_domain):
+    logger.info("[Error] 존재하지 않는 사이트 도메인")
+    return {"error": f"사이트를 찾을 수 없습니다: {site_domain}"}, status.HTTP_400_BAD_REQUEST
+
+
+def _scoring_error(e, is_fast_mode):
+    mode = "Fast Mode" if is_fast_mode else "Normal Mode"
+    logger.info(f"[Error] 최적 진입 시간 계산 중 예외 발생({mode}): {str(e)}")
+    return {"error": f"최적 진입 시간 계산 중 오류가 발생했습니다: {str(e)}"}, status.HTTP_500_INTERNAL_SERVER_ERROR
+
+
+def _best_entry_result(params, optimal_time_kst, is_fast_mode, cache_outcome):
+    """
+    모델 결과(KST)를 사용자 현지 시간 응답 본문으로 변환
+    """
+    if optimal_time_kst:
+        # KST → UTC → 사용자 현지 시간
+        optimal_time_utc = optimal_time_kst.astimezone(UTC)
+        optimal_time_local = optimal_time_utc.astimezone(params["user_timezone"])
+        mode = "Fast Mode" if is_fast_mode else "Normal Mode"
+        logger.info(f"[{mode}] 최적 진입 시간(KST)={optimal_time_kst}, 사용자 현지 시간={optimal_time_local}, "
+                    f"cache={cache_outcome}")
+        message = "[Fast Mode 유지 중] 진입 시간을 확인하세요." if is_fast_mode else "최적 진입 시간을 확인하세요."
+        return {"optimal_time": optimal_time_local.isoformat(), "message": message}, 200
+
+    if is_fast_mode:
+        logger.info("[Fast Mode] 최적 진입 시간 없음")
+        return {"optimal_time": None, "message": "[Fast Mode 유지 중] 최적 진입 시간을 찾을 수 없습니다."}, 200
+    logger.info("[Normal Mode] 최적 진입 시간을 찾을 수 없음")
+    return {"optimal_time": None, "message": "최적 진입 시간을 찾을 수 없습니다."}, 200
+
+
+@api_view(['POST'])
+def best_entry_time_api(request):
+    """
+    사용자 현지 시간(current_time, release_time)을 받아,
+    1) 사용자 시간대 → UTC 변환
+    2) UTC → KST 변환 후 ML 모델 처리
+    3) 결과(모델이 제공한 시간)를 다시 사용자 현지 시간대로 변환해 반환
+
+    Fast Mode(캐시) 로직도 함께 포함
+    """
+    params, error = _parse_best_entry_params(request.data)
+    if error:
+        return Response(error[0], status=error[1])
+
+    # 사이트 도메인 확인
+    site_domain = params["site_domain"]
+    if not Site.objects.filter(domain=site_domain).exists():
+        return Response(*_site_not_found(site_domain))
+
     # Fast Mode 여부 판단 (캐시에 fast_mode_{site_domain} 키로 저장)
+    # 플래그는 fast_mode_tick 체인이 도는 동안 갱신되고, 체인이 끝나면 만료되어 다음 요청이 다시 활성화한다
     fast_mode_key = f"fast_mode_{site_domain}"
     is_fast_mode = cache.get(fast_mode_key)
 
-    if is_fast_mode:
-        # 캐시 갱신(갱신 시간 연장)
+    try:
+        optimal_time_kst, cache_outcome = cached_best_entry_time(
+            site_domain, params["current_time_kst"], params["release_time_kst"])
+    except Exception as e:
+        return Response(*_scoring_error(e, is_fast_mode))
+
+    if optimal_time_kst and not is_fast_mode:
+        # Fast Mode 활성화
         cache.set(fast_mode_key, True, timeout=60)
+        activate_fast_mode.delay(site_domain, params["release_time_utc"])
+    elif optimal_time_kst:
+        # Fast Mode 중 요청마다 세션 연장 (마지막 요청 후 FAST_MODE_DURATION 동안 유지)
+        extend_fast_mode(site_domain, params["release_time_utc"])
+
+    return Response(*_best_entry_result(params, optimal_time_kst, is_fast_mode, cache_outcome))
+
+
+def _parse_batch_params(data):
+    """
+    배치 요청 검증. current_time/시간대는 요청당 한 번만 파싱하고, 항목별 오류는 해당 항목에만 기록한다.
+
+    Returns:
+        (dict | None, list | None, (dict, int) | None): 공통 파라미터, 항목 목록, 요청 전체 오류
+            항목: {"site_domain", "release_time", "release_time_kst", "release_time_utc"} 또는 {..., "error"}
+    """
+    current_time_str = data.get('current_time')
+    user_timezone_str = data.get('timezone', 'UTC')
+    items = data.get('items')
+
+    if not current_time_str or not isinstance(items, list) or not items:
+        return None, None, (
+            {"error": "필수 파라미터가 누락되었습니다: current_time, items"},
+            status.HTTP_400_BAD_REQUEST,
+        )
+    if len(items) > settings.BEST_ENTRY_BATCH_MAX_ITEMS:
+        return None, None, (
+            {"error": f"items 는 최대 {settings.BEST_ENTRY_BATCH_MAX_ITEMS}개까지 요청할 수 있습니다."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        user_current_time = parse_datetime(current_time_str)
+    except (TypeError, ValueError):
+        user_current_time = None
+    if not user_current_time:
+        return None, None, (
+            {"error": "올바르지 않은 시간 형식입니다. ISO 8601 형식(예: 2025-01-22T11:00:00Z)을 사용하세요."},
+            status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        user_timezone = timezone(user_timezone_str)
+    except Exception:
+        return None, None, ({"error": f"유효하지 않은 시간대입니다: {user_timezone_str}"}, status.HTTP_400_BAD_REQUEST)
+
+    kst = timezone("Asia/Seoul")
+    current_time_utc = to_utc(user_current_time, user_timezone)
+    common = {
+        "user_timezone": user_timezone,
+        "current_time_kst": current_time_utc.astimezone(kst),
+    }
+
+    parsed = []
+    for item in items:
+        item = item if isinstance(item, dict) else {}
+        site_domain = item.get('site_domain')
+        release_time_str = item.get('release_time')
+        entry = {"site_domain": site_domain, "release_time": release_time_str}
+        parsed.append(entry)
+        if not site_domain or not release_time_str:
+            entry["error"] = "필수 파라미터가 누락되었습니다: site_domain, release_time"
+            continue
         try:
-            optimal_time_kst = find_best_entry_time(site_domain, user_current_time_kst, release_time_kst)
-        except Exception as e:
-            logger.info(f"[Error] 최적 진입 시간 계산 중 예외 발생(Fast Mode): {str(e)}")
-            return Response(
-                {"error": f"최적 진입 시간 계산 중 오류가 발생했습니다: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            )
+            release_time = parse_datetime(release_time_str)
+        except (TypeError, ValueError):
+            release_time = None
+        if not release_time:
+            entry["error"] = "올바르지 않은 시간 형식입니다. ISO 8601 형식(예: 2025-01-22T11:00:00Z)을 사용하세요."
+            continue
+        release_time_utc = to_utc(release_time, user_timezone)
+        if release_time_utc <= current_time_utc:
+            entry["error"] = "릴리즈 시간은 현재 시간보다 미래여야 합니다."
+            continue
+        entry["release_time_utc"] = release_time_utc
+        entry["release_time_kst"] = release_time_utc.astimezone(kst)
+    return common, parsed, None
 
-        if optimal_time_kst:
-            # KST → UTC → 사용자 현지 시간
-            optimal_time_utc = optimal_time_kst.astimezone(UTC)
-            optimal_time_local = optimal_time_utc.astimezone(user_timezone)
-            logger.info(f"[Fast Mode] 최적 진입 시간(KST)={optimal_time_kst}, 사용자 현지 시간={optimal_time_local}")
-
-            return Response({
-                "optimal_time": optimal_time_local.isoformat(),
-                "message": "[Fast Mode 유지 중] 진입 시간을 확인하세요.",
-            }, status=200)
-        else:
-            logger.info("[Fast Mode] 최적 진입 시간 없음")
-            return Response({
-                "optimal_time": None,
-                "message": "[Fast Mode 유지 중] 최적 진입 시간을 찾을 수 없습니다.",
-            }, status=200)
-    else:
-        # Fast Mode가 아닌 경우
+
+@api_view(['POST'])
+def best_entry_time_batch_api(request):
+    """
+    여러 사이트/릴리즈 시간의 최적 진입 시간을 한 번에 계산.
+    요청: {"current_time", "timezone", "items": [{"site_domain", "release_time"}, ...]}
+
+    - current_time/시간대 파싱과 사이트 존재 확인은 요청당 한 번
+    - 항목을 사이트별로 묶어 사이트마다 모델 로드/로그 조회를 한 번만 수행 (cached_best_entry_times)
+    - results 는 items 와 같은 순서이며, 실패한 항목은 error/status 를 담는다
+    """
+    common, items, error = _parse_batch_params(request.data)
+    if error:
+        return Response(error[0], status=error[1])
+    logger.info(f"[Batch Request In] items={len(items)}, current_time_kst={common['current_time_kst']}")
+
+    domains = {item["site_domain"] for item in items if "error" not in item}
+    known = set(Site.objects.filter(domain__in=domains).values_list("domain", flat=True))
+    by_site = {}
+    for item in items:
+        if "error" in item:
+            continue
+        if item["site_domain"] not in known:
+            item["error"] = _site_not_found(item["site_domain"])[0]["error"]
+            continue
+        by_site.setdefault(item["site_domain"], []).append(item)
+
+    flags = cache.get_many([f"fast_mode_{domain}" for domain in by_site])
+    for site_domain, site_items in by_site.items():
+        is_fast_mode = flags.get(f"fast_mode_{site_domain}")
         try:
-            optimal_time_kst = find_best_entry_time(site_domain, user_current_time_kst, release_time_kst)
+            outcomes = cached_best_entry_times(
+                site_domain, common["current_time_kst"], [item["release_time_kst"] for item in site_items])
         except Exception as e:
-            logger.info(f"[Error] 최적 진입 시간 계산 중 예외 발생(Normal Mode): {str(e)}")
-            return Response(
-                {"error": f"최적 진입 시간 계산 중 오류가 발생했습니다: {str(e)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            body, code = _scoring_error(e, is_fast_mode)
+            for item in site_items:
+                item.update(body, status=code)
+            continue
+
+        for item, (optimal_time_kst, cache_outcome) in zip(site_items, outcomes):
+            body, _ = _best_entry_result(common, optimal_time_kst, is_fast_mode, cache_outcome)
+            item.update(body)
+
+        # Fast Mode 활성화 또는 연장 (결과가 있는 가장 늦은 릴리즈 시간 기준, 사이트당 한 번)
+        found = [item["release_time_utc"] for item, (t, _) in zip(site_items, outcomes) if t]
+        if found and not is_fast_mode:
+            cache.set(f"fast_mode_{site_domain}", True, timeout=60)
+            activate_fast_mode.delay(site_domain, max(found))
+        elif found:
+            extend_fast_mode(site_domain, max(found))
+
+    results = []
+    for item in items:
+        if "error" in item:
+            item.setdefault("status", status.HTTP_400_BAD_REQUEST)
+        item.pop("release_time_kst", None)
+        item.pop("release_time_utc", None)
+        results.append(item)
+    return Response({"results": results}, status=200)
+
+
+# 비동기(ASGI) best_entry_time: 이벤트 루프를 막지 않도록 모델 계산은 제한된 스레드 풀에서 수행하고,
+# 동시에 처리 중인 요청이 ASYNC_INFERENCE_MAX_INFLIGHT 개를 넘으면 대기열을 쌓지 않고 바로 503 을 돌려준다.
+_inference_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_INFERENCE_WORKERS, thread_name_prefix="best-entry"
+)
+_inference_slots = asyncio.Semaphore(settings.ASYNC_INFERENCE_MAX_INFLIGHT)
+
+
+def _score_in_worker(site_domain, current_time_kst, release_time_kst):
+    """
+    (스레드 풀) 결과 캐시 + 모델 스캔. 스레드에 남은 오래된 DB 커넥션은 요청 전후로 정리한다.
+    """
+    close_old_connections()
+    try:
+        return cached_best_entry_time(site_domain, current_time_kst, release_time_kst)
+    finally:
+        close_old_connections()
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return {}
+    return request.POST
+
+
+async def best_entry_time_async_api(request):
+    """
+    best_entry_time_api 의 비동기 버전 (같은 파라미터/응답, ASGI 에서 사용).
+    - 사이트/Fast Mode 조회는 비동기 ORM/캐시 API 로 수행
+    - 모델 계산은 ASYNC_INFERENCE_WORKERS 크기의 스레드 풀로 넘긴다
+    - 처리 중인 요청이 한도를 넘으면 503 + Retry-After
+    """
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    if _inference_slots.locked():
+        return JsonResponse(
+            {"error": "요청이 많아 처리할 수 없습니다. 잠시 후 다시 시도하세요."},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            headers={"Retry-After": str(settings.ASYNC_INFERENCE_RETRY_AFTER)},
+        )
+
+    async with _inference_slots:
+        params, error = _parse_best_entry_params(_request_data(request))
+        if error:
+            return JsonResponse(error[0], status=error[1])
+
+        site_domain = params["site_domain"]
+        if not await Site.objects.filter(domain=site_domain).aexists():
+            body, code = _site_not_found(site_domain)
+            return JsonResponse(body, status=code)
+
+        fast_mode_key = f"fast_mode_{site_domain}"
+        is_fast_mode = await cache.aget(fast_mode_key)
+
+        loop = asyncio.get_running_loop()
+        try:
+            # 지표용 컨텍스트(요청당 DB 쿼리 수 등)를 작업 스레드에도 전달
+            optimal_time_kst, cache_outcome = await loop.run_in_executor(
+                _inference_executor, contextvars.copy_context().run, _score_in_worker,
+                site_domain, params["current_time_kst"], params["release_time_kst"],
             )
+        except Exception as e:
+            body, code = _scoring_error(e, is_fast_mode)
+            return JsonResponse(body, status=code)
 
-        if optimal_time_kst:
+        if optimal_time_kst and not is_fast_mode:
             # Fast Mode 활성화
-            cache.set(fast_mode_key, True, timeout=60)
-            activate_fast_mode.delay(site_domain, release_time)
-
-            # KST → UTC → 사용자 현지 시간
-            optimal_time_utc = optimal_time_kst.astimezone(UTC)
-            optimal_time_local = optimal_time_utc.astimezone(user_timezone)
-            logger.info(f"[Normal Mode] 최적 진입 시간(KST)={optimal_time_kst}, 사용자 현지 시간={optimal_time_local}")
-
-            return Response({
-                "optimal_time": optimal_time_local.isoformat(),
-                "message": "최적 진입 시간을 확인하세요.",
-            }, status=200)
-        else:
-            logger.info("[Normal Mode] 최적 진입 시간을 찾을 수 없음")
-            return Response({
-                "optimal_time": None,
-                "message": "최적 진입 시간을 찾을 수 없습니다.",
-            }, status=200)
+            await cache.aset(fast_mode_key, True, timeout=60)
+            await sync_to_async(activate_fast_mode.delay)(site_domain, params["release_time_utc"])
+        elif optimal_time_kst:
+            await sync_to_async(extend_fast_mode)(site_domain, params["release_time_utc"])
+
+        body, code = _best_entry_result(params, optimal_time_kst, is_fast_mode, cache_outcome)
+        return JsonResponse(body, status=code)
+
+
+# POST 전용 JSON API (DRF 뷰와 같이 CSRF 검사 제외, csrf_exempt 데코레이터는 비동기 뷰를 감싸지 못한다)
+best_entry_time_async_api.csrf_exempt = True
+
+
+@scraper_only
+@api_view(['GET'])
+def best_entry_time_cache_stats(request):
+    """
+    best_entry_time 결과 캐시 지표 (적중률, single-flight 대기 시간)
+    """
+    return Response(result_cache.stats(), status=200)
+
+
+@scraper_only
+@api_view(['GET'])
+def retrain_stats(request):
+    """
+    Fast Mode 재학습 조정기 지표 (대기 중인 사이트 수, 합쳐져 생략된 재학습 수 등)
+    """
+    return Response(retrain.stats(), status=200)
+
+
+@scraper_only
+@api_view(['GET'])
+def proxy_stats(request):
+    """
+    프록시별 상태(서킷), 성공률/지연 시간 EWMA, 누적 요청·실패 수
+    """
+    return Response({"proxies": proxy_pool.metrics()}, status=200)
+
+
+def _sites_etag(request):
+    return site_cache.etag()
+
+
+def _sites_last_modified(request):
+    return site_cache.last_modified()
+
 
+# 클라이언트가 매번 재검증하도록 no-cache (바뀌지 않았으면 304)
+@cache_control(no_cache=True)
+@condition(etag_func=_sites_etag, last_modified_func=_sites_last_modified)
 def get_sites(request):
     """
-    사이트 목록을 JSON 형태로 반환
+    사이트 목록을 JSON 형태로 반환 (공유 캐시, ETag/Last-Modified 조건부 요청 지원)
     """
-    sites = Site.objects.filter(active=True).values("domain", "name")
-    return JsonResponse({"sites": list(sites)})
+    sites = [{"domain": s["domain"], "name": s["name"]} for s in site_cache.get_sites() if s["active"]]
+    return JsonResponse({"sites": sites})
 
 
 def site_list(request):
     """
-    사이트 리스트 페이지
+    사이트 리스트 페이지 (공유 캐시의 사이트 목록 사용)
     """
-    sites = Site.objects.all()
+    sites = site_cache.get_sites()
     return render(request, 'site_list.html', {"sites": sites})
 
 
@@ -232,7 +497,7 @@ def site_detail(request, site_domain):
             set_event_mode.delay(site_domain, enable=True)
 
             # 최적 진입 시간 예측
-            optimal_time = find_best_entry_time(site_domain, current_time, release_time)
+            optimal_time, _ = cached_best_entry_time(site_domain, current_time, release_time)
             if optimal_time:
                 formatted_time = optimal_time.strftime("%H시 %M분 %S초")
                 return render(request, "site_detail.html", {
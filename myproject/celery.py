@@ -1,6 +1,7 @@
 # Celery 설정을 구성하고 Celery 앱을 생성하는 파일
 import os
 from celery import Celery
+from celery.signals import worker_ready
 
 # Django 설정을 기본값으로 지정
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myproject.settings')
@@ -12,3 +13,10 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # 앱에서 태스크를 자동으로 검색
 app.autodiscover_tasks()
+
+
+@worker_ready.connect
+def startup_model_check(**kwargs):
+    # 워커 메인 프로세스에서 한 번 (beat, 일회성 스크립트에서는 발생하지 않음)
+    from myapp.startup import run_startup_model_check
+    run_startup_model_check()
@@ -15,6 +15,109 @@ ALLOWED_HOSTS = []
 MODEL_STORAGE_DIR = os.path.join(BASE_DIR, 'models')
 os.makedirs(MODEL_STORAGE_DIR, exist_ok=True)
 
+# 서버/워커 시작 시 모델 학습 방식 (myapp/startup.py, wsgi/asgi 와 Celery worker_ready 에서만 실행): skip | lazy(오래된 모델만 백그라운드 학습) | eager(전체 동기 학습)
+MODEL_STARTUP_TRAINING = os.getenv('MODEL_STARTUP_TRAINING', 'lazy')
+MODEL_STALE_AFTER_SECONDS = int(os.getenv('MODEL_STALE_AFTER_SECONDS', str(26 * 3600)))  # 일일 학습 + 여유
+
+# 모델 레지스트리(myapp.ml.registry)에 사이트별로 보관할 버전 수
+MODEL_REGISTRY_KEEP_VERSIONS = int(os.getenv('MODEL_REGISTRY_KEEP_VERSIONS', '5'))
+
+# 추론 방식: flat(NumPy 평탄 트리 평가, XGBoost predict 와 동일 결과) | xgboost
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'flat')
+# flat 모드에서 이 행 수를 넘는 배치는 XGBoost predict 로 평가 (대량 배치는 XGBoost 가 더 빠름)
+FLAT_EVAL_MAX_ROWS = int(os.getenv('FLAT_EVAL_MAX_ROWS', '64'))
+
+# 프로세스당 메모리에 유지할 최대 모델 수 (LRU)
+MODEL_CACHE_MAX_MODELS = int(os.getenv('MODEL_CACHE_MAX_MODELS', '32'))
+
+# 배치 크롤러(myapp.crawler) 설정
+CRAWL_CONCURRENCY = int(os.getenv('CRAWL_CONCURRENCY', '50'))  # 동시 요청 수
+CRAWL_PER_HOST_LIMIT = int(os.getenv('CRAWL_PER_HOST_LIMIT', '4'))  # 호스트(프록시)당 커넥션 수
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', '10'))  # 요청당 타임아웃(초)
+CRAWL_USE_PROXY = os.getenv('CRAWL_USE_PROXY', 'true').lower() == 'true'
+
+# 프록시 풀(myapp.proxy_pool) 설정
+PROXY_EWMA_ALPHA = float(os.getenv('PROXY_EWMA_ALPHA', '0.2'))  # 성공률/지연 시간 EWMA 가중치
+PROXY_FAILURE_THRESHOLD = int(os.getenv('PROXY_FAILURE_THRESHOLD', '5'))  # 연속 실패 시 서킷 open
+PROXY_MIN_SUCCESS_RATE = float(os.getenv('PROXY_MIN_SUCCESS_RATE', '0.5'))  # 성공률 EWMA 가 이보다 낮으면 open
+PROXY_MIN_REQUESTS = 20  # 성공률 기준을 적용하기 시작하는 최소 요청 수
+PROXY_CIRCUIT_COOLDOWN = float(os.getenv('PROXY_CIRCUIT_COOLDOWN', '30'))  # open → half_open 점검까지 대기(초)
+PROXY_STATE_REFRESH = 2.0  # 프로세스에 캐시한 프록시 상태를 다시 읽는 주기(초)
+
+# 정기 크롤링 스케줄러(myapp.crawl_scheduler) 설정
+CRAWL_INTERVAL_MIN = float(os.getenv('CRAWL_INTERVAL_MIN', '60'))  # 사이트별 최소 크롤링 간격(초)
+CRAWL_INTERVAL_MAX = float(os.getenv('CRAWL_INTERVAL_MAX', '180'))  # 최소 간격 + 지터의 상한(초)
+CRAWL_SCHEDULER_TICK = float(os.getenv('CRAWL_SCHEDULER_TICK', '5'))  # 도래한 사이트 확인 주기(초)
+CRAWL_DISPATCH_BATCH_SIZE = int(os.getenv('CRAWL_DISPATCH_BATCH_SIZE', '200'))  # crawl_sites_batch 한 번에 넘길 사이트 수
+CRAWL_SCHEDULER_MAX_DUE = int(os.getenv('CRAWL_SCHEDULER_MAX_DUE', '5000'))  # tick 당 최대 처리 사이트 수
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# 응답 시간 수집 버퍼(myapp.ingest) 설정
+INGEST_BUFFER_ENABLED = os.getenv('INGEST_BUFFER_ENABLED', 'true').lower() == 'true'
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))  # bulk_create 배치 크기
+INGEST_FLUSH_INTERVAL = float(os.getenv('INGEST_FLUSH_INTERVAL', '5'))  # 최대 지연(초)
+INGEST_FLUSH_LOCK_TIMEOUT = 60
+INGEST_SITE_MAP_TTL = 300
+
+# 사이트별 실시간 롤링 윈도우(myapp.live_window): 수집 시 Redis 에 갱신, 추론 시 DB 대신 조회
+LIVE_WINDOW_ENABLED = os.getenv('LIVE_WINDOW_ENABLED', 'true').lower() == 'true'
+LIVE_WINDOW_SECONDS = int(os.getenv('LIVE_WINDOW_SECONDS', '60'))  # 추론 롤링 윈도우(60초) 이상이어야 함
+
+# 모델이 학습/추론하는 신호: response_time(본문까지 전체) 또는 ttfb(첫 바이트까지, 본문 크기 영향 없음)
+MODEL_SIGNAL = os.getenv('MODEL_SIGNAL', 'response_time')
+
+# 응답 시간 집계 계층(myapp.ml.rollups) 설정
+ROLLUP_GRACE_SECONDS = 120  # 늦게 flush 되는 샘플을 기다리는 시간
+ROLLUP_MIN_WINDOW_SECONDS = 3600  # 이 이상 길이의 롤링 통계는 집계 계층에서 계산
+LOG_STREAM_CHUNK_SIZE = 20000  # 학습용 로그 스트리밍 청크 크기 (iterator chunk_size)
+RAW_LOG_RETENTION_DAYS = int(os.getenv('RAW_LOG_RETENTION_DAYS', '0'))  # 0 이면 원본 로그 정리 안 함
+
+# 콜드 로그 아카이브(myapp.ml.archive): 오래된 원본 로그를 사이트/일 단위 컬럼 파일로 옮겨 DB 를 작게 유지
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+LOG_ARCHIVE_AFTER_DAYS = int(os.getenv('LOG_ARCHIVE_AFTER_DAYS', '0'))  # 0 이면 아카이브 안 함
+
+# 사이트 목록 캐시(myapp.site_cache) 보관 시간(초), Site 저장/삭제 시 시그널로 무효화
+SITE_LIST_CACHE_TTL = int(os.getenv('SITE_LIST_CACHE_TTL', '3600'))
+
+# 배치 best_entry_time(views.best_entry_time_batch_api) 요청당 최대 항목 수
+BEST_ENTRY_BATCH_MAX_ITEMS = int(os.getenv('BEST_ENTRY_BATCH_MAX_ITEMS', '50'))
+
+# 비동기 best_entry_time(views.best_entry_time_async_api): 모델 계산 스레드 수와 동시 처리 한도
+ASYNC_INFERENCE_WORKERS = int(os.getenv('ASYNC_INFERENCE_WORKERS', str(os.cpu_count() or 1)))
+ASYNC_INFERENCE_MAX_INFLIGHT = int(os.getenv('ASYNC_INFERENCE_MAX_INFLIGHT', str(ASYNC_INFERENCE_WORKERS * 4)))  # 초과 시 503
+ASYNC_INFERENCE_RETRY_AFTER = 1  # 503 응답의 Retry-After (초)
+
+# 지표(/metrics, myapp.metrics): 프로세스별 증가분을 주기적으로 Redis 에 합산
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))  # 초
+# /metrics 와 상태 API(프록시/재학습/결과 캐시) 접근 허용: IP/CIDR 목록 또는 Bearer 토큰
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip.strip()]
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+# Fast Mode(tasks.fast_mode_tick) 설정
+FAST_MODE_INTERVAL = int(os.getenv('FAST_MODE_INTERVAL', '10'))  # 크롤링/재학습 주기(초)
+FAST_MODE_DURATION = int(os.getenv('FAST_MODE_DURATION', '60'))  # 마지막 활성화 후 유지 시간(초)
+FAST_MODE_AFTER_RELEASE = int(os.getenv('FAST_MODE_AFTER_RELEASE', '0'))  # 릴리즈 후 추가 유지 시간(초)
+
+# Fast Mode 재학습 조정기(myapp.ml.retrain) 설정
+RETRAIN_MIN_INTERVAL = int(os.getenv('RETRAIN_MIN_INTERVAL', '30'))  # 사이트별 재학습 최소 간격(초)
+RETRAIN_LOCK_TIMEOUT = 600  # 재학습 잠금 만료(초)
+# 추가 학습에 쓰는 최근 구간(초). Fast Mode(FAST_MODE_INTERVAL 초 간격)에서도 충분한 샘플이 모이도록 1분보다 길게
+RETRAIN_INCREMENTAL_WINDOW = int(os.getenv('RETRAIN_INCREMENTAL_WINDOW', '600'))
+RETRAIN_INCREMENTAL_TREES = int(os.getenv('RETRAIN_INCREMENTAL_TREES', '20'))  # 추가 학습 1회당 트리 수
+RETRAIN_MAX_INCREMENTAL = int(os.getenv('RETRAIN_MAX_INCREMENTAL', '30'))  # 이만큼 추가 학습이 쌓이면 전체 재학습
+
+# best_entry_time 결과 캐시(myapp.result_cache) 설정
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'true').lower() == 'true'
+RESULT_CACHE_BUCKET_SECONDS = int(os.getenv('RESULT_CACHE_BUCKET_SECONDS', '5'))  # current_time 버킷 크기
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '30'))  # 결과 보관 시간(초)
+RESULT_CACHE_LOCK_TIMEOUT = 30  # 계산 중 잠금 만료(초), 계산 프로세스가 죽어도 풀리도록
+RESULT_CACHE_WAIT_TIMEOUT = float(os.getenv('RESULT_CACHE_WAIT_TIMEOUT', '10'))  # 다른 요청의 계산을 기다리는 최대 시간(초)
+
+# daily_train_models 로 분산되는 학습 작업당 XGBoost 스레드 수 (워커 동시 실행 수 × 이 값 ≤ 코어 수)
+TRAINING_THREADS_PER_JOB = int(os.getenv('TRAINING_THREADS_PER_JOB', '1'))
+
 INSTALLED_APPS = [
     "django.contrib.admin",
     "django.contrib.auth",
@@ -34,6 +137,26 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'myapp.tasks.schedule_regular_crawling',
         'schedule': 60.0,
     },
+    'dispatch_due_crawls': {
+        'task': 'myapp.tasks.dispatch_due_crawls',
+        'schedule': CRAWL_SCHEDULER_TICK,
+    },
+    'flush_response_logs': {
+        'task': 'myapp.tasks.flush_response_logs',
+        'schedule': INGEST_FLUSH_INTERVAL,
+    },
+    'compact_rollups': {
+        'task': 'myapp.tasks.compact_rollups',
+        'schedule': 60.0,
+    },
+    'prune_raw_logs': {
+        'task': 'myapp.tasks.prune_raw_logs',
+        'schedule': 86400.0,
+    },
+    'archive_cold_logs': {
+        'task': 'myapp.tasks.archive_cold_logs',
+        'schedule': 86400.0,
+    },
     'daily_train_models': {
         'task': 'myapp.tasks.daily_train_models',
         'schedule': 86400.0,
@@ -46,7 +169,10 @@ CELERY_TIMEZONE = 'Asia/Seoul'
 CELERY_ENABLE_UTC = False
 CELERY_BROKER_TRANSPORT_OPTIONS = {
     'parser_class': 'redis.connection.PythonParser',  # 기본 파서 사용
+    'socket_connect_timeout': 1,  # 브로커 장애 시 태스크 발행(.delay)이 오래 막히지 않도록
+    'socket_timeout': 2,
 }
+CELERY_BROKER_CONNECTION_TIMEOUT = 2
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
@@ -59,7 +185,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    'corsheaders.middleware.CorsMiddleware'
+    'corsheaders.middleware.CorsMiddleware',
+    'myapp.metrics.MetricsMiddleware',
 ]
 
 ROOT_URLCONF = "myproject.urls"
@@ -89,6 +216,22 @@ DATABASES = {
     }
 }
 
+# 공유 캐시: 웹/워커 프로세스가 fast mode 플래그, 결과 캐시 등을 함께 보도록 Redis 사용
+# (CACHE_BACKEND=locmem 이면 프로세스 로컬 메모리 캐시)
+if os.getenv('CACHE_BACKEND', 'redis') == 'redis':
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
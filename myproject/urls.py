@@ -1,13 +1,22 @@
 from django.contrib import admin
 from django.urls import path
-from myapp.views import best_entry_time_api
+from myapp.views import best_entry_time_api, best_entry_time_async_api, best_entry_time_cache_stats
+from myapp.views import best_entry_time_batch_api
+from myapp.views import retrain_stats, proxy_stats
 from myapp.views import site_list, toggle_event_mode
 from myapp.views import get_sites, LoginView, AddURLView
+from myapp.metrics import metrics_view
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('sites/', site_list, name='site_list'),
     path('api/sites/', get_sites, name='get_sites'),
     path('api/best_entry_time/', best_entry_time_api, name='best_entry_time'),
+    path('api/best_entry_time/batch/', best_entry_time_batch_api, name='best_entry_time_batch'),
+    path('api/best_entry_time/async/', best_entry_time_async_api, name='best_entry_time_async'),
+    path('api/best_entry_time/stats/', best_entry_time_cache_stats, name='best_entry_time_stats'),
+    path('api/retrain/stats/', retrain_stats, name='retrain_stats'),
+    path('api/proxies/stats/', proxy_stats, name='proxy_stats'),
     path('sites/<int:site_id>/toggle_event/', toggle_event_mode, name='toggle_event_mode'),
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/add_url/', AddURLView.as_view(), name='add_url'),
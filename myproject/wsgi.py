@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
 
 application = get_wsgi_application()
+
+# 서버 프로세스 시작 시 모델 점검 (runserver, gunicorn, uvicorn 이 이 모듈을 불러온다)
+from myapp.startup import run_startup_model_check  # noqa: E402
+
+run_startup_model_check()